@@ -0,0 +1,134 @@
+"""
+Selecting many axons at once in REVIEW mode: by rule (e.g. `circularity < 0.6 or g_ratio > 0.9`) or by region.
+Both are evaluated as boolean masks over per-axon arrays, so selecting among thousands of axons costs a few array operations.
+"""
+from models import ContourData
+from catalog import METRIC_COLUMNS, LENGTH_COLUMNS
+
+import numpy.typing as npt
+import numpy as np
+import operator
+import ast
+import re
+
+_COMPARISONS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne
+}
+
+RULE_NAMES: list[str] = ["id"] + METRIC_COLUMNS
+"""Names a rule can compare (`id` is the axon's number, as labeled in the image)."""
+
+def axon_metrics(contour_data: list[ContourData], units: str = "um") -> dict[str, npt.NDArray]:
+    """
+    Returns each of `RULE_NAMES` as an array over the given axons, with lengths in the given `units` (`nm` or `um`).
+    """
+    metrics: dict[str, npt.NDArray] = {"id": np.arange(1, len(contour_data) + 1, dtype=np.float64)}
+    for name in METRIC_COLUMNS:
+        values = np.fromiter((getattr(c, name) for c in contour_data), dtype=np.float64, count=len(contour_data))
+        if name in LENGTH_COLUMNS and units == "um":
+            values /= 1000.0
+        metrics[name] = values
+    return metrics
+
+class SelectionRule():
+    """
+    A condition on axon metrics, such as `circularity < 0.6 or g_ratio > 0.9`.
+    Rules may compare the names in `RULE_NAMES` to numbers (`<`, `<=`, `>`, `>=`, `==`, `!=`, also chained, e.g.
+    `0.5 < g_ratio < 0.8`), and combine comparisons with `and`, `or`, `not` and parentheses. Names are case-insensitive,
+    and `g-ratio` is accepted for `g_ratio`. Anything else is rejected (the rule is parsed, never executed as code).
+    """
+
+    def __init__(self, text: str):
+        """Parse the given rule. Raises `ValueError` if it is not a valid rule."""
+        self.text = text
+        normalized = re.sub(r"\bg-ratio\b", "g_ratio", text.strip(), flags=re.IGNORECASE)
+        if normalized == "":
+            raise ValueError("The rule is empty.")
+        try:
+            tree = ast.parse(normalized, mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid rule: {e.msg}.") from None
+        self._check(tree.body)
+        self.tree = tree.body
+
+    def evaluate(self, metrics: dict[str, npt.NDArray]) -> npt.NDArray[np.bool_]:
+        """Returns which axons match the rule, given `axon_metrics()`."""
+        count = len(next(iter(metrics.values()))) if len(metrics) > 0 else 0
+        result = self._evaluate(self.tree, metrics)
+        return np.broadcast_to(np.asarray(result, dtype=bool), (count,)).copy()
+
+    # -- parsing --
+    def _check(self, node: ast.expr):
+        """Raise `ValueError` if the given node is not allowed in a rule."""
+        if isinstance(node, ast.BoolOp):
+            for value in node.values:
+                self._check(value)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            self._check(node.operand)
+        elif isinstance(node, ast.Compare):
+            for op in node.ops:
+                if type(op) not in _COMPARISONS:
+                    raise ValueError(f"Unsupported comparison '{ast.unparse(node)}' (use <, <=, >, >=, == or !=).")
+            for operand in [node.left] + node.comparators:
+                self._check_operand(operand)
+        else:
+            raise ValueError(f"'{ast.unparse(node)}' is not a condition (e.g. 'circularity < 0.6').")
+
+    def _check_operand(self, node: ast.expr):
+        if isinstance(node, ast.Name):
+            if node.id.lower() not in RULE_NAMES:
+                raise ValueError(f"Unknown name '{node.id}' (known: {', '.join(RULE_NAMES)}).")
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            self._check_operand(node.operand)
+        elif not (isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool)):
+            raise ValueError(f"'{ast.unparse(node)}' is neither a metric nor a number.")
+
+    # -- evaluation --
+    def _evaluate(self, node: ast.expr, metrics: dict[str, npt.NDArray]):
+        if isinstance(node, ast.BoolOp):
+            values = [np.asarray(self._evaluate(v, metrics), dtype=bool) for v in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return combine.reduce(np.broadcast_arrays(*values))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return np.logical_not(self._evaluate(node.operand, metrics))
+        if isinstance(node, ast.Compare):
+            result = True
+            left = self._value(node.left, metrics)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self._value(comparator, metrics)
+                result = np.logical_and(result, _COMPARISONS[type(op)](left, right))
+                left = right
+            return result
+        raise ValueError(f"Cannot evaluate '{ast.unparse(node)}'.")
+
+    def _value(self, node: ast.expr, metrics: dict[str, npt.NDArray]):
+        if isinstance(node, ast.Name):
+            return metrics[node.id.lower()]
+        if isinstance(node, ast.UnaryOp):
+            value = self._value(node.operand, metrics)
+            return -value if isinstance(node.op, ast.USub) else value
+        return float(node.value) # type: ignore
+
+def points_in_polygon(points: npt.NDArray, polygon: npt.NDArray) -> npt.NDArray[np.bool_]:
+    """
+    Returns which of the given `(N, 2)` points are inside the given `(M, 2)` polygon (even-odd rule),
+    testing all points against each edge at once.
+    """
+    inside = np.zeros(len(points), dtype=bool)
+    if len(polygon) < 3 or len(points) == 0:
+        return inside
+    x, y = points[:, 0], points[:, 1]
+    x0, y0 = polygon[:, 0], polygon[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    for ax, ay, bx, by in zip(x0, y0, x1, y1):
+        if ay == by:
+            continue # horizontal edges never cross a horizontal ray
+        crosses = (ay > y) != (by > y)
+        x_cross = ax + (y - ay) * (bx - ax) / (by - ay)
+        inside ^= crosses & (x < x_cross)
+    return inside
@@ -0,0 +1,327 @@
+"""
+Local SQLite catalog of segmentation results: per-file metadata and settings, and per-axon metrics and selection.
+Queries across thousands of .SEG files run on the catalog, without opening any of them.
+"""
+from models import Settings, FileMan
+from seg_format import SegReader
+from selection_journal import journal_path
+
+from collections.abc import Iterable
+from datetime import datetime
+from pydantic import BaseModel
+from pathlib import Path
+import sqlite3
+import csv
+import os
+
+catalog_path = FileMan.resource_path("__appdata__/catalog.sqlite")
+
+METRIC_COLUMNS: list[str] = ["g_ratio", "circularity", "thickness", "inner_diameter", "outer_diameter"]
+"""Per-axon metric columns. Lengths (`thickness`, `inner_diameter`, `outer_diameter`) are stored in nm."""
+
+LENGTH_COLUMNS: set[str] = {"thickness", "inner_diameter", "outer_diameter"}
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS segmentations (
+    id INTEGER PRIMARY KEY,
+    seg_path TEXT NOT NULL UNIQUE,
+    seg_size INTEGER NOT NULL,
+    seg_mtime_ns INTEGER NOT NULL,
+    journal_size INTEGER NOT NULL,
+    img_filename TEXT NOT NULL,
+    source_path TEXT,
+    page INTEGER NOT NULL,
+    page_count INTEGER NOT NULL,
+    resolution_divisor REAL NOT NULL,
+    preferred_units TEXT NOT NULL,
+    thickness_percentile INTEGER,
+    axon_count INTEGER NOT NULL,
+    settings TEXT,
+    indexed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS axons (
+    seg_id INTEGER NOT NULL REFERENCES segmentations(id) ON DELETE CASCADE,
+    axon_index INTEGER NOT NULL,
+    axon_id INTEGER NOT NULL,
+    selected INTEGER NOT NULL,
+    {", ".join(f"{name} REAL NOT NULL" for name in METRIC_COLUMNS)},
+    UNIQUE (seg_id, axon_index)
+);
+"""
+
+class AxonQuery(BaseModel):
+    """Filter of a catalog query. Empty fields don't filter."""
+
+    selected_only: bool = True
+    """Only include selected axons."""
+
+    units: str = "um"
+    """Unit of length bounds and exported lengths (`nm` or `um`)."""
+
+    bounds: dict[str, tuple[float | None, float | None]] = {}
+    """Inclusive `(min, max)` of metric columns (see `METRIC_COLUMNS`), in `units` for lengths. `None` means unbounded."""
+
+    img_filename: str = ""
+    """Glob pattern of image file names (e.g. `cohort_a_*`)."""
+
+    seg_folder: str = ""
+    """Only include .SEG files in this folder (or its subfolders)."""
+
+    def where(self) -> tuple[str, list]:
+        """
+        Returns:
+            sql (str): `WHERE` clause (or an empty string).
+            params (list): Its parameters.
+        """
+        clauses: list[str] = []
+        params: list = []
+        if self.selected_only:
+            clauses.append("a.selected = 1")
+        for name, (low, high) in self.bounds.items():
+            if name not in METRIC_COLUMNS:
+                raise ValueError(f"Unknown metric '{name}'.")
+            scale = 1000.0 if name in LENGTH_COLUMNS and self.units == "um" else 1.0
+            if low is not None:
+                clauses.append(f"a.{name} >= ?")
+                params.append(low * scale)
+            if high is not None:
+                clauses.append(f"a.{name} <= ?")
+                params.append(high * scale)
+        if self.img_filename:
+            clauses.append("s.img_filename GLOB ?")
+            params.append(self.img_filename)
+        if self.seg_folder:
+            prefix = os.path.join(Path(self.seg_folder).resolve(), "")
+            clauses.append("substr(s.seg_path, 1, ?) = ?")
+            params += [len(prefix), prefix]
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+class ResultsCatalog():
+    """
+    SQLite catalog of .SEG files. Files are indexed from their header, metric columns and selection only
+    (see `SegReader`), and re-indexed when the file or its selection journal changed since.
+    A connection may only be used by the thread that opened it, so each thread opens its own catalog.
+    """
+
+    def __init__(self, path: Path = catalog_path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(_SCHEMA)
+        self.connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.connection.commit()
+
+    def __enter__(self) -> 'ResultsCatalog':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def _file_state(seg_path: Path) -> tuple[int, int, int]:
+        """Returns the `(size, mtime_ns, journal size)` that identify the indexed version of a .SEG file."""
+        stat = seg_path.stat()
+        try:
+            journal_size = journal_path(seg_path).stat().st_size
+        except OSError:
+            journal_size = 0
+        return stat.st_size, stat.st_mtime_ns, journal_size
+
+    def is_current(self, seg_path: Path) -> bool:
+        """Returns whether the given .SEG file is indexed and unchanged since."""
+        row = self.connection.execute(
+            "SELECT seg_size, seg_mtime_ns, journal_size FROM segmentations WHERE seg_path = ?",
+            (str(seg_path.resolve()),)
+        ).fetchone()
+        try:
+            return row is not None and tuple(row) == self._file_state(seg_path)
+        except OSError:
+            return False
+
+    def index_file(self, seg_path: Path, settings: Settings | None = None, commit: bool = True):
+        """
+        (Re-)index the given .SEG file. The `settings` it was processed with are stored if given,
+        otherwise previously stored settings are kept. Raises if the file can't be read.
+        """
+        seg_path = seg_path.resolve()
+        state = self._file_state(seg_path)
+        with SegReader(seg_path) as reader:
+            header = reader.header
+            metrics = reader.metrics()
+            selected_states = reader.selected_states()
+        image_source = header.get("image_source")
+
+        cursor = self.connection.cursor()
+        seg_id = cursor.execute(
+            """
+            INSERT INTO segmentations (
+                seg_path, seg_size, seg_mtime_ns, journal_size, img_filename, source_path, page, page_count,
+                resolution_divisor, preferred_units, thickness_percentile, axon_count, settings, indexed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(seg_path) DO UPDATE SET
+                seg_size = excluded.seg_size,
+                seg_mtime_ns = excluded.seg_mtime_ns,
+                journal_size = excluded.journal_size,
+                img_filename = excluded.img_filename,
+                source_path = excluded.source_path,
+                page = excluded.page,
+                page_count = excluded.page_count,
+                resolution_divisor = excluded.resolution_divisor,
+                preferred_units = excluded.preferred_units,
+                thickness_percentile = excluded.thickness_percentile,
+                axon_count = excluded.axon_count,
+                settings = COALESCE(excluded.settings, segmentations.settings),
+                indexed_at = excluded.indexed_at
+            RETURNING id
+            """,
+            (
+                str(seg_path), *state, header["img_filename"],
+                image_source["path"] if image_source is not None else None,
+                header["page"], header["page_count"], header["resolution_divisor"], header["preferred_units"],
+                header["thickness_percentile"], header["axon_count"],
+                settings.model_dump_json() if settings is not None else None,
+                datetime.now().isoformat(timespec="seconds")
+            )
+        ).fetchone()[0]
+        cursor.execute("DELETE FROM axons WHERE seg_id = ?", (seg_id,))
+        cursor.executemany(
+            f"INSERT INTO axons VALUES (?, ?, ?, ?, {', '.join('?' for _ in METRIC_COLUMNS)})",
+            zip(
+                [seg_id] * len(selected_states),
+                range(len(selected_states)),
+                metrics["ID"].tolist(),
+                [int(s) for s in selected_states],
+                *(metrics[name].tolist() for name in METRIC_COLUMNS)
+            )
+        )
+        if commit:
+            self.connection.commit()
+
+    def index_files(self, seg_paths: Iterable[Path]) -> tuple[int, int, list[tuple[Path, str]]]:
+        """
+        Index the given .SEG files, skipping the ones that are unchanged since they were indexed.
+        Returns:
+            indexed (int): Number of (re-)indexed files.
+            unchanged (int): Number of skipped files.
+            failed (list[tuple[Path, str]]): Unreadable files and their errors.
+        """
+        indexed, unchanged = 0, 0
+        failed: list[tuple[Path, str]] = []
+        for seg_path in seg_paths:
+            if self.is_current(seg_path):
+                unchanged += 1
+                continue
+            try:
+                self.index_file(seg_path, commit=False)
+            except Exception as e:
+                failed.append((seg_path, f"{e.__class__.__name__}: {e}"))
+                continue
+            indexed += 1
+            if indexed % 100 == 0:
+                self.connection.commit()
+        self.connection.commit()
+        return indexed, unchanged, failed
+
+    def refresh(self) -> tuple[int, int]:
+        """
+        Re-index changed files and forget files that no longer exist (or can't be read).
+        Returns:
+            updated (int): Number of re-indexed files.
+            removed (int): Number of forgotten files.
+        """
+        paths = [Path(p) for (p,) in self.connection.execute("SELECT seg_path FROM segmentations")]
+        existing = [p for p in paths if p.is_file()]
+        missing = [p for p in paths if not p.is_file()]
+        updated, _, failed = self.index_files(existing)
+        self.remove(missing + [p for p, _ in failed])
+        return updated, len(missing) + len(failed)
+
+    def remove(self, seg_paths: list[Path]):
+        """Forget the given .SEG files."""
+        self.connection.executemany("DELETE FROM segmentations WHERE seg_path = ?", [(str(p),) for p in seg_paths])
+        self.connection.commit()
+
+    def summary(self) -> tuple[int, int]:
+        """
+        Returns:
+            files (int): Number of indexed .SEG files.
+            axons (int): Number of indexed axons.
+        """
+        files = self.connection.execute("SELECT COUNT(*) FROM segmentations").fetchone()[0]
+        axons = self.connection.execute("SELECT COUNT(*) FROM axons").fetchone()[0]
+        return files, axons
+
+    def count_axons(self, query: AxonQuery) -> int:
+        """Returns the number of axons that match the query."""
+        where, params = query.where()
+        return self.connection.execute(
+            f"SELECT COUNT(*) FROM axons a JOIN segmentations s ON s.id = a.seg_id {where}", params
+        ).fetchone()[0]
+
+    def query_axons(self, query: AxonQuery, limit: int | None = None) -> tuple[list[str], list[tuple]]:
+        """
+        Returns:
+            columns (list[str]): Column names (lengths in `query.units`).
+            rows (list[tuple]): Matching axons, ordered by .SEG file and axon (at most `limit`).
+        """
+        columns, cursor = self._query(query, limit)
+        return columns, cursor.fetchall()
+
+    def export_csv(self, query: AxonQuery, csv_path: Path) -> int:
+        """
+        Write the matching axons to a CSV file (one row per axon, lengths in `query.units`, metrics with 4 decimals).
+        Returns:
+            rows (int): Number of written axons.
+        """
+        columns, cursor = self._query(query, None, formatted=True)
+        count = 0
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            while rows := cursor.fetchmany(10000):
+                writer.writerows(rows)
+                count += len(rows)
+        return count
+
+    def _query(self, query: AxonQuery, limit: int | None, formatted: bool = False) -> tuple[list[str], sqlite3.Cursor]:
+        """Run the query. Returns column names and a cursor over the rows (metrics as text with 4 decimals if `formatted`)."""
+        where, params = query.where()
+        unit = "µm" if query.units == "um" else "nm"
+        scale = 1000.0 if query.units == "um" else 1.0
+        metric_columns = [
+            (f"a.{name} / {scale}", f"{name} ({unit})") if name in LENGTH_COLUMNS else (f"a.{name}", name)
+            for name in METRIC_COLUMNS
+        ]
+        if formatted: # as in the segmentation data CSV, and formatting in SQLite is much faster
+            metric_columns = [(f"printf('%.4f', {expression})", label) for expression, label in metric_columns]
+        columns = ["image", "page", "axon", "selected", *(label for _, label in metric_columns), "thickness_percentile", "seg_file"]
+        sql = f"""
+            SELECT s.img_filename, s.page + 1, a.axon_index + 1, a.selected,
+                {", ".join(expression for expression, _ in metric_columns)},
+                s.thickness_percentile, s.seg_path
+            FROM axons a JOIN segmentations s ON s.id = a.seg_id
+            {where}
+            ORDER BY a.seg_id, a.axon_index
+        """
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = params + [limit]
+        return columns, self.connection.execute(sql, params)
+
+def collect_catalog_files(paths: list[Path]) -> list[Path]:
+    """Expand the given .SEG files and directories (searched recursively) into a list of .SEG files."""
+    seg_paths: list[Path] = []
+    for p in paths:
+        if p.is_dir():
+            seg_paths.extend(sorted(c for c in p.rglob("*.seg") if c.is_file()))
+        elif p.is_file() and p.suffix.lower() == ".seg":
+            seg_paths.append(p)
+    return seg_paths
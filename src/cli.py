@@ -0,0 +1,491 @@
+"""Command line interface for running SnapG batches without the GUI."""
+from models import AppState, Settings, SegmentationData, FileMan
+from save_load import load_state
+from panels.process.batch_worker import BatchWorker, BatchResult, ExecutionBackend
+from panels.process.watch_worker import WatchWorker
+from panels.process.batch_manifest import BatchManifest
+from imgproc.result_cache import DiskResultCache
+from imgproc.stage_cache import StageCache
+from imgproc.remeasure import remeasure_files
+from seg_format import SegReader, encode_seg, decode_seg, read_legacy_seg
+from catalog import ResultsCatalog, AxonQuery, METRIC_COLUMNS, collect_catalog_files
+from seg_migrate import MigrationLedger, migrate_files
+
+from datetime import datetime
+from pathlib import Path
+import multiprocessing
+import tempfile
+import pickle
+import argparse
+import signal
+import json
+import time
+import sys
+import os
+
+def collect_jobs(paths: list[Path]) -> list[tuple[Path, int, int]]:
+    """Expand the given image files and directories into `(image path, page, page count)` batch jobs."""
+    image_paths: list[Path] = []
+    for p in paths:
+        if p.is_dir():
+            image_paths.extend(sorted(c for c in p.iterdir() if c.is_file() and FileMan.path_is_image(c)))
+        elif p.is_file() and FileMan.path_is_image(p):
+            image_paths.append(p)
+        else:
+            print(f"Skipping '{p}' (not an image or directory).", file=sys.stderr)
+
+    jobs: list[tuple[Path, int, int]] = []
+    for p in image_paths:
+        page_count = FileMan.page_count(p)
+        if page_count <= 0:
+            print(f"Skipping unreadable image '{p}'.", file=sys.stderr)
+            continue
+        jobs.extend((p, page, page_count) for page in range(page_count))
+    return jobs
+
+def collect_seg_files(paths: list[Path]) -> list[Path]:
+    """Expand the given .SEG files and directories into a list of .SEG files."""
+    seg_paths: list[Path] = []
+    for p in paths:
+        if p.is_dir():
+            seg_paths.extend(sorted(c for c in p.iterdir() if c.is_file() and c.suffix.lower() == ".seg"))
+        elif p.is_file() and p.suffix.lower() == ".seg":
+            seg_paths.append(p)
+        else:
+            print(f"Skipping '{p}' (not a .seg file or directory).", file=sys.stderr)
+    return seg_paths
+
+def load_settings(settings_path: Path | None) -> Settings | None:
+    """
+    Read segmentation settings from a `.snpg` file, or the GUI's last used settings if no file is given.
+    Returns:
+        settings (Settings | None): The settings, or `None` if the file is invalid.
+    """
+    if settings_path is None:
+        return load_state()[0].settings
+    try:
+        with open(settings_path, 'r') as f:
+            return AppState.from_dict(json.load(f)).settings
+    except Exception as e:
+        return None
+
+def default_workers() -> int:
+    """Same default as `ProcessPanel`: all logical processors except one."""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+def run_batch(jobs: list[tuple[Path, int, int]],
+              settings: Settings,
+              workers: int,
+              save_dir: Path,
+              backend: ExecutionBackend,
+              verbose: bool = True,
+              export_data: bool = False,
+              use_cache: bool = True,
+              keep_stages: bool = False,
+              keep_samples: bool = False,
+              reference_images: bool = False,
+              use_catalog: bool = True
+    ) -> list[BatchResult]:
+    """Run a batch synchronously on the calling thread and return the results of all processed pages."""
+    results: list[BatchResult] = []
+    def on_progress(result: BatchResult):
+        results.append(result)
+        if verbose:
+            page_note = f" (page {result.page + 1}/{result.page_count})" if result.page_count > 1 else ""
+            print(f"Processed {result.image_path.name}{page_note}: {result.axon_count} axons in {result.seconds:.2f}s.")
+
+    worker = BatchWorker()
+    worker.progress.connect(on_progress)
+    worker.error.connect(lambda e: print(e, file=sys.stderr))
+    if verbose:
+        worker.exported.connect(lambda csv_path: print(f"Segmentation data: {csv_path}"))
+    worker.run(jobs, settings, workers, save_dir, backend.value, export_data, keep_stages=keep_stages, keep_samples=keep_samples, reference_images=reference_images, use_cache=use_cache, use_catalog=use_catalog)
+    return results
+
+def print_cache_stats(results: list[BatchResult]):
+    """Print how many pages were served from the result cache (and which stages were reused)."""
+    hits = sum(1 for r in results if r.cache_hit)
+    print(f"Result cache: {hits} hits, {len(results) - hits} misses.")
+    reused = {stage: sum(1 for r in results if r.start_stage == stage) for stage in ("filter", "measure")}
+    if any(reused.values()):
+        print(f"Stored stages: {reused['filter']} pages started at filtering, {reused['measure']} at measuring.")
+
+def batch_command(args: argparse.Namespace) -> int:
+    """`batch`: segment images into a new `SnapG_seg_<timestamp>` folder."""
+    settings = load_settings(args.settings)
+    if settings is None:
+        print(f"Could not read settings file '{args.settings}'.", file=sys.stderr)
+        return 1
+    jobs = collect_jobs(args.images)
+    if len(jobs) == 0:
+        print("No images to process.", file=sys.stderr)
+        return 1
+
+    formatted_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_dir = args.dest / f"SnapG_seg_{formatted_datetime}"
+    save_dir.mkdir(parents=True, exist_ok=True)
+
+    start_time = time.perf_counter()
+    results = run_batch(jobs, settings, args.workers, save_dir, ExecutionBackend(args.backend), export_data=args.export, use_cache=not args.no_cache, keep_stages=args.keep_stages, keep_samples=args.keep_samples, reference_images=args.reference_images)
+    print(f"Finished {len(results)}/{len(jobs)} pages in {time.perf_counter() - start_time:.1f}s. Output: {save_dir}")
+    print_cache_stats(results)
+    return 0 if len(results) == len(jobs) else 1
+
+def resume_command(args: argparse.Namespace) -> int:
+    """`resume`: finish an interrupted batch in its folder, using the batch's original settings and options."""
+    if not BatchManifest.exists(args.batch):
+        print(f"'{args.batch}' has no batch manifest.", file=sys.stderr)
+        return 1
+    manifest = BatchManifest(args.batch)
+    jobs, missing = manifest.remaining_jobs()
+    manifest.close()
+    if manifest.settings is None:
+        print("The batch manifest is damaged.", file=sys.stderr)
+        return 1
+    for path in missing:
+        print(f"Skipping missing or unreadable image '{path}'.", file=sys.stderr)
+    if len(jobs) == 0:
+        print("Every image in this batch was already processed.")
+        return 0 if len(missing) == 0 else 1
+
+    print(f"Resuming {len(jobs)} pages in {args.batch}.")
+    start_time = time.perf_counter()
+    options = manifest.options
+    results = run_batch(
+        jobs, manifest.settings, args.workers, args.batch, ExecutionBackend(args.backend),
+        export_data=options.get('export_data', False) or args.export,
+        use_cache=options.get('use_cache', True),
+        keep_stages=options.get('keep_stages', False),
+        keep_samples=options.get('keep_samples', False),
+        reference_images=options.get('reference_images', False)
+    )
+    print(f"Finished {len(results)}/{len(jobs)} pages in {time.perf_counter() - start_time:.1f}s.")
+    print_cache_stats(results)
+    return 0 if len(results) == len(jobs) and len(missing) == 0 else 1
+
+def watch_command(args: argparse.Namespace) -> int:
+    """`watch`: segment images as they appear in a folder, until interrupted (Ctrl+C)."""
+    settings = load_settings(args.settings)
+    if settings is None:
+        print(f"Could not read settings file '{args.settings}'.", file=sys.stderr)
+        return 1
+    if not args.folder.is_dir():
+        print(f"'{args.folder}' is not a folder.", file=sys.stderr)
+        return 1
+
+    save_dir = args.dest / f"SnapG_watch_{args.folder.name}" # fixed name, so the ledger carries over between runs
+    save_dir.mkdir(parents=True, exist_ok=True)
+
+    worker = WatchWorker()
+    worker.poll_interval = args.interval
+    worker.detected.connect(lambda name, pages: print(f"Detected {name}{f" ({pages} pages)" if pages > 1 else ""}."))
+    worker.progress.connect(
+        lambda result: print(
+            f"Processed {result.image_path.name}"
+            f"{f" (page {result.page + 1}/{result.page_count})" if result.page_count > 1 else ""}: "
+            f"{result.axon_count} axons in {result.seconds:.2f}s."
+        )
+    )
+    worker.exported.connect(lambda csv_path: print(f"Segmentation data: {csv_path}"))
+    worker.error.connect(lambda e: print(e, file=sys.stderr))
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+
+    print(f"Watching '{args.folder}' (output: {save_dir}). Press Ctrl+C to stop.")
+    worker.run(
+        args.folder, settings, args.workers, save_dir, args.backend, args.export,
+        keep_stages=args.keep_stages, keep_samples=args.keep_samples, reference_images=args.reference_images, use_cache=not args.no_cache
+    )
+    print("Stopped watching.")
+    return 0
+
+def remeasure_command(args: argparse.Namespace) -> int:
+    """`remeasure`: re-measure thickness in .seg files at another percentile, from their kept thickness samples."""
+    if not 0 <= args.percentile <= 100:
+        print("The percentile must be between 0 and 100.", file=sys.stderr)
+        return 1
+    seg_paths = collect_seg_files(args.segs)
+    if len(seg_paths) == 0:
+        print("No .seg files to re-measure.", file=sys.stderr)
+        return 1
+
+    start_time = time.perf_counter()
+    remeasured, unchanged, failed = 0, 0, 0
+    for result in remeasure_files(seg_paths, args.percentile, args.workers):
+        remeasured += result.remeasured
+        if result.warning is not None:
+            unchanged += 1
+            print(f"Left '{result.seg_path}' unchanged: {result.warning}", file=sys.stderr)
+        if result.error is not None:
+            failed += 1
+            print(f"Failed to re-measure '{result.seg_path}': {result.error}", file=sys.stderr)
+    print(f"Re-measured {remeasured} axons in {len(seg_paths) - failed - unchanged}/{len(seg_paths)} files in {time.perf_counter() - start_time:.1f}s.")
+    return 0 if failed == 0 and unchanged == 0 else 1
+
+def seg_benchmark_command(args: argparse.Namespace) -> int:
+    """`seg-benchmark`: compare the size and load time of .seg files as binary containers and as (legacy) pickles."""
+    seg_paths = collect_seg_files(args.segs)
+    seg_data_list = [s for s in (SegmentationData.from_file(p, None) for p in seg_paths) if s is not None]
+    if len(seg_data_list) == 0:
+        print("No readable .seg files.", file=sys.stderr)
+        return 1
+
+    def best_time(func) -> float:
+        times = []
+        for _ in range(args.repeat):
+            start_time = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start_time)
+        return min(times)
+
+    def write_files(tmp_dir: Path, serialize) -> list[Path]:
+        paths = [tmp_dir / f"{i}.seg" for i in range(len(seg_data_list))]
+        for path, seg_data in zip(paths, seg_data_list):
+            path.write_bytes(serialize(seg_data))
+        return paths
+
+    rows: list[tuple[str, int | None, float | None, float]] = []
+    formats = [("pickle", pickle.dumps, read_legacy_seg), ("container", encode_seg, decode_seg)]
+    for name, serialize, deserialize in formats:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = write_files(Path(tmp), serialize)
+            write_s = best_time(lambda: write_files(Path(tmp), serialize))
+            load_s = best_time(lambda: [deserialize(p.read_bytes()) for p in paths])
+            rows.append((name, sum(p.stat().st_size for p in paths), write_s, load_s))
+            if name == "container":
+                def read_metrics():
+                    for p in paths:
+                        with SegReader(p) as reader:
+                            reader.metrics()
+                rows.append(("  metrics", None, None, best_time(read_metrics))) # lazy: header and metric blocks only
+
+    print(f"{len(seg_data_list)} files (best of {args.repeat}, files in the OS cache):")
+    print(f"{'format':<10} {'size (MB)':>10} {'write (ms)':>11} {'load (ms)':>10}")
+    for name, size, write_s, load_s in rows:
+        size_text = "-" if size is None else f"{size / 1e6:.2f}"
+        write_text = "-" if write_s is None else f"{1000 * write_s:.1f}"
+        print(f"{name:<10} {size_text:>10} {write_text:>11} {1000 * load_s:>10.1f}")
+    return 0
+
+def cache_command(args: argparse.Namespace) -> int:
+    """`cache`: show the size of the on-disk result cache, or clear it."""
+    cache = DiskResultCache()
+    stage_cache = StageCache()
+    if args.clear:
+        cache.clear()
+        stage_cache.clear()
+        print("Cleared the result and stage caches.")
+        return 0
+    entries, size = cache.usage()
+    print(f"Result cache: {entries} results, {size / 1e6:.1f} MB of {cache.max_bytes / 1e6:.0f} MB ({cache.cache_dir}).")
+    entries, size = stage_cache.store.usage()
+    print(f"Stage cache: {entries} entries, {size / 1e6:.1f} MB of {stage_cache.store.max_bytes / 1e6:.0f} MB ({stage_cache.store.cache_dir}).")
+    return 0
+
+def parse_bound(text: str) -> tuple[str, float]:
+    """Parse a `metric=value` query bound."""
+    name, _, value = text.partition("=")
+    if name not in METRIC_COLUMNS:
+        raise argparse.ArgumentTypeError(f"unknown metric '{name}' (choose from {', '.join(METRIC_COLUMNS)})")
+    try:
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a number")
+
+def catalog_command(args: argparse.Namespace) -> int:
+    """`catalog`: add .seg files to the results catalog, refresh it, or query and export axons."""
+    with ResultsCatalog() as catalog:
+        if args.action == "import":
+            seg_paths = collect_catalog_files(args.segs)
+            start_time = time.perf_counter()
+            indexed, unchanged, failed = catalog.index_files(seg_paths)
+            for path, error in failed:
+                print(f"Could not index '{path}': {error}", file=sys.stderr)
+            print(f"Indexed {indexed} files ({unchanged} unchanged, {len(failed)} failed) in {time.perf_counter() - start_time:.1f}s.")
+        elif args.action == "refresh":
+            updated, removed = catalog.refresh()
+            print(f"Re-indexed {updated} changed files, removed {removed} missing or unreadable files.")
+        elif args.action == "query":
+            bounds: dict[str, tuple[float | None, float | None]] = {}
+            for name, value in args.min:
+                bounds[name] = (value, bounds.get(name, (None, None))[1])
+            for name, value in args.max:
+                bounds[name] = (bounds.get(name, (None, None))[0], value)
+            query = AxonQuery(
+                selected_only=not args.all,
+                units=args.units,
+                bounds=bounds,
+                img_filename=args.image,
+                seg_folder=str(args.folder) if args.folder is not None else ""
+            )
+            start_time = time.perf_counter()
+            if args.export is not None:
+                count = catalog.export_csv(query, args.export)
+                print(f"Exported {count} axons to '{args.export}' in {1000 * (time.perf_counter() - start_time):.0f} ms.")
+            else:
+                count = catalog.count_axons(query)
+                print(f"{count} axons match ({1000 * (time.perf_counter() - start_time):.0f} ms).")
+        files, axons = catalog.summary()
+        print(f"Catalog: {files} files, {axons} axons ({catalog.path}).")
+    return 0
+
+def migrate_command(args: argparse.Namespace) -> int:
+    """`migrate`: convert legacy (pickled) .seg files to the binary container, resuming an interrupted migration."""
+    seg_paths = collect_catalog_files(args.segs)
+    with MigrationLedger() as ledger:
+        pending, done, skipped_failed = ledger.pending(seg_paths, args.retry_failed)
+        if done > 0:
+            print(f"Skipping {done} files migrated before.")
+        if skipped_failed > 0:
+            print(f"Skipping {skipped_failed} files that failed before (use --retry-failed to retry them).")
+        if len(pending) == 0:
+            print("No .seg files to migrate.")
+            return 0 if skipped_failed == 0 else 1
+
+        print(f"Migrating {len(pending)} files with {args.workers} workers.")
+        start_time = time.perf_counter()
+        last_report = start_time
+        counts = {"migrated": 0, "current": 0, "failed": 0}
+        legacy_bytes, migrated_bytes = 0, 0
+        for i, result in enumerate(migrate_files(pending, args.workers, args.keep_legacy), start=1):
+            ledger.record(result)
+            counts[result.status] += 1
+            legacy_bytes += result.legacy_size
+            migrated_bytes += result.size if result.status == "migrated" else 0
+            if result.error is not None:
+                print(f"Failed to migrate '{result.seg_path}': {result.error}", file=sys.stderr)
+            now = time.perf_counter()
+            if now - last_report >= 2 or i == len(pending):
+                last_report = now
+                elapsed = now - start_time
+                print(f"{i}/{len(pending)} files, {i / elapsed:.1f} files/s, {legacy_bytes / 1e6 / elapsed:.1f} MB/s")
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Migrated {counts['migrated']} files ({counts['current']} were already binary, {counts['failed']} failed) in {elapsed:.1f}s.")
+    if counts["migrated"] > 0:
+        print(f"Pickles: {legacy_bytes / 1e6:.1f} MB, containers: {migrated_bytes / 1e6:.1f} MB.")
+    return 0 if counts["failed"] == 0 and skipped_failed == 0 else 1
+
+def benchmark_command(args: argparse.Namespace) -> int:
+    """`benchmark`: compare execution backends on a fixed image set. Output files are discarded."""
+    settings = load_settings(args.settings)
+    if settings is None:
+        print(f"Could not read settings file '{args.settings}'.", file=sys.stderr)
+        return 1
+    jobs = collect_jobs(args.images)
+    if len(jobs) == 0:
+        print("No images to benchmark.", file=sys.stderr)
+        return 1
+
+    backends = [ExecutionBackend(b) for b in args.backends]
+    print(f"Benchmarking {len(jobs)} pages with {args.workers} workers, best of {args.repeat}.")
+    print(f"{'backend':<10}{'seconds':>10}{'pages/s':>10}{'MP/s':>10}")
+    for backend in backends:
+        best_seconds: float | None = None
+        megapixels = 0.0
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                start_time = time.perf_counter()
+                results = run_batch(jobs, settings, args.workers, Path(tmp_dir), backend, verbose=False, use_cache=False, use_catalog=False)
+                seconds = time.perf_counter() - start_time
+            if len(results) != len(jobs):
+                print(f"{backend.value}: {len(jobs) - len(results)} pages failed.", file=sys.stderr)
+            megapixels = sum(r.megapixels for r in results)
+            best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+        assert best_seconds is not None
+        print(f"{backend.value:<10}{best_seconds:>10.2f}{len(jobs) / best_seconds:>10.2f}{megapixels / best_seconds:>10.2f}")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for all subcommands."""
+    parser = argparse.ArgumentParser(prog="snapg", description="SnapG command line interface.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub: argparse.ArgumentParser):
+        sub.add_argument("images", nargs="+", type=Path, help="Image files and/or directories of images.")
+        sub.add_argument("--settings", type=Path, default=None, help="Settings (.snpg) file. Defaults to the GUI's current settings.")
+        sub.add_argument("--workers", type=int, default=default_workers(), help="Number of workers.")
+
+    batch_parser = subparsers.add_parser("batch", help="Segment images into .seg files.")
+    add_common(batch_parser)
+    batch_parser.add_argument("--dest", type=Path, required=True, help="Destination folder.")
+    batch_parser.add_argument("--backend", choices=[b.value for b in ExecutionBackend], default=ExecutionBackend.PROCESS.value)
+    batch_parser.add_argument("--export", action="store_true", help="Also write the segmentation data CSV and labeled images (accepting all detections).")
+    batch_parser.add_argument("--no-cache", action="store_true", help="Process every page, even if a cached result exists.")
+    batch_parser.add_argument("--keep-stages", action="store_true", help="Store and reuse intermediate stages, so re-runs after filter or measurement setting changes are faster.")
+    batch_parser.add_argument("--keep-samples", action="store_true", help="Keep each axon's thickness samples in the .seg files, so they can be re-measured later.")
+    batch_parser.add_argument("--reference-images", action="store_true", help="Store the source image's path and digest in the .seg files instead of its pixels.")
+    batch_parser.set_defaults(func=batch_command)
+
+    resume_parser = subparsers.add_parser("resume", help="Finish an interrupted batch.")
+    resume_parser.add_argument("batch", type=Path, help="Batch folder (SnapG_seg_<timestamp>) to resume.")
+    resume_parser.add_argument("--workers", type=int, default=default_workers(), help="Number of workers.")
+    resume_parser.add_argument("--backend", choices=[b.value for b in ExecutionBackend], default=ExecutionBackend.PROCESS.value)
+    resume_parser.add_argument("--export", action="store_true", help="Also write the segmentation data CSV and labeled images of the resumed pages (always done if the batch was started with --export).")
+    resume_parser.set_defaults(func=resume_command)
+
+    watch_parser = subparsers.add_parser("watch", help="Segment new images as they appear in a folder.")
+    watch_parser.add_argument("folder", type=Path, help="Folder to watch.")
+    watch_parser.add_argument("--dest", type=Path, required=True, help="Destination folder.")
+    watch_parser.add_argument("--settings", type=Path, default=None, help="Settings (.snpg) file. Defaults to the GUI's current settings.")
+    watch_parser.add_argument("--workers", type=int, default=default_workers(), help="Number of workers.")
+    watch_parser.add_argument("--backend", choices=[b.value for b in ExecutionBackend], default=ExecutionBackend.PROCESS.value)
+    watch_parser.add_argument("--export", action="store_true", help="Also write labeled images, and the segmentation data CSV when stopped.")
+    watch_parser.add_argument("--no-cache", action="store_true", help="Process every page, even if a cached result exists.")
+    watch_parser.add_argument("--keep-stages", action="store_true", help="Store and reuse intermediate stages, so re-runs after filter or measurement setting changes are faster.")
+    watch_parser.add_argument("--keep-samples", action="store_true", help="Keep each axon's thickness samples in the .seg files, so they can be re-measured later.")
+    watch_parser.add_argument("--reference-images", action="store_true", help="Store the source image's path and digest in the .seg files instead of its pixels.")
+    watch_parser.add_argument("--interval", type=float, default=WatchWorker.poll_interval, help="Seconds between folder scans.")
+    watch_parser.set_defaults(func=watch_command)
+
+    remeasure_parser = subparsers.add_parser("remeasure", help="Re-measure thickness in .seg files at another percentile.")
+    remeasure_parser.add_argument("segs", nargs="+", type=Path, help=".seg files and/or directories of .seg files.")
+    remeasure_parser.add_argument("--percentile", type=int, required=True, help="New thickness percentile.")
+    remeasure_parser.add_argument("--workers", type=int, default=default_workers(), help="Number of workers.")
+    remeasure_parser.set_defaults(func=remeasure_command)
+
+    seg_benchmark_parser = subparsers.add_parser("seg-benchmark", help="Compare .seg container and pickle sizes and load times.")
+    seg_benchmark_parser.add_argument("segs", nargs="+", type=Path, help=".seg files and/or directories of .seg files.")
+    seg_benchmark_parser.add_argument("--repeat", type=int, default=3, help="Runs per format (the best run is reported).")
+    seg_benchmark_parser.set_defaults(func=seg_benchmark_command)
+
+    cache_parser = subparsers.add_parser("cache", help="Show or clear the segmentation result cache.")
+    cache_parser.add_argument("--clear", action="store_true", help="Delete every cached result and stored stage.")
+    cache_parser.set_defaults(func=cache_command)
+
+    catalog_parser = subparsers.add_parser("catalog", help="Index .seg files in the results catalog, and query or export axons.")
+    catalog_subparsers = catalog_parser.add_subparsers(dest="action", required=True)
+    catalog_import_parser = catalog_subparsers.add_parser("import", help="Add .seg files (folders are searched recursively).")
+    catalog_import_parser.add_argument("segs", nargs="+", type=Path, help=".seg files and/or directories.")
+    catalog_subparsers.add_parser("refresh", help="Re-index changed files and remove missing ones.")
+    catalog_query_parser = catalog_subparsers.add_parser("query", help="Count or export matching axons.")
+    catalog_query_parser.add_argument("--all", action="store_true", help="Include deselected axons.")
+    catalog_query_parser.add_argument("--min", type=parse_bound, action="append", default=[], metavar="METRIC=VALUE", help=f"Lower bound (inclusive). Metrics: {', '.join(METRIC_COLUMNS)}.")
+    catalog_query_parser.add_argument("--max", type=parse_bound, action="append", default=[], metavar="METRIC=VALUE", help="Upper bound (inclusive).")
+    catalog_query_parser.add_argument("--units", choices=["um", "nm"], default="um", help="Unit of length bounds and exported lengths.")
+    catalog_query_parser.add_argument("--image", default="", help="Glob pattern of image file names.")
+    catalog_query_parser.add_argument("--folder", type=Path, default=None, help="Only include .seg files in this folder.")
+    catalog_query_parser.add_argument("--export", type=Path, default=None, help="Write the matching axons to this CSV file.")
+    catalog_parser.set_defaults(func=catalog_command)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Convert legacy (pickled) .seg files to the binary format (folders are searched recursively).")
+    migrate_parser.add_argument("segs", nargs="+", type=Path, help=".seg files and/or directories.")
+    migrate_parser.add_argument("--workers", type=int, default=default_workers(), help="Number of workers.")
+    migrate_parser.add_argument("--keep-legacy", action="store_true", help="Keep a copy of each pickle next to its migrated file (<name>.seg.legacy).")
+    migrate_parser.add_argument("--retry-failed", action="store_true", help="Retry files that failed in an earlier run, even if they did not change.")
+    migrate_parser.set_defaults(func=migrate_command)
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Compare execution backends on a fixed image set.")
+    add_common(benchmark_parser)
+    benchmark_parser.add_argument("--backends", nargs="+", choices=[b.value for b in ExecutionBackend], default=[b.value for b in ExecutionBackend])
+    benchmark_parser.add_argument("--repeat", type=int, default=3, help="Runs per backend (the best run is reported).")
+    benchmark_parser.set_defaults(func=benchmark_command)
+
+    return parser
+
+def main() -> int:
+    args = build_parser().parse_args()
+    return args.func(args)
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from models import SegmentationData, ContourData
+from models import SegmentationData, ContourData, FileMan
 
 from PIL import Image, ImageFont, ImageDraw
 from pathlib import Path
@@ -6,100 +6,124 @@ import numpy.typing as npt
 import numpy as np
 import cv2
 
-def get_csv_lines(seg_data_list: list[SegmentationData], 
-                  font_path: Path, 
+def get_display_name(img_filename: str, page: int = 0, page_count: int = 1) -> str:
+    """Returns the image name used in CSV data (includes the page for multi-page images)."""
+    if page_count > 1:
+        return f"{img_filename} [page {page + 1}]"
+    return img_filename
+
+def get_selected_contour_data(seg_data: SegmentationData) -> list[ContourData]:
+    """Returns the contour data of the selected axons only."""
+    included_ids = [ID for ID, keep in enumerate(seg_data.selected_states) if keep] # ID is zero-indexed
+    return [c for ID, c in enumerate(seg_data.contour_data) if ID in included_ids] # use enumerate() to get the IDs
+
+def get_labeled_image_name(seg_data: SegmentationData, formatted_datetime: str) -> str:
+    """Returns the file name of the given segmentation's labeled image."""
+    name, extension = seg_data.img_filename.split(".")
+    if extension == "":
+        extension = ".tif" # default .tif
+    name += FileMan.page_suffix(seg_data.page, seg_data.page_count)
+    return f"{name}_labeled_{formatted_datetime}.{extension}"
+
+def draw_labeled_image(seg_data: SegmentationData, font_path: Path) -> npt.NDArray:
+    """Draw the selected axons' contours and numbers on the segmentation's image."""
+    display_img = seg_data.image.copy()
+    reindexed_contour_data = get_selected_contour_data(seg_data)
+
+    # draw contours
+    for c in reindexed_contour_data:
+        color = (0, 255, 0)
+        cv2.drawContours(display_img, [c.inner_contour], -1, color, 2)
+        cv2.drawContours(display_img, [c.outer_contour], -1, color, 2)
+
+    # draw text
+    img_h = display_img.shape[0]
+    img_w = display_img.shape[1]
+    draw_scale = int(8 * max(img_h, img_w) / 4096)
+    line_spacing = 14*draw_scale
+    out_pil = Image.fromarray(cv2.cvtColor(display_img, cv2.COLOR_BGR2RGB))
+    font = ImageFont.truetype(font_path, max(15, int(15 * draw_scale)))
+    draw = ImageDraw.Draw(out_pil)
+    for i, c in enumerate(reindexed_contour_data):
+        M = cv2.moments(c.inner_contour)
+        if M["m00"] == 0:
+            continue
+        cx = int(M["m10"] / M["m00"])
+        cy = int(M["m01"] / M["m00"] - 6*draw_scale)
+
+        if max(img_h, img_w) < 512:
+            x_corr = 5 * max(1, draw_scale)
+            y_corr = 10 * max(1, line_spacing)
+        else:
+            x_corr = 5 * draw_scale
+            y_corr = 0.5 * line_spacing
+
+        ID = i + 1
+        label = f"#{ID}"
+
+        color = (255, 255, 255)
+        def draw_shadow_text(dx,dy):
+            draw.text((int(cx-x_corr*len(label))+dx, cy-y_corr+dy), label, font=font, fill=color)
+        for dx,dy in [(-2,-2),(2,-2),(2,2),(-2,2)]:
+            draw_shadow_text(dx,dy)
+        color = (0, 0, 0)
+        draw.text((int(cx-x_corr*len(label)), cy-y_corr), label, font=font, fill=color)
+
+    return cv2.cvtColor(np.array(out_pil), cv2.COLOR_RGB2BGR)
+
+def get_csv_summary_lines(axon_counts: list[tuple[str, int]]) -> list[str]:
+    """Generate the CSV summary table from `(image name, number of axons)` pairs."""
+    csv_lines: list[str] = []
+    csv_lines.append(f"Image,Axons found\n")
+    for filename, count in axon_counts:
+        csv_lines.append(f"{filename},{count}\n")
+    csv_lines.append(f"Total,{sum([count for _, count in axon_counts])}\n")
+    csv_lines.append("\n")
+    return csv_lines
+
+def get_csv_section_lines(filename: str, data: list[ContourData], preferred_units: str) -> list[str]:
+    """Generate the CSV table of one image's axons."""
+    csv_lines: list[str] = []
+    csv_lines.append(f"{filename}\n")
+    csv_lines.append(f"Axon #,G-ratio,Circularity,Inner diameter ({preferred_units}),Outer diameter ({preferred_units}),Myelin Thickness ({preferred_units})\n")
+    for axon_id, c in enumerate(data):
+        gratio = c.g_ratio
+        circularity = c.circularity
+        inner_dia = c.inner_diameter # nm
+        outer_dia = c.outer_diameter # nm
+        thickness = c.thickness # nm
+        if preferred_units == "um":
+            inner_dia /= 1000.0
+            outer_dia /= 1000.0
+            thickness /= 1000.0
+        csv_lines.append(f"{axon_id + 1},{gratio:.4f},{circularity:.4f},{inner_dia:.4f},{outer_dia:.4f},{thickness:.4f}\n")
+    csv_lines.append("\n")
+    return csv_lines
+
+def get_csv_lines(seg_paths: list[Path],
+                  font_path: Path,
                   formatted_datetime: str
     ) -> tuple[
         list[tuple[str, npt.NDArray]],
         list[str]
     ]:
-    """Generate a CSV representation of the data from `SegmentationData` objects."""
+    """
+    Generate a CSV representation of the data in the given .SEG files, and their labeled images.
+    Files are read one at a time, so only one file's image is decoded at any time.
+    """
+    from seg_format import read_seg_file
     out_imgs: list[tuple[str, npt.NDArray]] = []
     data_lists: list[tuple[str, list[ContourData], str]] = []
-    for seg_data in seg_data_list:
-        # unpack data
-        img_filename = seg_data.img_filename
-        display_img = seg_data.image.copy()
-        contour_data = seg_data.contour_data
-        selected_states = seg_data.selected_states
-        
-        # reindex selected contours
-        included_ids = [ID for ID, keep in enumerate(selected_states) if keep] # ID is zero-indexed
-        reindexed_contour_data = [c for ID, c in enumerate(contour_data) if ID in included_ids] # use enumerate() to get the IDs
-
-        # draw contours
-        for c in reindexed_contour_data:
-            M = cv2.moments(c.inner_contour)
-            if M["m00"] != 0:
-                cx = int(M["m10"] / M["m00"])
-                cy = int(M["m01"] / M["m00"])
-            color = (0, 255, 0)
-            cv2.drawContours(display_img, [c.inner_contour], -1, color, 2)
-            cv2.drawContours(display_img, [c.outer_contour], -1, color, 2)
-
-        # draw text
-        img_h = display_img.shape[0]
-        img_w = display_img.shape[1]
-        draw_scale = int(8 * max(img_h, img_w) / 4096)
-        line_spacing = 14*draw_scale
-        out_pil = Image.fromarray(cv2.cvtColor(display_img, cv2.COLOR_BGR2RGB))
-        font = ImageFont.truetype(font_path, max(15, int(15 * draw_scale)))
-        draw = ImageDraw.Draw(out_pil)
-        for i, c in enumerate(reindexed_contour_data):
-            M = cv2.moments(c.inner_contour)
-            if M["m00"] == 0:
-                continue
-            cx = int(M["m10"] / M["m00"])
-            cy = int(M["m01"] / M["m00"] - 6*draw_scale)
-
-            if max(img_h, img_w) < 512:
-                x_corr = 5 * max(1, draw_scale)
-                y_corr = 10 * max(1, line_spacing)
-            else:
-                x_corr = 5 * draw_scale
-                y_corr = 0.5 * line_spacing
-
-            ID = i + 1
-            label = f"#{ID}"
-
-            color = (255, 255, 255)
-            def draw_shadow_text(dx,dy):
-                draw.text((int(cx-x_corr*len(label))+dx, cy-y_corr+dy), label, font=font, fill=color)
-            for dx,dy in [(-2,-2),(2,-2),(2,2),(-2,2)]:
-                draw_shadow_text(dx,dy)
-            color = (0, 0, 0)
-            draw.text((int(cx-x_corr*len(label)), cy-y_corr), label, font=font, fill=color)
-            
-        display_img = cv2.cvtColor(np.array(out_pil), cv2.COLOR_RGB2BGR)
-        
-        name, extension = img_filename.split(".")
-        if extension == "":
-            extension = ".tif" # default .tif
-        out_imgs.append((f"{name}_labeled_{formatted_datetime}.{extension}", display_img))
-        data_lists.append((img_filename, reindexed_contour_data, seg_data.preferred_units))
-        
-    csv_lines: list[str] = []
-
-    csv_lines.append(f"Image,Axons found\n")
-    for filename, data, _ in data_lists:
-        csv_lines.append(f"{filename},{len(data)}\n")
-    csv_lines.append(f"Total,{sum([len(data) for _,data,_ in data_lists])}\n")
-    csv_lines.append("\n")
+    for seg_path in seg_paths:
+        seg_data = read_seg_file(seg_path)
+        out_imgs.append((
+            get_labeled_image_name(seg_data, formatted_datetime),
+            draw_labeled_image(seg_data, font_path)
+        ))
+        data_lists.append((get_display_name(seg_data.img_filename, seg_data.page, seg_data.page_count), get_selected_contour_data(seg_data), seg_data.preferred_units))
 
+    csv_lines = get_csv_summary_lines([(filename, len(data)) for filename, data, _ in data_lists])
     for filename, data, preferred_units in data_lists:
-        csv_lines.append(f"{filename}\n")
-        csv_lines.append(f"Axon #,G-ratio,Circularity,Inner diameter ({preferred_units}),Outer diameter ({preferred_units}),Myelin Thickness ({preferred_units})\n")
-        for axon_id, c in enumerate(data):
-            gratio = c.g_ratio
-            circularity = c.circularity
-            inner_dia = c.inner_diameter # nm
-            outer_dia = c.outer_diameter # nm
-            thickness = c.thickness # nm
-            if preferred_units == "um":
-                inner_dia /= 1000.0
-                outer_dia /= 1000.0
-                thickness /= 1000.0
-            csv_lines.append(f"{axon_id + 1},{gratio:.4f},{circularity:.4f},{inner_dia:.4f},{outer_dia:.4f},{thickness:.4f}\n")
-        csv_lines.append("\n")
-
-    return out_imgs, csv_lines
\ No newline at end of file
+        csv_lines.extend(get_csv_section_lines(filename, data, preferred_units))
+
+    return out_imgs, csv_lines
@@ -1,5 +1,6 @@
-from models import ContourData
+from models import ContourData, ThicknessSamples
 
+from pydantic import BaseModel, ConfigDict
 from PIL import Image, ImageFont, ImageDraw
 from imgproc.stop_event import StopEvent
 from pathlib import Path
@@ -10,6 +11,9 @@ import math
 
 import time
 
+ALGORITHM_VERSION = 1
+"""Version of the segmentation algorithm. Bump it whenever a change affects results, so cached results are discarded."""
+
 def clamp(x, lower, upper):
     """Clamps `x` between `lower` and `upper`."""
     return max(lower, min(upper, x))
@@ -26,39 +30,42 @@ def convexness(contour, hull):
     hull_area = cv2.contourArea(hull)
     return contour_area/hull_area
 
-def process_image(
-        input_image: npt.NDArray, 
+class PipelineStages(BaseModel):
+    """
+    Intermediate results of `process_image`. Stages that are given are not recomputed, 
+    so only the stages downstream of changed settings have to run again. Missing stages are filled in.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    eroded: npt.NDArray[np.uint8] | None = None
+    """Binary (`0`/`255`) mask after thresholding and morphology (depends on `threshold`, `radius`, `dilate`, `erode`)."""
+
+    contours: list[npt.NDArray[np.int32]] | None = None
+    """All contours of `eroded`."""
+
+    filtered_ids: list[int] | None = None
+    """Indices of the `contours` that pass the edge, size, convexity and circularity filters."""
+
+def threshold_stage(
+        input_image: npt.NDArray,
         resolution_divisor: float,
-        show_thresholded: bool,
-        show_text: bool,
-        nm_per_pixel: float,
-        thresh_val: int, 
-        radius_val: int, 
-        dilate: int, 
-        erode: int, 
-        min_size: float, 
-        max_size: float, 
-        convex_thresh: float, 
-        circ_thresh: float,
-        thickness_percentile: int,
-        stop_event: StopEvent,
-        font_path: Path | None,
-        verbose = False,
-        timed = False
-    ) -> tuple[npt.NDArray, list[ContourData] | None]:
+        thresh_val: int,
+        radius_val: int,
+        dilate: int,
+        erode: int,
+        stop_event: StopEvent
+    ) -> npt.NDArray | None:
+    """
+    Smooth, threshold and clean up the grayscale image.
+    Returns:
+        eroded (NDArray | None): Binary mask, or `None` if stopped.
+    """
     h = input_image.shape[0]
     w = input_image.shape[1]
     total_image_area: float = float(h * w)
     linear_correction_ratio = 1.0 / resolution_divisor
     dilate = round(dilate * linear_correction_ratio)
     erode = round(erode * linear_correction_ratio)
-    
-    if timed:
-        very_start_time = time.perf_counter()
-        if verbose:
-            print()
-            print("thresholding")
-            start_time = very_start_time
 
     # Threshold image (binary)
     kernel = create_circular_kernel(radius_val)
@@ -69,7 +76,7 @@ def process_image(
     
     if stop_event.is_set(): # STOPCHECK!!
         print("process_image: Exited @1")
-        return np.zeros(0), None
+        return None
 
     # Remove small black features
     inverted = cv2.bitwise_not(thresh)
@@ -77,7 +84,7 @@ def process_image(
     for c in contours:
         if stop_event.is_set(): # STOPCHECK!!
             print("process_image: Exited @2")
-            return np.zeros(0), None
+            return None
         
         area_proportion = cv2.contourArea(c) / total_image_area
         if area_proportion < 0.0006:
@@ -99,7 +106,7 @@ def process_image(
     
     if stop_event.is_set(): # STOPCHECK!!
         print("process_image: Exited @3")
-        return np.zeros(0), None
+        return None
 
     # Dilate image
     erode_size = max(1, int(erode))
@@ -111,32 +118,35 @@ def process_image(
     
     if stop_event.is_set(): # STOPCHECK!!
         print("process_image: Exited @4")
-        return np.zeros(0), None
+        return None
 
-    if show_thresholded:
-        return eroded, None # None means don't analyze data
-    
-    if timed:
-        if verbose:
-            now = time.perf_counter()
-            print(f"thresh took {now-start_time}s") # type: ignore
-            print("getting contours")
-            start_time = now
+    return eroded
+
+def filter_stage(
+        eroded: npt.NDArray,
+        contours: list[npt.NDArray],
+        min_size: float, 
+        max_size: float, 
+        convex_thresh: float, 
+        circ_thresh: float,
+        stop_event: StopEvent
+    ) -> list[int] | None:
+    """
+    Keep the contours that could be axons.
+    Returns:
+        filtered_ids (list[int] | None): Indices of the remaining `contours`, or `None` if stopped.
+    """
+    h = eroded.shape[0]
+    w = eroded.shape[1]
+    total_image_area: float = float(h * w)
 
-    # Find contours
-    contours, _ = cv2.findContours(eroded, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
-    
-    if stop_event.is_set(): # STOPCHECK!!
-        print("process_image: Exited @5")
-        return np.zeros(0), None
-    
     # Filter contours by size and convexness
-    filtered_contours = []
+    filtered_ids: list[int] = []
     kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-    for c in contours:
+    for i, c in enumerate(contours):
         if stop_event.is_set(): # STOPCHECK!!
             print("process_image: Exited @6")
-            return np.zeros(0), None
+            return None
         
         # Check if contour touches edge of image
         if np.any(c[:, 0, 0] <= 1) or np.any(c[:, 0, 0] >= (w-2)) or \
@@ -174,7 +184,191 @@ def process_image(
         if circularity < circ_thresh:
             continue
 
-        filtered_contours.append(c)
+        filtered_ids.append(i)
+
+    return filtered_ids
+
+def simplify_contour(contour: npt.NDArray) -> npt.NDArray:
+    """Drop the interior points of straight runs (like `CHAIN_APPROX_SIMPLE`). The filled polygon is unchanged."""
+    points = contour.reshape(-1, 2)
+    if len(points) < 3:
+        return contour
+    steps = np.diff(points, axis=0, append=points[:1])
+    keep = np.any(steps != np.roll(steps, 1, axis=0), axis=1)
+    return points[keep].reshape(-1, 1, 2).astype(np.int32)
+
+def measure_axon(
+        ID: int,
+        dist: npt.NDArray,
+        smallest: npt.NDArray,
+        thickness_percentile: int,
+        x_min: int,
+        y_min: int,
+        nm_per_pixel: float,
+        resolution_divisor: float,
+        samples: ThicknessSamples | None = None
+    ) -> tuple[ContourData, list[npt.NDArray], list[npt.NDArray]] | None:
+    """
+    Measure the myelin around one axon from the distance transform of its cropped search area (`dist`, offset by 
+    `x_min`, `y_min`) and its smallest distance samples to neighboring edges.
+    Returns:
+        contour_data (ContourData): The axon's measurements (`samples` attached, if given).
+        inner_contours (list[NDArray]): All inner myelin contours found (for drawing).
+        outer_contours (list[NDArray]): All outer myelin contours found (for drawing).
+        Or `None` if no myelin contour was found.
+    """
+    TWO_PI = 2 * math.pi
+    thickness_px = np.percentile(smallest, thickness_percentile) # type: ignore
+
+    offset = np.array([[[x_min, y_min]]])
+
+    offset_mask = (dist <= thickness_px).astype(np.uint8) * 255
+    outer_contour, _ = cv2.findContours(offset_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    dist_inner = cv2.distanceTransform(offset_mask, cv2.DIST_L2, 5)
+    offset_mask_eroded = (dist_inner > thickness_px).astype(np.uint8) * 255
+    inner_contour, _ = cv2.findContours(offset_mask_eroded, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if len(outer_contour) == 0 or len(inner_contour) == 0:
+        return None
+    outer_contour = [c + offset for c in outer_contour]
+    inner_contour = [c + offset for c in inner_contour]
+
+    # Calculate g-ratio & circularity
+    inner_contour_perimeter = cv2.arcLength(inner_contour[0], True)
+    inner_radius = inner_contour_perimeter / TWO_PI
+
+    g_ratio = inner_radius / (inner_radius + thickness_px)
+    circularity = (
+        4 * math.pi * cv2.contourArea(inner_contour[0]) / (inner_contour_perimeter ** 2)
+        if inner_contour_perimeter != 0 else 0
+    )
+
+    inner_diameter = (2 * inner_radius) * nm_per_pixel * resolution_divisor
+    outer_diameter = inner_diameter + (2 * thickness_px) * nm_per_pixel * resolution_divisor
+    thickness = thickness_px * nm_per_pixel * resolution_divisor
+
+    contour_data = ContourData(
+        ID=ID,
+        inner_contour=inner_contour[0],
+        outer_contour=outer_contour[0],
+        g_ratio=float(g_ratio),
+        circularity=float(circularity),
+        inner_diameter=float(inner_diameter),
+        outer_diameter=float(outer_diameter),
+        thickness=float(thickness),
+        samples=samples
+    )
+    return contour_data, inner_contour, outer_contour
+
+def remeasure_contour(contour_data: ContourData, thickness_percentile: int) -> ContourData | None:
+    """
+    Re-measure an axon at another thickness percentile from its kept `samples` (no image needed).
+    Returns:
+        contour_data (ContourData | None): The new measurements, or `None` if the axon has no samples or no myelin contour was found.
+    """
+    samples = contour_data.samples
+    if samples is None:
+        return None
+    x_min, y_min, w, h = samples.crop
+    cropped_mask = np.zeros((h, w), dtype=np.uint8)
+    cv2.drawContours(cropped_mask, [samples.axon_contour], -1, 255, cv2.FILLED, offset=(-x_min, -y_min))
+    dist = cv2.distanceTransform(255 - cropped_mask, cv2.DIST_L2, 5)
+    measured = measure_axon(
+        contour_data.ID,
+        dist,
+        samples.distances,
+        thickness_percentile,
+        x_min,
+        y_min,
+        samples.nm_per_pixel,
+        samples.resolution_divisor,
+        samples
+    )
+    return measured[0] if measured is not None else None
+
+def process_image(
+        input_image: npt.NDArray, 
+        resolution_divisor: float,
+        show_thresholded: bool,
+        show_text: bool,
+        nm_per_pixel: float,
+        thresh_val: int, 
+        radius_val: int, 
+        dilate: int, 
+        erode: int, 
+        min_size: float, 
+        max_size: float, 
+        convex_thresh: float, 
+        circ_thresh: float,
+        thickness_percentile: int,
+        stop_event: StopEvent,
+        font_path: Path | None,
+        verbose = False,
+        timed = False,
+        timings: dict[str, float] | None = None,
+        stages: PipelineStages | None = None,
+        keep_samples: bool = False
+    ) -> tuple[npt.NDArray, list[ContourData] | None]:
+    """
+    Segment myelinated axons in the given grayscale image.
+    If a `timings` dict is given, it is filled with per-stage durations in seconds (`threshold`, `contours`, 
+    `measure`), the number of raw contours found (`raw_contours`) and whether the time budget was hit (`budget_hit`).
+    If `stages` is given, its intermediate results are reused, and the ones that were computed are stored in it.
+    If `keep_samples` is set, each axon's `ThicknessSamples` are attached, so it can be re-measured later (`remeasure_contour`).
+    """
+    stage_start_time = time.perf_counter()
+    if stages is None:
+        stages = PipelineStages()
+    
+    if timed:
+        very_start_time = time.perf_counter()
+        if verbose:
+            print()
+            print("thresholding")
+            start_time = very_start_time
+
+    # Threshold image (binary) and clean it up
+    if stages.eroded is None:
+        eroded = threshold_stage(input_image, resolution_divisor, thresh_val, radius_val, dilate, erode, stop_event)
+        if eroded is None:
+            return np.zeros(0), None
+        stages.eroded = eroded
+    eroded = stages.eroded
+
+    if timings is not None:
+        now = time.perf_counter()
+        timings["threshold"] = now - stage_start_time
+        stage_start_time = now
+
+    if show_thresholded:
+        return eroded, None # None means don't analyze data
+    
+    if timed:
+        if verbose:
+            now = time.perf_counter()
+            print(f"thresh took {now-start_time}s") # type: ignore
+            print("getting contours")
+            start_time = now
+
+    # Find contours
+    if stages.contours is None:
+        contours, _ = cv2.findContours(eroded, cv2.RETR_TREE, cv2.CHAIN_APPROX_NONE)
+        stages.contours = list(contours)
+    contours = stages.contours
+    if timings is not None:
+        timings["raw_contours"] = len(contours)
+    
+    if stop_event.is_set(): # STOPCHECK!!
+        print("process_image: Exited @5")
+        return np.zeros(0), None
+    
+    # Filter contours by size and convexness
+    if stages.filtered_ids is None:
+        filtered_ids = filter_stage(eroded, contours, min_size, max_size, convex_thresh, circ_thresh, stop_event)
+        if filtered_ids is None:
+            return np.zeros(0), None
+        stages.filtered_ids = filtered_ids
+    filtered_contours = [contours[i] for i in stages.filtered_ids]
     
     # Create output color image for visualization
     if font_path is not None:
@@ -192,6 +386,11 @@ def process_image(
 
     # return all_contours_mask, []
     
+    if timings is not None:
+        now = time.perf_counter()
+        timings["contours"] = now - stage_start_time
+        stage_start_time = now
+
     if timed:
         now = time.perf_counter()
         if verbose:
@@ -288,41 +487,27 @@ def process_image(
         else:
             smallest = np.partition(nonzero_vals, n - 1)[:n]
 
-        thickness_px = np.percentile(smallest, thickness_percentile) # type: ignore
-
-        ### generate visualization ###
-        offset = np.array([[[x_min, y_min]]])
+        samples = None
+        if keep_samples:
+            samples = ThicknessSamples(
+                distances=smallest.astype(np.float32),
+                axon_contour=simplify_contour(contour),
+                crop=(x_min, y_min, x_max - x_min, y_max - y_min),
+                nm_per_pixel=nm_per_pixel,
+                resolution_divisor=resolution_divisor
+            )
 
-        offset_mask = (dist <= thickness_px).astype(np.uint8) * 255
-        outer_contour, _ = cv2.findContours(offset_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        outer_contour += offset
+        # thickness, outer/inner myelin contours, g-ratio & circularity
+        measured = measure_axon(i + 1, dist, smallest, thickness_percentile, x_min, y_min, nm_per_pixel, resolution_divisor, samples)
         
         if stop_event.is_set(): # STOPCHECK!!
             print("process_image: Exited @11")
             return np.zeros(0), None
 
-        dist_inner = cv2.distanceTransform(offset_mask, cv2.DIST_L2, 5)
-        offset_mask_eroded = (dist_inner > thickness_px).astype(np.uint8) * 255
-        inner_contour, _ = cv2.findContours(offset_mask_eroded, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        inner_contour += offset
-        
-        if stop_event.is_set(): # STOPCHECK!!
-            print("process_image: Exited @12")
-            return np.zeros(0), None
-
-        # Calculate g-ratio & circularity
-        inner_contour_perimeter = cv2.arcLength(inner_contour[0], True)
-        inner_radius = inner_contour_perimeter / TWO_PI
-
-        g_ratio = inner_radius / (inner_radius + thickness_px)
-        circularity = (
-            4 * math.pi * cv2.contourArea(inner_contour[0]) / (inner_contour_perimeter ** 2)
-            if inner_contour_perimeter != 0 else 0
-        )
-
-        inner_diameter = (2 * inner_radius) * nm_per_pixel * resolution_divisor
-        outer_diameter = inner_diameter + (2 * thickness_px) * nm_per_pixel * resolution_divisor
-        thickness = thickness_px * nm_per_pixel * resolution_divisor
+        if measured is None:
+            continue
+        contour_data, inner_contour, outer_contour = measured
+        g_ratio = contour_data.g_ratio
 
         # Draw contours on output image
         if font is not None:
@@ -384,16 +569,7 @@ def process_image(
                 return np.zeros(0), None
 
         # Store results
-        data.append(ContourData(
-            ID = i + 1,
-            inner_contour=inner_contour[0],
-            outer_contour=outer_contour[0],
-            g_ratio=float(g_ratio),
-            circularity=float(circularity),
-            inner_diameter=float(inner_diameter),
-            outer_diameter=float(outer_diameter),
-            thickness=float(thickness)
-        ))
+        data.append(contour_data)
 
         # give up if taking too long (>5s)
         if timed:
@@ -422,6 +598,9 @@ def process_image(
         draw_text("resolution divider", 0, 6*size, (0,0,0), font, shadow=True)
         draw_text("or minimum size)", 0, 7.5*size, (0,0,0), font, shadow=True)
         out_img = cv2.cvtColor(np.array(out_pil), cv2.COLOR_RGB2BGR)
+        if timings is not None:
+            timings["measure"] = time.perf_counter() - stage_start_time
+            timings["budget_hit"] = True
         return out_img, data
     
     if timed:
@@ -429,4 +608,8 @@ def process_image(
             now = time.perf_counter()
             print(f"drawing took {now-start_time}s") # type: ignore
     
+    if timings is not None:
+        timings["measure"] = time.perf_counter() - stage_start_time
+        timings["budget_hit"] = give_up
+    
     return out_img, data
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""Re-measure myelin thickness in existing .SEG files at another percentile, from the `ThicknessSamples` they kept."""
+from imgproc.process_image import remeasure_contour
+
+from models import SegmentationData, ContourData
+
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Iterator
+from pydantic import BaseModel
+from pathlib import Path
+import multiprocessing
+import traceback
+
+class RemeasureResult(BaseModel):
+    """Outcome of re-measuring one .SEG file."""
+
+    seg_path: Path
+    """Re-measured .SEG file."""
+
+    remeasured: int = 0
+    """Number of axons that were re-measured (`0` if the file was left unchanged)."""
+
+    skipped: int = 0
+    """Number of axons that can't be re-measured (no kept samples, or no myelin contour at the new percentile)."""
+
+    warning: str | None = None
+    """Why the file was left unchanged, if some of its axons can't be re-measured."""
+
+    error: str | None = None
+    """Error message, if the file could not be read or written."""
+
+def remeasure_segmentation(seg_data: SegmentationData, thickness_percentile: int) -> tuple[int, int]:
+    """
+    Re-measure every axon of the given segmentation in place. Axon IDs and selections are kept.
+    If any axon can't be re-measured, the segmentation is left unchanged, so its thickness values
+    are never a mix of two percentiles.
+    Returns:
+        remeasured (int): Number of axons that were re-measured.
+        skipped (int): Number of axons that can't be re-measured.
+    """
+    contour_data: list[ContourData] = []
+    remeasured = 0
+    for c in seg_data.contour_data:
+        new_c = remeasure_contour(c, thickness_percentile)
+        if new_c is None:
+            contour_data.append(c)
+        else:
+            contour_data.append(new_c)
+            remeasured += 1
+    skipped = len(contour_data) - remeasured
+    if skipped > 0:
+        return 0, skipped
+    seg_data.contour_data = contour_data
+    seg_data.thickness_percentile = thickness_percentile
+    return remeasured, 0
+
+def remeasure_seg_file(args: tuple[Path, int]) -> RemeasureResult:
+    """Re-measure one .SEG file at the given percentile and save it (atomically) if every axon was re-measured."""
+    seg_path, thickness_percentile = args
+    try:
+        seg_data = SegmentationData.from_file(seg_path, None)
+        if seg_data is None:
+            return RemeasureResult(seg_path=seg_path, error="Could not read segmentation file.")
+        remeasured, skipped = remeasure_segmentation(seg_data, thickness_percentile)
+        if skipped > 0:
+            return RemeasureResult(
+                seg_path=seg_path,
+                skipped=skipped,
+                warning=(
+                    f"{skipped} of {len(seg_data.contour_data)} axons can't be re-measured at percentile {thickness_percentile} "
+                    "(processed without 'Keep Thickness Samples', or no myelin at this percentile)."
+                )
+            )
+        if remeasured > 0:
+            seg_data.to_file(seg_path)
+        return RemeasureResult(seg_path=seg_path, remeasured=remeasured)
+    except Exception:
+        return RemeasureResult(seg_path=seg_path, error=traceback.format_exc(limit=1))
+
+def remeasure_files(seg_paths: list[Path], thickness_percentile: int, workers: int = 1) -> Iterator[RemeasureResult]:
+    """
+    Re-measure the given .SEG files, in parallel if `workers > 1` (spawned processes, so it is safe to call from the GUI).
+    Yields results in the given order.
+    """
+    jobs = [(path, thickness_percentile) for path in seg_paths]
+    if workers <= 1:
+        yield from map(remeasure_seg_file, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield from pool.map(remeasure_seg_file, jobs, chunksize=max(1, len(jobs) // (4 * workers)))
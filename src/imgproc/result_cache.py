@@ -0,0 +1,170 @@
+"""Content-addressed cache of segmentation results, so identical images with identical settings are only processed once."""
+from imgproc.process_image import ALGORITHM_VERSION
+
+from models import Settings, ContourData, FileMan
+
+from collections import OrderedDict
+from pathlib import Path
+import numpy.typing as npt
+import threading
+import hashlib
+import pickle
+import os
+
+result_cache_path = FileMan.resource_path("__appdata__/result_cache")
+
+def image_digest(image: npt.NDArray) -> str:
+    """Returns a hash of the given decoded image's pixels."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{image.shape}|{image.dtype}|".encode())
+    h.update(memoryview(image).cast("B") if image.flags.c_contiguous else image.tobytes())
+    return h.hexdigest()
+
+def result_cache_key(image_digest: str, settings: Settings) -> str:
+    """
+    Returns the cache key of processing a decoded (full resolution) image with the given settings:
+    a hash of the image's `image_digest`, the settings that affect results, and `ALGORITHM_VERSION`.
+    """
+    return hashlib.blake2b(
+        f"{ALGORITHM_VERSION}|{settings.processing_hash()}|{image_digest}".encode(),
+        digest_size=20
+    ).hexdigest()
+
+class CacheStats():
+    """Hit/miss counters of a cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.last_hit = False
+
+    def record(self, hit: bool):
+        self.last_hit = hit
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def __str__(self) -> str:
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total > 0 else 0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
+
+class MemoryResultCache():
+    """In-memory LRU cache (first tier), bounded by the approximate size of its entries."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[object, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> object | None:
+        """Returns the cached value (and marks it as recently used), or `None`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            self.stats.record(entry is not None)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, value: object, size: int):
+        """Add a value of the given approximate size (bytes), evicting the least recently used entries."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+class DiskResultCache():
+    """
+    On-disk cache (second tier) of contour data, shared by every batch worker process, the CLI and tuning.
+    Also used by `StageCache` to store intermediate stages.
+    Entries are written atomically, so concurrent writers are safe. When the cache grows past
+    `max_bytes`, the least recently used entries (by modification time, refreshed on hits) are deleted.
+    """
+
+    def __init__(self, cache_dir: Path = result_cache_path, max_bytes: int = 1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.pkl"
+
+    def get(self, key: str) -> list[ContourData] | None:
+        """Returns the cached contour data, or `None`."""
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                contour_data = pickle.load(f)
+            os.utime(path) # mark as recently used
+        except Exception:
+            self.stats.record(False)
+            return None
+        self.stats.record(True)
+        return contour_data
+
+    def put(self, key: str, contour_data: list[ContourData]):
+        """Store contour data. Failing to write is not an error, since the cache is only an optimization."""
+        path = self._entry_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(contour_data, f)
+            tmp_path.replace(path)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+
+    def usage(self) -> tuple[int, int]:
+        """
+        Returns:
+            entries (int): Number of cached results.
+            size (int): Total size in bytes.
+        """
+        entries, size = 0, 0
+        for path in self.cache_dir.glob("*/*.pkl"):
+            try:
+                size += path.stat().st_size
+                entries += 1
+            except OSError:
+                pass
+        return entries, size
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in `max_bytes`."""
+        files: list[tuple[float, int, Path]] = []
+        total = 0
+        for path in self.cache_dir.glob("*/*"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Delete every cached result."""
+        for path in self.cache_dir.glob("*/*"):
+            path.unlink(missing_ok=True)
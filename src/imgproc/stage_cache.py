@@ -0,0 +1,102 @@
+"""On-disk store of `process_image`'s intermediate stages, so re-runs after downstream setting changes skip the upstream stages."""
+from imgproc.process_image import PipelineStages, ALGORITHM_VERSION
+from imgproc.result_cache import DiskResultCache
+
+from models import Settings, FileMan
+
+from pathlib import Path
+import numpy.typing as npt
+import numpy as np
+import hashlib
+import zlib
+
+stage_cache_path = FileMan.resource_path("__appdata__/stage_cache")
+
+def stage_cache_keys(image_digest: str, settings: Settings) -> tuple[str, str]:
+    """
+    Returns:
+        morphology_key (str): Key of the thresholding/morphology and contour stages (`threshold`, `radius`, `dilate`, `erode`).
+        filter_key (str): Key of the filter stage (additionally `min_size`, `max_size`, `convexity`, `circularity`).
+    """
+    morphology = (
+        f"{ALGORITHM_VERSION}|{image_digest}|{settings.resolution_divisor}|"
+        f"{settings.threshold}|{settings.radius}|{settings.dilate}|{settings.erode}"
+    )
+    filtering = f"{morphology}|{settings.min_size}|{settings.max_size}|{settings.convexity}|{settings.circularity}"
+    return (
+        hashlib.blake2b(morphology.encode(), digest_size=20).hexdigest(),
+        hashlib.blake2b(filtering.encode(), digest_size=20).hexdigest()
+    )
+
+def pack_morphology(eroded: npt.NDArray, contours: list[npt.NDArray]) -> dict:
+    """
+    Compact form of the morphology and contour stages: the mask at 1 bit per pixel, and each contour as its
+    first point followed by 1 byte steps to the next (`findContours` without approximation only moves to neighbors).
+    """
+    lengths = np.array([len(c) for c in contours], dtype=np.int32)
+    starts = np.array([c[0, 0] for c in contours], dtype=np.int32).reshape(-1, 2)
+    steps = [np.diff(c.reshape(-1, 2), axis=0) for c in contours]
+    steps = np.concatenate(steps).astype(np.int8) if steps else np.zeros((0, 2), dtype=np.int8)
+    return {
+        "shape": eroded.shape,
+        "mask": zlib.compress(np.packbits(eroded > 0).tobytes(), 1),
+        "lengths": lengths,
+        "starts": starts,
+        "steps": zlib.compress(steps.tobytes(), 1)
+    }
+
+def unpack_morphology(packed: dict) -> tuple[npt.NDArray, list[npt.NDArray]]:
+    """Restore the mask and contours from `pack_morphology`."""
+    h, w = packed["shape"]
+    bits = np.frombuffer(zlib.decompress(packed["mask"]), dtype=np.uint8)
+    eroded = np.unpackbits(bits, count=h * w).reshape(h, w) * np.uint8(255)
+
+    steps = np.frombuffer(zlib.decompress(packed["steps"]), dtype=np.int8).reshape(-1, 2).astype(np.int32)
+    contours: list[npt.NDArray] = []
+    offset = 0
+    for start, length in zip(packed["starts"], packed["lengths"]):
+        points = np.empty((length, 2), dtype=np.int32)
+        points[0] = start
+        points[1:] = start + np.cumsum(steps[offset:offset + length - 1], axis=0)
+        offset += length - 1
+        contours.append(points.reshape(-1, 1, 2))
+    return eroded, contours
+
+class StageCache():
+    """
+    Persists the morphology/contour stage (keyed by the upstream settings) and the filter stage
+    (keyed by upstream and filter settings) of processed pages. Entries are evicted like `DiskResultCache`'s.
+    """
+
+    def __init__(self, cache_dir: Path = stage_cache_path, max_bytes: int = 2 * 1024 * 1024 * 1024):
+        self.store = DiskResultCache(cache_dir, max_bytes)
+
+    def load(self, image_digest: str, settings: Settings) -> PipelineStages:
+        """Returns the stored stages for the given image and settings (only the ones that match)."""
+        morphology_key, filter_key = stage_cache_keys(image_digest, settings)
+        stages = PipelineStages()
+        packed = self.store.get(morphology_key)
+        if not isinstance(packed, dict):
+            return stages
+        try:
+            stages.eroded, stages.contours = unpack_morphology(packed)
+        except Exception:
+            return PipelineStages() # damaged entry
+        filtered_ids = self.store.get(filter_key)
+        if isinstance(filtered_ids, list):
+            stages.filtered_ids = filtered_ids
+        return stages
+
+    def save(self, image_digest: str, settings: Settings, stages: PipelineStages, loaded: PipelineStages):
+        """Store the stages that were computed (not `loaded`)."""
+        morphology_key, filter_key = stage_cache_keys(image_digest, settings)
+        if loaded.eroded is None and stages.eroded is not None and stages.contours is not None:
+            self.store.put(morphology_key, pack_morphology(stages.eroded, stages.contours)) # type: ignore
+        if loaded.filtered_ids is None and stages.filtered_ids is not None:
+            self.store.put(filter_key, stages.filtered_ids) # type: ignore
+
+    def evict(self):
+        self.store.evict()
+
+    def clear(self):
+        self.store.clear()
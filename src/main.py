@@ -1,7 +1,8 @@
 from PySide6.QtCore import (
     Qt,
     QSize,
-    QEvent
+    QEvent,
+    QThread
 )
 from PySide6.QtGui import (
     QIcon,
@@ -20,6 +21,8 @@ from PySide6.QtWidgets import (
     QStyle,
     QVBoxLayout,
     QMessageBox,
+    QDialog,
+    QInputDialog,
     QSizePolicy
 )
 
@@ -28,12 +31,18 @@ from panels.process.process_panel import ProcessPanel
 from panels.settings.settings_panel import SettingsPanel
 from panels.output.output_panel import OutputPanel
 from panels.menu.menu_bar import MenuBar
+from panels.menu.selection_rule_dialog import SelectionRuleDialog
 from panels.filetabs.file_tabs import FileTabSelector
 from panels.generate.generate_data_dialog import GenerateDataDialog
+from panels.generate.catalog_dialog import CatalogDialog
+from panels.generate.busy_dialog import BusyDialog
+from panels.generate.remeasure_worker import RemeasureWorker
+from panels.generate.migrate_worker import MigrateWorker
 
-from models import AppState, View, Settings, FileMan
+from models import AppState, View, Settings, FileMan, logger
 
 from save_load import load_state, write_state
+from bulk_selection import axon_metrics
 from styles.style_manager import get_style_sheet
 
 from datetime import datetime
@@ -105,6 +114,7 @@ class MainWindow(QMainWindow):
         self.menu_bar.save_settings_triggered.connect(self.save_settings_to_file)
         self.menu_bar.save_image_view_triggered.connect(self.save_image_to_file)
         self.menu_bar.close_files_triggered.connect(self.close_multiple_files)
+        self.menu_bar.migrate_triggered.connect(self.migrate_seg_files)
         self.menu_bar.get_exit_action().triggered.connect(self.close)
         # View signals
         self.menu_bar.theme_changed.connect(self.refresh_style)
@@ -116,6 +126,12 @@ class MainWindow(QMainWindow):
         self.generate_data_dialog = GenerateDataDialog(self)
         self.generate_data_dialog.hide()
         self.menu_bar.gen_seg_data_triggered.connect(self.generate_data_dialog.show)
+        self.catalog_dialog = CatalogDialog(self)
+        self.catalog_dialog.hide()
+        self.menu_bar.catalog_triggered.connect(self.catalog_dialog.show)
+        self.menu_bar.remeasure_triggered.connect(self.remeasure_seg_files)
+        self.menu_bar.select_rule_triggered.connect(self.select_axons_by_rule)
+        self.selection_rule_text = "" # last rule, offered again
         # add to app widget
         self.setMenuBar(self.menu_bar)
 
@@ -241,6 +257,158 @@ class MainWindow(QMainWindow):
         if file_name:
             cv2.imwrite(file_name, display_image)
     
+    def remeasure_seg_files(self):
+        """Show dialogs to re-measure thickness in segmentation files at another percentile."""
+        file_names, _ = QFileDialog.getOpenFileNames(
+            parent=self, 
+            caption="Re-measure Thickness: Select Segmentation File(s)",
+            filter="SEG Files (*.seg)"
+        )
+        if not file_names:
+            return
+        percentile, ok = QInputDialog.getInt(
+            self,
+            "Re-measure Thickness",
+            "Thickness percentile:",
+            self.settings_panel.to_settings().thickness_percentile,
+            0,
+            100
+        )
+        if not ok:
+            return
+        self.image_panel.flush_selection_journal() # re-measuring rewrites the files with the journaled selection
+
+        # busy dialog
+        self.busy_dialog = BusyDialog("Re-measuring thickness…", self)
+        self.busy_dialog.show()
+
+        # threading
+        self.remeasure_thread = QThread(self)
+        self.remeasure_worker = RemeasureWorker(sorted(Path(s) for s in file_names), percentile)
+        self.remeasure_worker.moveToThread(self.remeasure_thread)
+
+        self.remeasure_thread.started.connect(self.remeasure_worker.run)
+        self.remeasure_worker.finished.connect(self._on_remeasure_finished)
+        self.remeasure_worker.error.connect(self._on_remeasure_error)
+
+        # cleanup
+        self.remeasure_worker.finished.connect(self.remeasure_thread.quit)
+        self.remeasure_worker.error.connect(self.remeasure_thread.quit)
+        self.remeasure_worker.finished.connect(self.remeasure_worker.deleteLater)
+        self.remeasure_thread.finished.connect(self.remeasure_thread.deleteLater)
+
+        self.remeasure_thread.start()
+
+    def _on_remeasure_finished(self, results: list):
+        """Report re-measured files and refresh the current one."""
+        self.busy_dialog.hide()
+        remeasured = sum(r.remeasured for r in results)
+        failed = [r for r in results if r.error is not None]
+        unchanged = [r for r in results if r.warning is not None]
+        for r in failed:
+            logger.err(f"_on_remeasure_finished(): Failed to re-measure '{r.seg_path.name}': {r.error}", self)
+        for r in unchanged:
+            logger.err(f"_on_remeasure_finished(): Left '{r.seg_path.name}' unchanged: {r.warning}", self)
+        message = f"Re-measured {remeasured} axons in {len(results) - len(failed) - len(unchanged)}/{len(results)} files."
+        if len(unchanged) > 0:
+            message += (
+                f"\n{len(unchanged)} files were left unchanged, because some of their axons were processed without "
+                "'Keep Thickness Samples' or have no myelin at this percentile (see the output panel)."
+            )
+        QMessageBox.information(self, "Re-measure Thickness", message)
+        self.image_panel.reload_seg_files([r.seg_path for r in results if r.remeasured > 0])
+
+    def _on_remeasure_error(self, message: str):
+        """Handle worker errors."""
+        self.busy_dialog.hide()
+        QMessageBox.critical(self, "Re-measure Thickness Error", message)
+
+    def migrate_seg_files(self):
+        """Show dialogs to migrate the legacy segmentation files in a folder (and its subfolders)."""
+        directory = QFileDialog.getExistingDirectory(
+            parent=self,
+            caption="Migrate Legacy Segmentation Files: Select Folder (Including Subfolders)",
+            options=QFileDialog.Option.ShowDirsOnly
+        )
+        if not directory:
+            return
+        answer = QMessageBox.question(
+            self,
+            "Migrate Legacy Segmentation Files",
+            "Keep a copy of each legacy file (<name>.seg.legacy)?\n"
+            "Each migrated file is verified before it replaces the legacy file.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Cancel,
+            QMessageBox.StandardButton.No
+        )
+        if answer == QMessageBox.StandardButton.Cancel:
+            return
+        self.image_panel.flush_selection_journal() # journaled selections are written into the migrated files
+
+        # busy dialog
+        self.busy_dialog = BusyDialog("Migrating segmentation files…", self)
+        self.busy_dialog.show()
+
+        # threading
+        self.migrate_thread = QThread(self)
+        self.migrate_worker = MigrateWorker(Path(directory), answer == QMessageBox.StandardButton.Yes)
+        self.migrate_worker.moveToThread(self.migrate_thread)
+
+        self.migrate_thread.started.connect(self.migrate_worker.run)
+        self.migrate_worker.finished.connect(self._on_migrate_finished)
+        self.migrate_worker.error.connect(self._on_migrate_error)
+
+        # cleanup
+        self.migrate_worker.finished.connect(self.migrate_thread.quit)
+        self.migrate_worker.error.connect(self.migrate_thread.quit)
+        self.migrate_worker.finished.connect(self.migrate_worker.deleteLater)
+        self.migrate_thread.finished.connect(self.migrate_thread.deleteLater)
+
+        self.migrate_thread.start()
+
+    def _on_migrate_finished(self, results: list, skipped: int, seconds: float):
+        """Report migrated files and their throughput, and refresh the current file."""
+        self.busy_dialog.hide()
+        migrated = [r for r in results if r.status == "migrated"]
+        failed = [r for r in results if r.status == "failed"]
+        for r in failed:
+            logger.err(f"_on_migrate_finished(): Failed to migrate '{r.seg_path}': {r.error}", self)
+        message = f"Migrated {len(migrated)} files ({len(results) - len(migrated) - len(failed)} were already up to date)."
+        if len(results) > 0 and seconds > 0:
+            legacy_mb = sum(r.legacy_size for r in results) / 1e6
+            message += f"\n{len(results) / seconds:.1f} files/s, {legacy_mb / seconds:.1f} MB/s."
+        if len(failed) > 0:
+            message += f"\n{len(failed)} files could not be migrated and were left unchanged (see Output)."
+        if skipped > 0:
+            message += f"\n{skipped} files were skipped, because an earlier migration already handled them."
+        QMessageBox.information(self, "Migrate Legacy Segmentation Files", message)
+        self.image_panel.reload_seg_files([r.seg_path for r in migrated])
+
+    def _on_migrate_error(self, message: str):
+        """Handle worker errors."""
+        self.busy_dialog.hide()
+        QMessageBox.critical(self, "Migrate Legacy Segmentation Files Error", message)
+
+    def select_axons_by_rule(self):
+        """Show dialog to select or deselect the reviewed axons matching a rule."""
+        seg_data = self.image_panel.get_review_seg_data()
+        if seg_data is None or len(seg_data.contour_data) == 0:
+            QMessageBox.warning(self, "Select Axons by Rule", "Open a segmentation file with axons to select them by rule.")
+            return
+
+        dialog = SelectionRuleDialog(
+            axon_metrics(seg_data.contour_data, seg_data.preferred_units),
+            seg_data.selected_states,
+            seg_data.preferred_units,
+            self.selection_rule_text,
+            self
+        )
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        self.selection_rule_text = dialog.rule_text()
+        mask = dialog.mask()
+        if mask is not None:
+            self.image_panel.set_selected_states(mask, dialog.selected())
+
     def close_multiple_files(self, file_paths: list[Path]):
         """Close multiple user-requested files."""
         self.image_panel.remove_files(file_paths)
@@ -1,5 +1,6 @@
 """Utility and data classes used throughout the app."""
 from PySide6.QtCore import (
+    Qt,
     QObject,
     Signal
 )
@@ -9,8 +10,13 @@ from pathlib import Path
 import numpy.typing as npt
 import numpy as np
 import traceback
-import pickle
+import threading
+import hashlib
+import json
+import time
 import sys
+import os
+import cv2
 
 class View(BaseModel):
     """Data class to store view options."""
@@ -137,6 +143,17 @@ class Settings(BaseModel):
             circularity=settings_dict['circularity'],
             thickness_percentile=settings_dict['thickness_percentile']
         )
+
+    def processing_dict(self) -> dict:
+        """Returns only the fields that affect segmentation results (no display options)."""
+        return self.model_dump(exclude={'show_original', 'show_threshold', 'show_text'})
+
+    def processing_hash(self) -> str:
+        """Returns a short hash of the fields that affect segmentation results."""
+        return hashlib.blake2b(
+            json.dumps(self.processing_dict(), sort_keys=True).encode(),
+            digest_size=16
+        ).hexdigest()
     
     @staticmethod
     def default() -> 'Settings':
@@ -219,9 +236,30 @@ class ProcessPanelState(BaseModel):
     destination_path: str
     """Destination path for image processing results."""
 
+    watch_enabled: bool
+    """Whether processing watches `watch_folder` for new images instead of processing `chosen_images`."""
+
+    watch_folder: str
+    """Folder watched for new images."""
+
     use_multiprocessing: bool 
     """Whether to use multiprocessing for batch processing."""
 
+    execution_backend: str
+    """Batch execution backend (`process`, `thread` or `hybrid`). **NOTE:** `batch_worker.ExecutionBackend` was converted to `str` for serialization. It must be converted back."""
+
+    export_data: bool
+    """Whether batches also write labeled images and the segmentation data CSV."""
+
+    keep_stages: bool
+    """Whether batches store intermediate stages, so re-runs after filter or measurement setting changes are faster."""
+
+    keep_samples: bool
+    """Whether batches keep each axon's thickness samples in .SEG files, so they can be re-measured at another percentile."""
+
+    reference_images: bool
+    """Whether batches write reference-mode .SEG files, which store the source image's path and digest instead of its pixels."""
+
     output_text: str
     """Text contained in the processing output window."""
     
@@ -231,7 +269,14 @@ class ProcessPanelState(BaseModel):
         return ProcessPanelState(
             chosen_images=process_panel_state_dict['chosen_images'],
             destination_path=process_panel_state_dict['destination_path'],
+            watch_enabled=process_panel_state_dict.get('watch_enabled', False),
+            watch_folder=process_panel_state_dict.get('watch_folder', ""),
             use_multiprocessing=process_panel_state_dict['use_multiprocessing'],
+            execution_backend=process_panel_state_dict.get('execution_backend', "process"),
+            export_data=process_panel_state_dict.get('export_data', False),
+            keep_stages=process_panel_state_dict.get('keep_stages', False),
+            keep_samples=process_panel_state_dict.get('keep_samples', False),
+            reference_images=process_panel_state_dict.get('reference_images', False),
             output_text=process_panel_state_dict['output_text']
         )
     
@@ -241,7 +286,14 @@ class ProcessPanelState(BaseModel):
         return ProcessPanelState(
             chosen_images=[],
             destination_path="",
+            watch_enabled=False,
+            watch_folder="",
             use_multiprocessing=True,
+            execution_backend="process",
+            export_data=False,
+            keep_stages=False,
+            keep_samples=False,
+            reference_images=False,
             output_text=""
         )
 
@@ -289,6 +341,25 @@ class AppState(BaseModel):
 
 
 # == imgproc stuff ==
+class ThicknessSamples(BaseModel):
+    """Per-axon measurement inputs kept so that thickness can be re-measured at another percentile without the image."""
+    model_config = ConfigDict(arbitrary_types_allowed=True, frozen=True)
+
+    distances: npt.NDArray[np.float32]
+    """Smallest distances (processed pixels) from the axon contour to neighboring edges. Thickness is a percentile of these."""
+
+    axon_contour: npt.NDArray[np.int32]
+    """Filtered axon contour (processed pixels) without the interior points of straight runs."""
+
+    crop: tuple[int, int, int, int]
+    """Search area around the axon as `(x, y, width, height)` in processed pixels."""
+
+    nm_per_pixel: float
+    """Scale of the original image (nm per pixel)."""
+
+    resolution_divisor: float
+    """How much the resolution of the image was shrunk by for processing."""
+
 class ContourData(BaseModel):
     """Cotainer class for the data representing one axon contour in a segmented image."""
     model_config = ConfigDict(arbitrary_types_allowed=True, frozen=True)
@@ -317,6 +388,18 @@ class ContourData(BaseModel):
     outer_diameter: float
     """Outer myelin diameter (nm)."""
 
+    samples: ThicknessSamples | None = None
+    """Measurement inputs, if they were kept (used to re-measure the thickness at another percentile)."""
+
+class ImageSource(BaseModel):
+    """Reference to the source image of a .SEG file, so the file does not need to embed the image's pixels."""
+
+    path: str
+    """Absolute path of the source image file."""
+
+    digest: str
+    """`image_digest` of the decoded (full resolution) page, to detect a changed or different source file."""
+
 class SegmentationData(BaseModel):
     """Container class for segmentation data (i.e. data stored in a .seg file)."""
     model_config = ConfigDict(arbitrary_types_allowed=True)
@@ -338,27 +421,61 @@ class SegmentationData(BaseModel):
 
     preferred_units: str
     """User-preferred distance unit. Either `nm` or `um`. **NOTE:** `ContourData` length measurements are all in **nanometers (`nm`)**. They must be converted to `um`."""
+
+    page: int = 0
+    """Zero-indexed page of the segmented image within its source file (`0` for single-page images)."""
+
+    page_count: int = 1
+    """Number of pages in the source image file (`1` for single-page images)."""
+
+    thickness_percentile: int | None = None
+    """Percentile the myelin thickness was measured at (`None` if unknown)."""
+
+    image_source: ImageSource | None = None
+    """
+    Source image reference. If set, .SEG files store it instead of the image's pixels while the source file exists 
+    (reference mode), and `image` is regenerated from the source when the file is read.
+    """
     
     @staticmethod
     def from_file(file_path: Path, caller: object) -> 'SegmentationData | None':
         """
-        Attempts to extract segmentation data from the given .SEG file.
+        Attempts to extract segmentation data from the given .SEG file (binary container or legacy pickle).
         Returns:
             segmentation_data (SegmentationData | None): data, if the file is valid, otherwise `None`.
         """ 
+        from seg_format import read_seg_file
         try:
-            with open(file_path, "rb") as f:
-                segmentation_data = pickle.load(f)
-            if type(segmentation_data) is not SegmentationData:
-                return None
-            else:
-                # try reinterpreting
-                segmentation_data = SegmentationData(**segmentation_data.model_dump())
-                return segmentation_data
+            return read_seg_file(file_path)
         except Exception as e:
             logger.err(f"_get_segmentation_data(): Failed to read segmentation file: {traceback.format_exc()}", caller)
             return None
 
+    def to_file(self, file_path: Path, timings: dict[str, float] | None = None, source_verified: bool = False):
+        """
+        Save this `SegmentationData` at the given `Path` as a binary .SEG container (see `seg_format`), 
+        atomically (write a temporary file, then rename it). The file's selection journal is deleted.
+        If a `timings` dict is given, the `serialize` and `write` durations are recorded in it (seconds).
+        `source_verified` is passed to `encode_seg`.
+        """
+        from seg_format import encode_seg
+        from selection_journal import delete_journal
+        start_time = time.perf_counter()
+        payload = encode_seg(self, source_verified)
+        serialized_time = time.perf_counter()
+
+        tmp_path = file_path.with_suffix(".seg.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(file_path)
+        delete_journal(file_path) # its changes are in this data (or belonged to the replaced file)
+
+        if timings is not None:
+            timings["serialize"] = serialized_time - start_time
+            timings["write"] = time.perf_counter() - serialized_time
+
 
 # == util ==
 class FileMan():
@@ -385,6 +502,52 @@ class FileMan():
         """
         return FileMan.is_image(path.suffix.lower())
 
+    @staticmethod
+    def page_count(path: Path) -> int:
+        """
+        Reads only the file header, so multi-page stacks are never fully decoded.
+        Returns:
+            int: Number of pages in the given image file (`1` for single-page images, `0` if unreadable).
+        """
+        try:
+            return int(cv2.imcount(str(path)))
+        except Exception:
+            return 0
+
+    @staticmethod
+    def read_page(path: Path, page: int = 0) -> npt.NDArray | None:
+        """
+        Decode a single page of the given image file as a BGR image.
+        Returns:
+            image (NDArray | None): The decoded page, or `None` if it could not be read.
+        """
+        if page == 0:
+            return cv2.imread(str(path))
+        ok, mats = cv2.imreadmulti(str(path), page, 1, flags=cv2.IMREAD_COLOR)
+        if not ok or len(mats) == 0:
+            return None
+        return mats[0]
+
+    @staticmethod
+    def page_suffix(page: int, page_count: int) -> str:
+        """Return the file name suffix used for the given page of a multi-page image (empty for single-page images)."""
+        if page_count <= 1:
+            return ""
+        return f"_p{page + 1:0{len(str(page_count))}d}"
+
+    @staticmethod
+    def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+        """
+        Hash a file's contents in chunks, so large stacks are never fully loaded into memory.
+        Returns:
+            str: BLAKE2b hex digest of the file.
+        """
+        h = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                h.update(chunk)
+        return h.hexdigest()
+
     @staticmethod
     def resource_path(relative_path: str) -> Path:
         """
@@ -396,13 +559,31 @@ class FileMan():
 
 
 class Logger(QObject):
-    """Connects to `OutputPanel`'s text display and can be used anywhere to print logs."""
+    """
+    Connects to `OutputPanel`'s text display and can be used anywhere to print logs.
+    Printed text is buffered, and consecutive spans with the same style are merged: the display receives everything
+    printed during one event loop iteration at once, so printing many short strings costs one display update.
+    """
 
-    printTriggered = Signal(str, bool, bool, bool, str)
-    """Append a string to the text display."""
+    printTriggered = Signal(list)
+    """Append spans to the text display, as a list of `(text, bold, italic, underline, color)` tuples."""
 
     clearTriggered = Signal()
-    """Clear the text display."""
+    """Clear the text display (and table)."""
+
+    tableTriggered = Signal(str, list, list)
+    """Show a table below the text display, given its title, column headers and columns (NumPy arrays)."""
+
+    _flush_requested = Signal()
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock() # logs may come from worker threads
+        self._spans: list[list] = []
+        self._clear_pending: bool = False
+        self._table: tuple[str, list[str], list[npt.NDArray]] | None = None
+        self._flush_scheduled: bool = False
+        self._flush_requested.connect(self.flush, Qt.ConnectionType.QueuedConnection)
 
     def print(self, 
               s: str, 
@@ -420,7 +601,13 @@ class Logger(QObject):
             underline (bool): Underline option.
             color (str): Standard HTML color.
         """
-        self.printTriggered.emit(str(s), bold, italic, underline, color)
+        style = (bold, italic, underline, color)
+        with self._lock:
+            if len(self._spans) > 0 and tuple(self._spans[-1][1:]) == style:
+                self._spans[-1][0] += str(s)
+            else:
+                self._spans.append([str(s), *style])
+        self._schedule_flush()
     
     def println(self, 
               s: str = "", 
@@ -444,10 +631,50 @@ class Logger(QObject):
         """Print an error message to the text display."""
         self.print(f"Error in {caller.__class__.__name__}: ", bold=True, color="red")
         self.println(e, color="red")
+
+    def table(self, title: str, headers: list[str], columns: list[npt.NDArray]):
+        """
+        Show a table below the text display (e.g. per-axon data, which would be slow to print), until it is cleared.
+        Params:
+            title (str): Table title.
+            headers (list[str]): Column headers.
+            columns (list[NDArray]): Column values, of equal lengths.
+        """
+        with self._lock:
+            self._table = (title, headers, columns)
+        self._schedule_flush()
     
     def clear(self):
-        """Clear the text display."""
-        self.clearTriggered.emit()
+        """Clear the text display (and table)."""
+        with self._lock:
+            self._spans.clear()
+            self._table = None
+            self._clear_pending = True
+        self._schedule_flush()
+
+    def flush(self):
+        """Send the buffered output to the display now (otherwise, it is sent once control returns to the event loop)."""
+        with self._lock:
+            spans = [tuple(span) for span in self._spans]
+            clear, table = self._clear_pending, self._table
+            self._spans.clear()
+            self._clear_pending = False
+            self._table = None
+            self._flush_scheduled = False
+        if clear:
+            self.clearTriggered.emit()
+        if len(spans) > 0:
+            self.printTriggered.emit(spans)
+        if table is not None:
+            self.tableTriggered.emit(*table)
+
+    def _schedule_flush(self):
+        """Request a flush from the event loop, unless one is already pending."""
+        with self._lock:
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._flush_requested.emit()
 
 # Create singleton instance of Logger
 logger = Logger()
@@ -0,0 +1,280 @@
+from pathlib import Path
+
+from PySide6.QtCore import (
+    QThread,
+    Slot
+)
+from PySide6.QtGui import (
+    QCloseEvent,
+    QDoubleValidator
+)
+from PySide6.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+    QGridLayout,
+    QLabel,
+    QLineEdit,
+    QComboBox,
+    QPushButton,
+    QGroupBox,
+    QCheckBox,
+    QFileDialog,
+    QMessageBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView
+)
+
+from panels.generate.busy_dialog import BusyDialog
+from panels.generate.catalog_worker import CatalogIndexWorker
+
+from catalog import ResultsCatalog, AxonQuery, METRIC_COLUMNS, LENGTH_COLUMNS, collect_catalog_files
+from models import logger
+
+import time
+
+class CatalogDialog(QDialog):
+    """Query and export axons across every .SEG file in the results catalog."""
+
+    preview_rows: int = 500
+    """Maximum number of matching axons shown in the dialog (exports include all of them)."""
+
+    metric_labels: dict[str, str] = {
+        "g_ratio": "G-ratio",
+        "circularity": "Circularity",
+        "thickness": "Myelin thickness",
+        "inner_diameter": "Inner diameter",
+        "outer_diameter": "Outer diameter"
+    }
+
+    def __init__(
+        self,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.setWindowTitle("Results Catalog")
+        self.setModal(True)
+        self.resize(760, 560)
+
+        main_layout = QVBoxLayout(self)
+
+        # --- catalog ---
+        catalog_group = QGroupBox("Catalog")
+        catalog_layout = QHBoxLayout(catalog_group)
+        self.summary_label = QLabel()
+        catalog_layout.addWidget(self.summary_label)
+        catalog_layout.addStretch()
+
+        add_files_btn = QPushButton("Add Files")
+        add_files_btn.clicked.connect(self._add_files_dialog)
+        add_folder_btn = QPushButton("Add Folder")
+        add_folder_btn.clicked.connect(self._add_folder_dialog)
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.setToolTip("Re-index .SEG files that changed since they were added, and remove missing ones.")
+        refresh_btn.clicked.connect(lambda: self._start_indexing(None, "Refreshing catalog…"))
+        catalog_layout.addWidget(add_files_btn)
+        catalog_layout.addWidget(add_folder_btn)
+        catalog_layout.addWidget(refresh_btn)
+        main_layout.addWidget(catalog_group)
+
+        # --- filters ---
+        filter_group = QGroupBox("Filter")
+        filter_layout = QGridLayout(filter_group)
+
+        self.selected_only_checkbox = QCheckBox("Selected Axons Only")
+        self.selected_only_checkbox.setChecked(True)
+        filter_layout.addWidget(self.selected_only_checkbox, 0, 0, 1, 2)
+
+        filter_layout.addWidget(QLabel("Units"), 0, 2)
+        self.units_combo = QComboBox()
+        self.units_combo.addItem("µm", "um")
+        self.units_combo.addItem("nm", "nm")
+        filter_layout.addWidget(self.units_combo, 0, 3)
+
+        filter_layout.addWidget(QLabel("Minimum"), 1, 1)
+        filter_layout.addWidget(QLabel("Maximum"), 1, 2)
+        self.bound_edits: dict[str, tuple[QLineEdit, QLineEdit]] = {}
+        for row, name in enumerate(METRIC_COLUMNS, start=2):
+            label = self.metric_labels[name] + (" (length)" if name in LENGTH_COLUMNS else "")
+            filter_layout.addWidget(QLabel(label), row, 0)
+            edits: list[QLineEdit] = []
+            for column in (1, 2):
+                edit = QLineEdit()
+                edit.setPlaceholderText("any")
+                edit.setValidator(QDoubleValidator(edit))
+                filter_layout.addWidget(edit, row, column)
+                edits.append(edit)
+            self.bound_edits[name] = (edits[0], edits[1])
+
+        image_row = 2 + len(METRIC_COLUMNS)
+        filter_layout.addWidget(QLabel("Image name"), image_row, 0)
+        self.image_edit = QLineEdit()
+        self.image_edit.setPlaceholderText("any (wildcards: * and ?)")
+        filter_layout.addWidget(self.image_edit, image_row, 1, 1, 2)
+        main_layout.addWidget(filter_group)
+
+        # --- results ---
+        self.result_label = QLabel("Run a query to see matching axons.")
+        main_layout.addWidget(self.result_label)
+        self.table = QTableWidget()
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        main_layout.addWidget(self.table, 1)
+
+        # --- buttons ---
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.hide)
+        query_btn = QPushButton("Run Query")
+        query_btn.clicked.connect(self._run_query)
+        export_btn = QPushButton("Export CSV")
+        export_btn.clicked.connect(self._export_csv)
+        button_layout.addWidget(close_btn)
+        button_layout.addWidget(query_btn)
+        button_layout.addWidget(export_btn)
+        main_layout.addLayout(button_layout)
+
+        self._update_summary()
+
+    def showEvent(self, event):
+        self._update_summary()
+        super().showEvent(event)
+
+    def _update_summary(self):
+        """Show the number of cataloged files and axons."""
+        try:
+            with ResultsCatalog() as catalog:
+                files, axons = catalog.summary()
+            self.summary_label.setText(f"{files} segmentation files, {axons} axons")
+        except Exception as e:
+            self.summary_label.setText("Catalog could not be opened.")
+            logger.err(f"_update_summary(): Failed to open results catalog: {e}", self)
+
+    def _get_query(self) -> AxonQuery | None:
+        """Returns the query described by the filter fields, or `None` (after warning the user) if a field is invalid."""
+        bounds: dict[str, tuple[float | None, float | None]] = {}
+        for name, edits in self.bound_edits.items():
+            values: list[float | None] = []
+            for edit in edits:
+                text = edit.text().strip()
+                if text == "":
+                    values.append(None)
+                    continue
+                value, ok = edit.locale().toDouble(text)
+                if not ok:
+                    QMessageBox.warning(self, "Results Catalog", f"'{text}' is not a number.")
+                    return None
+                values.append(value)
+            if values[0] is not None or values[1] is not None:
+                bounds[name] = (values[0], values[1])
+        return AxonQuery(
+            selected_only=self.selected_only_checkbox.isChecked(),
+            units=self.units_combo.currentData(),
+            bounds=bounds,
+            img_filename=self.image_edit.text().strip()
+        )
+
+    def _run_query(self):
+        """Count the matching axons and show the first `preview_rows` of them."""
+        query = self._get_query()
+        if query is None:
+            return
+        try:
+            start_time = time.perf_counter()
+            with ResultsCatalog() as catalog:
+                count = catalog.count_axons(query)
+                columns, rows = catalog.query_axons(query, limit=self.preview_rows)
+            elapsed_ms = 1000 * (time.perf_counter() - start_time)
+        except Exception as e:
+            QMessageBox.critical(self, "Results Catalog Error", str(e))
+            return
+
+        shown = f", showing the first {len(rows)}" if count > len(rows) else ""
+        self.result_label.setText(f"{count} matching axons{shown} ({elapsed_ms:.0f} ms).")
+        self.table.clear()
+        self.table.setColumnCount(len(columns))
+        self.table.setHorizontalHeaderLabels(columns)
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, value in enumerate(row):
+                text = f"{value:.4f}" if isinstance(value, float) else ("" if value is None else str(value))
+                self.table.setItem(r, c, QTableWidgetItem(text))
+
+    def _export_csv(self):
+        """Write every matching axon to a CSV file."""
+        query = self._get_query()
+        if query is None:
+            return
+        file_name, _ = QFileDialog.getSaveFileName(
+            parent=self,
+            caption="Results Catalog: Export CSV",
+            dir="SnapG_catalog_export.csv",
+            filter="CSV Files (*.csv)"
+        )
+        if not file_name:
+            return
+        try:
+            with ResultsCatalog() as catalog:
+                count = catalog.export_csv(query, Path(file_name))
+        except Exception as e:
+            QMessageBox.critical(self, "Results Catalog Error", str(e))
+            return
+        QMessageBox.information(self, "Results Catalog", f"Exported {count} axons to '{Path(file_name).name}'.")
+
+    # -- indexing --
+    def _add_files_dialog(self):
+        file_names, _ = QFileDialog.getOpenFileNames(
+            parent=self,
+            caption="Results Catalog: Add Segmentation File(s)",
+            filter="SEG Files (*.seg)"
+        )
+        if file_names:
+            self._start_indexing([Path(s) for s in file_names], "Adding files to catalog…")
+
+    def _add_folder_dialog(self):
+        directory = QFileDialog.getExistingDirectory(
+            parent=self,
+            caption="Results Catalog: Add Folder (Including Subfolders)",
+            options=QFileDialog.Option.ShowDirsOnly
+        )
+        if directory:
+            self._start_indexing(collect_catalog_files([Path(directory)]), "Adding files to catalog…")
+
+    def _start_indexing(self, seg_paths: list[Path] | None, text: str):
+        """Index the given files (or refresh the catalog) on a worker thread."""
+        self.busy_dialog = BusyDialog(text, self)
+        self.busy_dialog.show()
+
+        self.worker_thread = QThread(self)
+        self.worker = CatalogIndexWorker(seg_paths)
+        self.worker.moveToThread(self.worker_thread)
+
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.finished.connect(self._on_indexing_finished)
+        self.worker.error.connect(self._on_indexing_error)
+
+        # cleanup
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker.error.connect(self.worker_thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
+        self.worker_thread.finished.connect(self.worker_thread.deleteLater)
+
+        self.worker_thread.start()
+
+    @Slot(str)
+    def _on_indexing_finished(self, message: str):
+        self.busy_dialog.hide()
+        self._update_summary()
+        QMessageBox.information(self, "Results Catalog", message)
+
+    def _on_indexing_error(self, message: str):
+        """Handle worker errors."""
+        self.busy_dialog.hide()
+        QMessageBox.critical(self, "Results Catalog Error", message)
+
+    # -- closing --
+    def closeEvent(self, event: QCloseEvent) -> None:
+        event.ignore()
+        self.hide()
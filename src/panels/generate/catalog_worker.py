@@ -0,0 +1,34 @@
+from PySide6.QtCore import (
+    QObject,
+    Signal,
+    Slot
+)
+
+from catalog import ResultsCatalog
+
+from pathlib import Path
+
+class CatalogIndexWorker(QObject):
+    finished = Signal(str)      # summary message
+    error = Signal(str)
+
+    def __init__(self, seg_paths: list[Path] | None):
+        """Index the given .SEG files, or refresh the whole catalog if `seg_paths` is `None`."""
+        super().__init__()
+        self.seg_paths = seg_paths
+
+    @Slot()
+    def run(self):
+        try:
+            with ResultsCatalog() as catalog: # opened in this thread, since connections can't be shared
+                if self.seg_paths is None:
+                    updated, removed = catalog.refresh()
+                    message = f"Re-indexed {updated} changed files and removed {removed} missing or unreadable files."
+                else:
+                    indexed, unchanged, failed = catalog.index_files(self.seg_paths)
+                    message = f"Added {indexed} files ({unchanged} were already up to date)."
+                    if len(failed) > 0:
+                        message += f"\n{len(failed)} files could not be read, e.g. '{failed[0][0].name}': {failed[0][1]}"
+            self.finished.emit(message)
+        except Exception as e:
+            self.error.emit(str(e))
@@ -29,7 +29,8 @@ from PySide6.QtWidgets import (
 from panels.generate.busy_dialog import BusyDialog
 from panels.generate.generate_data_worker import GenerateDataWorker
 
-from models import AppState, SegmentationData, ContourData, logger
+from models import AppState, ContourData, logger
+from seg_format import SegReader
 
 from datetime import datetime
 import numpy.typing as npt
@@ -307,17 +308,18 @@ class GenerateDataDialog(QDialog):
             logger.err("_generate_data(): Chosen path is not a directory.", self)
             return
         
-        # check if valid files
-        filtered_segmentations: list[SegmentationData] = []
+        # check if valid files (headers only, the worker reads the data)
+        filtered_segmentations: list[Path] = []
         invalid_paths: set[Path] = set()
         for p in raw_image_paths:
             valid = p.exists()
             if valid:
-                seg_data = SegmentationData.from_file(p, self)
-                if seg_data is None:
+                try:
+                    with SegReader(p):
+                        filtered_segmentations.append(p)
+                except Exception as e:
+                    logger.err(f"_generate_data(): Failed to read segmentation file '{p}': {e}", self)
                     valid = False
-                else:
-                    filtered_segmentations.append(seg_data)
             if not valid:
                 # let user handle invalid file
                 reply = QMessageBox.question(
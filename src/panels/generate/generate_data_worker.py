@@ -10,9 +10,9 @@ class GenerateDataWorker(QObject):
     finished = Signal(list, list)      # out_imgs, csv_lines
     error = Signal(str)
 
-    def __init__(self, segmentations, font_path, timestamp):
+    def __init__(self, seg_paths, font_path, timestamp):
         super().__init__()
-        self.segmentations = segmentations
+        self.seg_paths = seg_paths
         self.font_path = font_path
         self.timestamp = timestamp
 
@@ -20,7 +20,7 @@ class GenerateDataWorker(QObject):
     def run(self):
         try:
             out_imgs, csv_lines = get_csv_lines(
-                self.segmentations,
+                self.seg_paths,
                 self.font_path,
                 self.timestamp
             )
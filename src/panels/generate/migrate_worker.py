@@ -0,0 +1,37 @@
+from PySide6.QtCore import (
+    QObject,
+    Signal,
+    Slot
+)
+
+from catalog import collect_catalog_files
+from seg_migrate import MigrationLedger, migrate_files
+
+from pathlib import Path
+import time
+import os
+
+class MigrateWorker(QObject):
+    finished = Signal(list, int, float)      # list[MigrationResult], files skipped (migrated or failed before), seconds
+    error = Signal(str)
+
+    def __init__(self, folder: Path, keep_backup: bool):
+        """Migrate the legacy .SEG files in the given folder (and its subfolders), resuming an earlier migration."""
+        super().__init__()
+        self.folder = folder
+        self.keep_backup = keep_backup
+
+    @Slot()
+    def run(self):
+        try:
+            with MigrationLedger() as ledger:
+                pending, done, failed = ledger.pending(collect_catalog_files([self.folder]))
+                start_time = time.perf_counter()
+                results = []
+                workers = min(len(pending), max(1, (os.cpu_count() or 1) - 1))
+                for result in migrate_files(pending, workers, self.keep_backup):
+                    ledger.record(result)
+                    results.append(result)
+            self.finished.emit(results, done + failed, time.perf_counter() - start_time)
+        except Exception as e:
+            self.error.emit(str(e))
@@ -0,0 +1,28 @@
+from PySide6.QtCore import (
+    QObject, 
+    Signal, 
+    Slot
+)
+
+from imgproc.remeasure import remeasure_files
+
+from pathlib import Path
+import os
+
+class RemeasureWorker(QObject):
+    finished = Signal(list)      # list[RemeasureResult]
+    error = Signal(str)
+
+    def __init__(self, seg_paths: list[Path], thickness_percentile: int):
+        super().__init__()
+        self.seg_paths = seg_paths
+        self.thickness_percentile = thickness_percentile
+
+    @Slot()
+    def run(self):
+        try:
+            workers = min(len(self.seg_paths), max(1, (os.cpu_count() or 1) - 1))
+            results = list(remeasure_files(self.seg_paths, self.thickness_percentile, workers))
+            self.finished.emit(results)
+        except Exception as e:
+            self.error.emit(str(e))
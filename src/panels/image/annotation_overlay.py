@@ -0,0 +1,253 @@
+from PySide6.QtCore import (
+    Qt,
+    QByteArray,
+    QDataStream,
+    QPointF,
+    QRectF
+)
+from PySide6.QtGui import (
+    QPainter,
+    QPolygonF,
+    QPen,
+    QColor,
+    QFont,
+    QFontDatabase,
+    QStaticText,
+    QTransform
+)
+
+from models import AppState, ContourData
+
+import numpy.typing as npt
+import numpy as np
+import struct
+import cv2
+
+class AnnotationOverlay():
+    """
+    Axon contours and labels, painted by `ImageView` over the image in view coordinates instead of being drawn into it.
+    Lines keep their width and text its size at any zoom, and showing, hiding or recoloring axons only repaints the view.
+    Geometry is kept in base image pixels (the coordinates of `ImageView`'s `base_img_dims`).
+    """
+
+    line_width: float = 2
+    """Contour line width (screen pixels)."""
+
+    wide_line_max_axons: int = 250
+    """With more axons in view, contours are drawn 1 pixel wide (wider lines are several times slower to draw)."""
+
+    center_radius: float = 3
+    """Radius of the dot marking each axon's center in REVIEW mode (screen pixels)."""
+
+    label_pixel_size: int = 13
+    """Label font size (screen pixels)."""
+
+    label_min_axon_size: float = 24
+    """Labels are only drawn once a typical axon is at least this wide on screen (pixels), so zoomed-out views aren't buried in text."""
+
+    _font_family: str | None = None
+
+    def __init__(self, contour_data: list[ContourData], resolution_divisor: float, selected_states: list[bool] | None = None):
+        """
+        Create the overlay of the given axons (contours in processed pixels, i.e. divided by `resolution_divisor`).
+        With `selected_states` (REVIEW mode), axons are colored by their selected state, which is read from
+        the given list whenever the overlay is painted, so it can be changed in place.
+        """
+        self.selected_states = selected_states
+        self.review = selected_states is not None
+
+        # display options
+        self.show_labels: bool = True
+        self.exclude_deselected: bool = False
+        self.exclude_all: bool = False
+        self.message: list[str] = []
+        """Lines of text shown in the top left corner of the image (e.g. a warning)."""
+
+        count = len(contour_data)
+        self.inner: list[QPolygonF] = []
+        self.outer: list[QPolygonF] = []
+        self.labels: list[str] = []
+        self.notes: list[str] = []
+        """Second label line (TUNE mode: the G-ratio)."""
+        self.centers = np.zeros((count, 2), dtype=np.float64)
+        self.boxes = np.zeros((count, 4), dtype=np.float64)
+        """Bounds of each axon's contours, as `(x0, y0, x1, y1)`."""
+        self.valid = np.zeros(count, dtype=bool)
+        """Axons with a center (the others are never drawn)."""
+        for i, c in enumerate(contour_data):
+            inner = c.inner_contour.reshape(-1, 2) * resolution_divisor
+            outer = c.outer_contour.reshape(-1, 2) * resolution_divisor
+            # pixel contours are drawn without their staircase points (sub-pixel deviation, but far fewer line segments)
+            self.inner.append(_polygon(cv2.approxPolyDP(c.inner_contour, 0.5, True).reshape(-1, 2) * resolution_divisor))
+            self.outer.append(_polygon(cv2.approxPolyDP(c.outer_contour, 0.5, True).reshape(-1, 2) * resolution_divisor))
+            self.labels.append(f"#{i + 1}" if self.review else f"#{c.ID}")
+            self.notes.append("" if self.review else f"G:{c.g_ratio:.2f}")
+            M = cv2.moments(c.inner_contour)
+            if M["m00"] == 0 or len(outer) == 0:
+                continue
+            self.centers[i] = (M["m10"] / M["m00"] * resolution_divisor, M["m01"] / M["m00"] * resolution_divisor)
+            points = np.concatenate([inner, outer])
+            self.boxes[i, :2] = points.min(axis=0)
+            self.boxes[i, 2:] = points.max(axis=0)
+            self.valid[i] = True
+        widths = self.boxes[self.valid, 2] - self.boxes[self.valid, 0]
+        self.typical_size = float(np.median(widths)) if len(widths) > 0 else 0.0
+        self._static_texts: dict[tuple[str, int], QStaticText] = {}
+
+    def item_rect(self, index: int, origin: QPointF, scale: float) -> QRectF:
+        """Returns the view rectangle the given axon's drawing covers (including its label)."""
+        x0, y0, x1, y1 = self.boxes[index] * scale
+        cx, cy = self.centers[index] * scale
+        label_w = (max(len(self.labels[index]), len(self.notes[index])) + 1) * self.label_pixel_size
+        label_h = 3 * self.label_pixel_size
+        x0, x1 = min(x0, cx - label_w / 2), max(x1, cx + label_w / 2)
+        y0, y1 = min(y0, cy - label_h), max(y1, cy + label_h)
+        pad = self.line_width + self.center_radius + 2
+        return QRectF(origin.x() + x0 - pad, origin.y() + y0 - pad, x1 - x0 + 2 * pad, y1 - y0 + 2 * pad)
+
+    def paint(self, painter: QPainter, origin: QPointF, scale: float, view: QRectF, clip: QRectF | None = None, label_pixel_size: int | None = None):
+        """
+        Paint the overlay, with the image's top left corner at `origin` and `scale` view pixels per base image pixel.
+        `view` is the visible area, and only axons overlapping `clip` (default: `view`) are drawn.
+        A given `label_pixel_size` draws the labels at that size (e.g. when the overlay is drawn into an image),
+        instead of only when the view is zoomed in enough.
+        """
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # cull axons outside the view and clip rectangles
+        shown = self.valid & self._overlapping(view, origin, scale)
+        if self.exclude_all:
+            shown[:] = False
+        elif self.exclude_deselected and self.selected_states is not None:
+            shown &= np.asarray(self.selected_states, dtype=bool)
+        # (line width depends on the whole view, so repainting part of it doesn't change it)
+        line_width = self.line_width if np.count_nonzero(shown) <= self.wide_line_max_axons else 1
+        if clip is not None:
+            shown &= self._overlapping(clip, origin, scale)
+        indices = np.flatnonzero(shown)
+
+        if self.selected_states is not None:
+            states = np.asarray(self.selected_states, dtype=bool)
+            groups = [(QColor(0, 255, 0), indices[states[indices]]), (QColor(255, 0, 0), indices[~states[indices]])]
+        else:
+            groups = [(QColor(0, 255, 0), indices)]
+
+        # contours (in base image pixels, with a pen of constant screen width)
+        painter.setTransform(QTransform(scale, 0, 0, scale, origin.x(), origin.y()), True)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for color, group in groups:
+            pen = QPen(color, line_width)
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+            for i in group:
+                painter.drawPolygon(self.inner[i])
+                painter.drawPolygon(self.outer[i])
+        painter.restore()
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        centers = self.centers[indices] * scale + (origin.x(), origin.y())
+        if self.review:
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(Qt.GlobalColor.black)
+            for cx, cy in centers:
+                painter.drawEllipse(QPointF(cx, cy), self.center_radius, self.center_radius)
+
+        # labels
+        if not self.show_labels or (label_pixel_size is None and self.typical_size * scale < self.label_min_axon_size):
+            painter.restore()
+            return
+        size = label_pixel_size or self.label_pixel_size
+        font = QFont(self._label_font_family())
+        font.setPixelSize(size)
+        painter.setFont(font)
+        if self.review:
+            self._paint_review_labels(painter, font, indices, centers, max(1, size // 10))
+        else:
+            self._paint_tune_labels(painter, font, indices, centers, max(1, size // 10))
+        painter.restore()
+
+    def _paint_review_labels(self, painter: QPainter, font: QFont, indices: npt.NDArray, centers: npt.NDArray, offset: int):
+        """Labels colored by selected state, with a light outline."""
+        assert self.selected_states is not None
+        for i, (cx, cy) in zip(indices, centers):
+            text = self._static_text(self.labels[i], font)
+            w, h = text.size().toTuple()
+            x, y = cx - w / 2, cy - h - self.center_radius
+            selected = self.selected_states[i]
+            painter.setPen(QColor(255, 255, 255) if selected else QColor(192, 192, 192))
+            for dx, dy in [(-offset, -offset), (offset, -offset), (offset, offset), (-offset, offset)]:
+                painter.drawStaticText(QPointF(x + dx, y + dy), text)
+            painter.setPen(QColor(0, 0, 255) if selected else QColor(64, 64, 64))
+            painter.drawStaticText(QPointF(x, y), text)
+
+    def _paint_tune_labels(self, painter: QPainter, font: QFont, indices: npt.NDArray, centers: npt.NDArray, pad: int):
+        """Black labels on a white box, with the G-ratio below."""
+        for i, (cx, cy) in zip(indices, centers):
+            text = self._static_text(self.labels[i], font)
+            w, h = text.size().toTuple()
+            x, y = cx - w / 2, cy - h
+            painter.fillRect(QRectF(x - pad, y - pad, w + 2 * pad, h + 2 * pad), Qt.GlobalColor.white)
+            painter.setPen(Qt.GlobalColor.black)
+            painter.drawStaticText(QPointF(x, y), text)
+            note = self._static_text(self.notes[i], font)
+            painter.setPen(QColor(255, 255, 0))
+            painter.drawStaticText(QPointF(cx - note.size().width() / 2, cy + pad), note)
+
+    def paint_message(self, painter: QPainter, origin: QPointF):
+        """Paint the message lines (screen-sized text, in a white box at the image's top left corner)."""
+        if len(self.message) == 0:
+            return
+        painter.save()
+        font = QFont(self._label_font_family())
+        font.setPixelSize(2 * self.label_pixel_size)
+        painter.setFont(font)
+        metrics = painter.fontMetrics()
+        pad = self.label_pixel_size // 2
+        w = max(metrics.horizontalAdvance(line) for line in self.message) + 2 * pad
+        h = metrics.lineSpacing() * len(self.message) + 2 * pad
+        painter.fillRect(QRectF(origin.x(), origin.y(), w, h), Qt.GlobalColor.white)
+        painter.setPen(Qt.GlobalColor.black)
+        for n, line in enumerate(self.message):
+            painter.drawText(QPointF(origin.x() + pad, origin.y() + pad + metrics.ascent() + n * metrics.lineSpacing()), line)
+        painter.restore()
+
+    def _overlapping(self, rect: QRectF, origin: QPointF, scale: float) -> npt.NDArray:
+        """Returns which axons overlap the given view rectangle (with a margin for their labels)."""
+        margin = 4 * self.label_pixel_size / scale
+        x0, y0 = (rect.left() - origin.x()) / scale - margin, (rect.top() - origin.y()) / scale - margin
+        x1, y1 = (rect.right() - origin.x()) / scale + margin, (rect.bottom() - origin.y()) / scale + margin
+        b = self.boxes
+        return (b[:, 0] < x1) & (b[:, 2] > x0) & (b[:, 1] < y1) & (b[:, 3] > y0)
+
+    def _static_text(self, text: str, font: QFont) -> QStaticText:
+        """Labels are laid out once per font size (drawing laid out text is much faster than drawing a string)."""
+        key = (text, font.pixelSize())
+        static_text = self._static_texts.get(key)
+        if static_text is None:
+            static_text = QStaticText(text)
+            static_text.setTextFormat(Qt.TextFormat.PlainText)
+            static_text.prepare(QTransform(), font)
+            self._static_texts[key] = static_text
+        return static_text
+
+    @classmethod
+    def _label_font_family(cls) -> str:
+        """The annotation font, loaded into Qt's font database once."""
+        if cls._font_family is None:
+            font_id = QFontDatabase.addApplicationFont(str(AppState.annotation_font_path()))
+            families = QFontDatabase.applicationFontFamilies(font_id) if font_id >= 0 else []
+            cls._font_family = families[0] if len(families) > 0 else "Arial"
+        return cls._font_family
+
+# -- helpers --
+def _polygon(points: npt.NDArray) -> QPolygonF:
+    """
+    Convert an `(N, 2)` array of points to a `QPolygonF`. The polygon is read from its `QDataStream` serialization
+    (a big-endian point count followed by big-endian doubles), which is far faster than creating a `QPointF` per point.
+    """
+    data = QByteArray(struct.pack(">I", len(points)) + np.ascontiguousarray(points, dtype=">f8").tobytes())
+    polygon = QPolygonF()
+    QDataStream(data) >> polygon
+    return polygon
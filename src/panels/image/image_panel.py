@@ -10,32 +10,35 @@ from PySide6.QtCore import (
 from PySide6.QtGui import (
     QImage,
     QCloseEvent,
-    QKeyEvent
+    QKeyEvent,
+    QCursor
 )
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout, 
     QTextEdit,
     QMessageBox,
-    QApplication
+    QApplication,
+    QMenu
 )
 
 from panels.settings.settings_panel import SettingsPanel
 from panels.image.image_view import ImageView
 from panels.image.imgproc_worker import ImgProcWorker
+from panels.image.review_index import ContourHitIndex
+from panels.image.annotation_overlay import AnnotationOverlay
+from panels.image.image_pyramid import ImagePyramid
 
 from models import AppState, SegmentationData, ContourData, ImagePanelState, Settings, FileMan, logger
+from seg_format import SegReader
+from selection_journal import SelectionJournal, journal_record_count
+from bulk_selection import points_in_polygon, axon_metrics
 
-from PIL import Image, ImageFont, ImageDraw
 from pathlib import Path
 from enum import Enum
 import numpy.typing as npt
 import numpy as np
 import traceback
-import pickle
-import math
-import cv2
-import os
 
 class Mode(Enum):
     NO_IMAGE = 0
@@ -54,6 +57,12 @@ class ImagePanel(QWidget):
     stop_worker_signal = Signal()
     """Signal to stop the worker thread."""
 
+    journal_flush_ms: int = 500
+    """Delay after the last selection change before the selection journal is written."""
+
+    journal_compact_records: int = 1024
+    """Journals with more records than this are compacted into their .SEG file when it is opened."""
+
     def __init__(self, app_state: AppState, settings_panel: SettingsPanel):
         super().__init__()
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
@@ -65,10 +74,15 @@ class ImagePanel(QWidget):
         current_file_str = app_state.image_panel_state.current_file
         self.current_file: Path | None = Path(current_file_str) if current_file_str != "" else None
         self.last_current_file: Path | None = None # this is for update_image() to cache images after imread
+        self.current_page: int = 0 # zero-indexed page of multi-page images
+        self.current_page_count: int = 1
+        self.last_current_page: int = 0
         # image state
         self.current_original_image: npt.NDArray | None = None
         self.display_image: npt.NDArray | None = None
         self.current_seg_data: SegmentationData | None = None
+        self.hit_index: ContourHitIndex | None = None # click index of current_seg_data's axons
+        self.review_overlay: AnnotationOverlay | None = None # contours and labels of current_seg_data's axons
         # logic/config
         self.settings: Settings | None = None
         self.mode: Mode = Mode(app_state.image_panel_state.mode)
@@ -80,10 +94,17 @@ class ImagePanel(QWidget):
         # image view
         self.image_view = ImageView(self, app_state)
         self.image_view.mouse_pressed.connect(self._handle_mouse_pressed)
+        self.image_view.region_selected.connect(self._handle_region_selected)
         vlayout.addWidget(self.image_view)
         # these states are for REVIEW mode
         self.exclude_deselected_contours: bool = False
         self.exclude_all_contours: bool = False
+        # selection changes are journaled (write-behind) instead of rewriting the .SEG file on every click
+        self.selection_journal: SelectionJournal | None = None
+        self.journal_timer = QTimer(self)
+        self.journal_timer.setSingleShot(True)
+        self.journal_timer.setInterval(self.journal_flush_ms)
+        self.journal_timer.timeout.connect(self.flush_selection_journal)
         
         # image processing thread
         self.processing_thread = QThread(self)
@@ -104,6 +125,8 @@ class ImagePanel(QWidget):
             valid = self._validate_file(self.current_file, remove=True)
             if not valid:
                 self.current_file = None
+            else:
+                self._reset_page(self.current_file)
         for p in self.image_files + self.seg_files: # all opened files
             self._validate_file(p, remove=True)
 
@@ -125,9 +148,9 @@ class ImagePanel(QWidget):
         return None
 
     def get_display_image(self) -> npt.NDArray | None:
-        """Returns the currently displayed image."""
+        """Returns the currently displayed image, with its annotations drawn into it."""
         if self.display_image is not None:
-            return np.copy(self.display_image)
+            return self.image_view.render_annotated(self.display_image)
         else:
             return None
     
@@ -216,7 +239,10 @@ class ImagePanel(QWidget):
         else:
             logger.clear()
             logger.print("File: ", bold=True)
-            logger.println(self.current_file.name)
+            if self.current_page_count > 1:
+                logger.println(f"{self.current_file.name} (page {self.current_page + 1}/{self.current_page_count})")
+            else:
+                logger.println(self.current_file.name)
     
     def _set_current_file(self, 
                           file_path: Path, 
@@ -249,6 +275,7 @@ class ImagePanel(QWidget):
         
         # update state
         self.current_file = file_path
+        self._reset_page(file_path)
         self._log_file_name()
         self.update_image()
         
@@ -256,6 +283,49 @@ class ImagePanel(QWidget):
         self.emit_files()
         return True
 
+    def _reset_page(self, file_path: Path):
+        """Go back to the first page of the given file (REVIEW mode pages are read from the `.seg` file instead)."""
+        self.current_page = 0
+        self.current_page_count = max(1, FileMan.page_count(file_path)) if FileMan.path_is_image(file_path) else 1
+
+    def _step_page(self, step: int):
+        """Step through the pages of the current stack (TUNE) or through its per-page segmentation files (REVIEW)."""
+        if self.current_file is None or self.current_page_count <= 1:
+            return
+        new_page = self.current_page + step
+        if not (0 <= new_page < self.current_page_count):
+            return
+
+        if self.mode == Mode.TUNE:
+            self.current_page = new_page
+            self._log_file_name()
+            self.update_image()
+        elif self.mode == Mode.REVIEW:
+            sibling = self._get_sibling_page_file(new_page)
+            if sibling is None:
+                logger.println(f"No segmentation file found for page {new_page + 1}.", color="gray")
+                return
+            self.add_files([sibling])
+
+    def _get_sibling_page_file(self, page: int) -> Path | None:
+        """
+        Find the segmentation file of another page from the same batch as the current segmentation file.
+        Returns:
+            path (Path | None): The sibling `.seg` file, or `None` if it doesn't exist.
+        """
+        if self.current_file is None or self.current_seg_data is None:
+            return None
+        seg_data = self.current_seg_data
+        stem = Path(seg_data.img_filename).stem
+        prefix = stem + FileMan.page_suffix(seg_data.page, seg_data.page_count)
+        name = self.current_file.name
+        if not name.startswith(prefix):
+            return None # renamed by user
+        sibling = self.current_file.with_name(
+            stem + FileMan.page_suffix(page, seg_data.page_count) + name[len(prefix):]
+        )
+        return sibling if sibling.is_file() else None
+
     def _validate_file(self, file_path: Path, remove: bool = False) -> bool:
         """
         Check if the given image or .SEG file is valid.
@@ -265,9 +335,13 @@ class ImagePanel(QWidget):
         extension = file_path.suffix.lower()
         valid = file_path.is_file() and (FileMan.is_image(extension) or extension == ".seg")
         if valid and extension == ".seg":
-            # Try reading the .SEG file
-            seg_data = SegmentationData.from_file(file_path, self)
-            valid &= seg_data != None
+            # Try reading the .SEG file's header (the data is read when it is shown)
+            try:
+                with SegReader(file_path):
+                    pass
+            except Exception as e:
+                logger.err(f"_validate_file(): Failed to read segmentation file '{file_path}': {e}", self)
+                valid = False
         
         # notify user if not valid
         if not valid:
@@ -292,16 +366,23 @@ class ImagePanel(QWidget):
         self.settings = settings
         self.update_image(read_seg_file=False) # changing settings should only affect TUNE mode, not REVIEW
     
+    def reload_seg_files(self, file_paths: list[Path]):
+        """Re-read the current .SEG file if it was changed on disk (i.e. it is among the given files)."""
+        if self.mode == Mode.REVIEW and self.current_file in file_paths:
+            self.update_image(read_seg_file=True)
+
     def update_image(self, read_seg_file: bool = True):
         """Updates this panel's `ImageView` using the current file."""
         if self.current_file is None:
             return
+        self.image_view.region_selection_enabled = self.mode == Mode.REVIEW
 
         # tune: read image file
         if self.mode == Mode.TUNE:
-            if self.last_current_file is None or self.current_file != self.last_current_file:
+            if self.last_current_file is None or self.current_file != self.last_current_file or self.current_page != self.last_current_page:
+                self.image_view.set_overlay(None) # until the new image is processed
                 try:
-                    self.current_original_image = cv2.imread(str(self.current_file))
+                    self.current_original_image = FileMan.read_page(self.current_file, self.current_page)
                 except Exception as e:
                     self._log_file_name()
                     logger.err(f"update_image(): Failed to read image file: {traceback.format_exc()}", self)
@@ -310,10 +391,24 @@ class ImagePanel(QWidget):
         # review: get image from seg file
         elif self.mode == Mode.REVIEW:
             if read_seg_file:
+                self.flush_selection_journal() # so the journal is merged when re-reading the same file
                 self.current_seg_data = SegmentationData.from_file(self.current_file, self)
+                self.hit_index = None
+                self.review_overlay = None
+                if self.current_seg_data is not None:
+                    self.hit_index = ContourHitIndex(self.current_seg_data.contour_data, self.current_seg_data.resolution_divisor)
+                    self.review_overlay = self._create_review_overlay(self.current_seg_data)
+                self.selection_journal = SelectionJournal(self.current_file) if self.current_seg_data is not None else None
+                if self.current_seg_data is not None and journal_record_count(self.current_file) > self.journal_compact_records:
+                    self._compact_selection_journal()
             if self.current_seg_data is not None:
+                self.current_page = self.current_seg_data.page
+                self.current_page_count = self.current_seg_data.page_count
                 self.current_original_image = self.current_seg_data.image
-                self.display_image = self._annotate_review_image(self.current_seg_data)
+                self.display_image = self.current_seg_data.image
+                if self.review_overlay is None:
+                    self.review_overlay = self._create_review_overlay(self.current_seg_data)
+                self._update_review_overlay()
                 self._log_file_name()
                 self._log_contour_data(
                     self.current_seg_data.contour_data, 
@@ -322,9 +417,11 @@ class ImagePanel(QWidget):
                 )
             else:
                 self.display_image = self.current_original_image
+            self.image_view.set_overlay(self.review_overlay if self.current_seg_data is not None else None)
 
         # keep track of if file changed
         self.last_current_file = self.current_file
+        self.last_current_page = self.current_page
 
         # set image
         if self.display_image is None or self.current_original_image is None:
@@ -352,7 +449,8 @@ class ImagePanel(QWidget):
         # enqueue image processing on worker thread
         self.worker.enqueue(
             self.current_original_image,
-            self.settings
+            self.settings,
+            self.image_view.view_state()
         )
     
     @Slot(bool)
@@ -361,8 +459,8 @@ class ImagePanel(QWidget):
         self.processing = active
         self.image_view.set_processing(active)
 
-    def _on_processing_finished(self, image: np.ndarray, contour_data_list: list[ContourData] | None, settings: Settings):
-        """Receive worker thread results and set display image."""
+    def _on_processing_finished(self, image: np.ndarray, pyramid: ImagePyramid | None, contour_data_list: list[ContourData] | None, settings: Settings, cached: bool, budget_hit: bool):
+        """Receive worker thread results and set display image (its pyramid was built by the worker thread)."""
         if self.mode != Mode.TUNE:
             return
         
@@ -376,8 +474,10 @@ class ImagePanel(QWidget):
         self.display_image = image
         self.image_view.set_image(
             self.display_image, 
-            (self.current_original_image.shape[1], self.current_original_image.shape[0])
+            (self.current_original_image.shape[1], self.current_original_image.shape[0]),
+            pyramid
         )
+        self.image_view.set_overlay(self._create_tune_overlay(contour_data_list, settings, budget_hit))
 
         # log data
         self._log_file_name()
@@ -386,86 +486,64 @@ class ImagePanel(QWidget):
                 contour_data_list, 
                 settings.scale_units
             )
+        if cached:
+            logger.println(f"Reused cached result (result cache: {self.worker.memory_cache.stats}).", color="gray")
         
     def _log_contour_data(self, contour_data_list: list[ContourData], units: str, selected_states: list[bool] | None = None):
-        """Helper function for logging contour data to the text display."""
+        """Helper function for logging contour data to the text display (summary) and table (each axon)."""
         # sort axons
+        metrics = axon_metrics(contour_data_list, units)
         if selected_states is None:
-            selected_cnt: list[ContourData] = contour_data_list
-            deselected_cnt: list[ContourData] = []
+            selected = np.ones(len(contour_data_list), dtype=bool)
         else:
-            selected_cnt: list[ContourData] = []
-            deselected_cnt: list[ContourData] = []
-            for i, c in enumerate(contour_data_list):
-                if selected_states[i]:
-                    selected_cnt.append(c)
-                else:
-                    deselected_cnt.append(c)
+            selected = np.asarray(selected_states, dtype=bool)
+        selected_count = int(np.count_nonzero(selected))
+        deselected_count = len(contour_data_list) - selected_count
 
         # log data
-        logger.print(f"{len(selected_cnt)} axons {"found" if selected_states is None else "selected"}.")
-        if len(deselected_cnt) > 0:
-            logger.print(f" ({len(deselected_cnt)} deselected)")
+        logger.print(f"{selected_count} axons {"found" if selected_states is None else "selected"}.")
+        if deselected_count > 0:
+            logger.print(f" ({deselected_count} deselected)")
         logger.print("\n\n")
         if len(contour_data_list) == 0:
             return
         
         data_suffix = "" if selected_states is None else "(selected axons)"
+        log_selected = selected_states is not None and selected_count > 0 and deselected_count > 0
 
         logger.print("Mean G-ratio", underline=True)
         logger.println(":")
-        if selected_states is not None and len(selected_cnt) > 0 and len(deselected_cnt) > 0:
+        if log_selected:
             # log selected
-            mean_g_ratio = round(np.mean([c.g_ratio for c in selected_cnt]), 3)
+            mean_g_ratio = round(float(np.mean(metrics["g_ratio"][selected])), 3)
             logger.print("|   "); logger.println(f"{mean_g_ratio} {data_suffix}", color="gray")
         # log total
-        mean_g_ratio = round(np.mean([c.g_ratio for c in contour_data_list]), 3)
+        mean_g_ratio = round(float(np.mean(metrics["g_ratio"])), 3)
         logger.print("|   "); logger.println(f"{mean_g_ratio} (all axons)\n", color="gray")
 
         logger.println("Mean diameters", underline=True)
-        if selected_states is not None and len(selected_cnt) > 0 and len(deselected_cnt) > 0:
+        if log_selected:
             # log selected
-            mean_inner_dia = np.mean([c.inner_diameter for c in selected_cnt])
-            mean_outer_dia = np.mean([c.outer_diameter for c in selected_cnt])
-            if units == "um":
-                mean_inner_dia /= 1000.0
-                mean_outer_dia /= 1000.0
             logger.print(f"|   Inner: ")
-            logger.println(f"{round(mean_inner_dia, 3)} {units} {data_suffix}", color="gray")
+            logger.println(f"{round(float(np.mean(metrics["inner_diameter"][selected])), 3)} {units} {data_suffix}", color="gray")
             logger.print(f"|   Outer: ")
-            logger.println(f"{round(mean_outer_dia, 3)} {units} {data_suffix}", color="gray")
+            logger.println(f"{round(float(np.mean(metrics["outer_diameter"][selected])), 3)} {units} {data_suffix}", color="gray")
         # log total
-        mean_inner_dia = np.mean([c.inner_diameter for c in contour_data_list])
-        mean_outer_dia = np.mean([c.outer_diameter for c in contour_data_list])
-        if units == "um":
-            mean_inner_dia /= 1000.0
-            mean_outer_dia /= 1000.0
         logger.print(f"|   Inner: ")
-        logger.println(f"{round(mean_inner_dia, 3)} {units} (all axons)", color="gray")
+        logger.println(f"{round(float(np.mean(metrics["inner_diameter"])), 3)} {units} (all axons)", color="gray")
         logger.print(f"|   Outer: ")
-        logger.println(f"{round(mean_outer_dia, 3)} {units} (all axons)\n", color="gray")
+        logger.println(f"{round(float(np.mean(metrics["outer_diameter"])), 3)} {units} (all axons)\n", color="gray")
 
-        if len(selected_cnt) == 0:
+        if selected_count == 0:
             return
 
-        logger.println(f"Detections {data_suffix}", underline=True)
-        for c in selected_cnt:
-            inner = c.inner_diameter
-            outer = c.outer_diameter
-            thick = c.thickness
-
-            if units == "um":
-                inner /= 1000.0
-                outer /= 1000.0
-                thick /= 1000.0
-
-            logger.println(f"|   Axon {c.ID}")
-            logger.print("|       g-ratio: "); logger.println(f"{round(c.g_ratio, 3)}", color="gray")
-            logger.print("|       circularity: "); logger.println(f"{round(c.circularity, 3)}", color="gray")
-            logger.print("|       inner diameter: "); logger.println(f"{round(inner, 3)} {units}", color="gray")
-            logger.print("|       outer diameter: "); logger.println(f"{round(outer, 3)} {units}", color="gray")
-            logger.print("|       myelin thickness: "); logger.println(f"{round(thick, 3)} {units}", color="gray")
-            logger.println("|")
+        # one row per axon
+        ids = np.fromiter((c.ID for c in contour_data_list), dtype=np.int64, count=len(contour_data_list))
+        logger.table(
+            f"Detections {data_suffix}",
+            ["Axon", "G-ratio", "Circularity", f"Inner diameter ({units})", f"Outer diameter ({units})", f"Myelin thickness ({units})"],
+            [ids[selected]] + [metrics[name][selected] for name in ["g_ratio", "circularity", "inner_diameter", "outer_diameter", "thickness"]]
+        )
 
     def _on_processing_error(self, message: str):
         """Handle worker thread errors."""
@@ -496,123 +574,150 @@ class ImagePanel(QWidget):
             return
         if not is_in_image:
             return
-        if self.current_file is None or self.current_seg_data is None:
+        if self.current_file is None or self.current_seg_data is None or self.hit_index is None:
             return
         
         # check for clicks on contours
-        contour_data = self.current_seg_data.contour_data
-        res_div = self.current_seg_data.resolution_divisor
-        closest_valid_contour: tuple[int | None, float] = (None, -1)
-        for i, contour in enumerate(contour_data):
-            M = cv2.moments(contour.inner_contour)
-            if M["m00"] == 0:
-                continue
-            cx = int(M["m10"] / M["m00"] * res_div)
-            cy = int(M["m01"] / M["m00"] * res_div)
-            diameter = cv2.arcLength(contour.inner_contour, closed=True)/(2*math.pi) * res_div
-            distance = math.hypot(
-                cx - image_point.x(),
-                cy - image_point.y()
-            )
-            if (distance <= diameter) and (closest_valid_contour[0] is None or distance < closest_valid_contour[1]):
-                closest_valid_contour = (i, distance)
+        index = self.hit_index.hit(image_point.x(), image_point.y())
 
         # toggle if contour clicked
-        if closest_valid_contour[0] is not None:
-            index = closest_valid_contour[0]
-            self.current_seg_data.selected_states[index] = not self.current_seg_data.selected_states[index]
-            self._save_segmentation_atomic(self.current_file, self.current_seg_data)
-            self.update_image()
-        
+        if index is not None:
+            selected = not self.current_seg_data.selected_states[index]
+            self.current_seg_data.selected_states[index] = selected
+            if self.selection_journal is not None:
+                self.selection_journal.record(index, selected)
+                self.journal_timer.start() # write-behind: restarts on every click
+            self._update_review_axon(index)
+
+    def _handle_region_selected(self, polygon: npt.NDArray):
+        """Offer to select or deselect the shown axons whose center is inside the dragged region (REVIEW mode)."""
+        if self.mode != Mode.REVIEW or self.current_seg_data is None or self.hit_index is None:
+            return
+        mask = (self.hit_index.radii > 0) & points_in_polygon(self.hit_index.centers, polygon)
+        if self.exclude_all_contours:
+            mask[:] = False
+        elif self.exclude_deselected_contours:
+            mask &= np.asarray(self.current_seg_data.selected_states, dtype=bool)
+        count = int(np.count_nonzero(mask))
+        if count == 0:
+            return
+
+        menu = QMenu(self)
+        select_action = menu.addAction(f"Select {count} axon{'s' if count != 1 else ''}")
+        deselect_action = menu.addAction(f"Deselect {count} axon{'s' if count != 1 else ''}")
+        action = menu.exec(QCursor.pos())
+        if action == select_action:
+            self.set_selected_states(mask, True)
+        elif action == deselect_action:
+            self.set_selected_states(mask, False)
+
+    def get_review_seg_data(self) -> SegmentationData | None:
+        """Returns the segmentation data being reviewed (`None` outside of REVIEW mode)."""
+        return self.current_seg_data if self.mode == Mode.REVIEW else None
+
+    def set_selected_states(self, mask: npt.NDArray, selected: bool) -> int:
+        """
+        Set the selected state of every axon in the given boolean mask (REVIEW mode), and save the changes at once:
+        appended to the selection journal in one write, or, if that makes the journal long, written into the .SEG file.
+        Returns:
+            count (int): The number of axons whose selected state changed.
+        """
+        if self.mode != Mode.REVIEW or self.current_seg_data is None:
+            return 0
+        states = self.current_seg_data.selected_states
+        changed = np.flatnonzero(np.asarray(mask, dtype=bool) & (np.asarray(states, dtype=bool) != selected))
+        if len(changed) == 0:
+            return 0
+        for index in changed.tolist():
+            states[index] = selected # in place: the overlay reads this list
+            if self.selection_journal is not None:
+                self.selection_journal.record(index, selected)
+
+        if self.current_file is not None and self.selection_journal is not None:
+            if journal_record_count(self.current_file) + self.selection_journal.pending > self.journal_compact_records:
+                try:
+                    self._compact_selection_journal()
+                except Exception as e:
+                    logger.err(f"set_selected_states(): Failed to save selection: {traceback.format_exc()}", self)
+                    self.flush_selection_journal()
+            else:
+                self.flush_selection_journal()
+
+        self.image_view.update()
+        self._log_file_name()
+        self._log_contour_data(
+            self.current_seg_data.contour_data,
+            units=self.current_seg_data.preferred_units,
+            selected_states=self.current_seg_data.selected_states
+        )
+        return len(changed)
+
+    def _create_review_overlay(self, seg_data: SegmentationData) -> AnnotationOverlay:
+        """Create the contours and labels of the given segmentation data's axons, colored by selected state."""
+        if len(seg_data.contour_data) != len(seg_data.selected_states):
+            logger.err("_create_review_overlay(): Length of contour data is not equal to length of selected states", self)
+        return AnnotationOverlay(seg_data.contour_data, seg_data.resolution_divisor, seg_data.selected_states)
+
+    def _create_tune_overlay(self, contour_data_list: list[ContourData] | None, settings: Settings, budget_hit: bool) -> AnnotationOverlay | None:
+        """Create the contours and labels of a processing result (`None` if it has no contour data, e.g. the thresholded image)."""
+        if contour_data_list is None:
+            return None
+        overlay = AnnotationOverlay(contour_data_list, settings.resolution_divisor)
+        overlay.show_labels = settings.show_text
+        if budget_hit:
+            overlay.message = ["Too Much Work!", "(Try increasing", "resolution divider", "or minimum size)"]
+        return overlay
+
+    def _update_review_overlay(self):
+        """Apply the REVIEW mode exclusion states to the overlay (only repaints the view)."""
+        if self.review_overlay is None:
+            return
+        self.review_overlay.exclude_deselected = self.exclude_deselected_contours
+        self.review_overlay.exclude_all = self.exclude_all_contours
+        self.image_view.update()
+
+    def _update_review_axon(self, index: int):
+        """Repaint only the given axon (after its selected state changed), and update the output."""
+        if self.current_seg_data is None:
+            return
+        self.image_view.update_overlay_item(index)
+        self._log_file_name()
+        self._log_contour_data(
+            self.current_seg_data.contour_data,
+            units=self.current_seg_data.preferred_units,
+            selected_states=self.current_seg_data.selected_states
+        )
+
+    def flush_selection_journal(self):
+        """Append buffered selection changes to the selection journal (e.g. before another reader opens the file)."""
+        self.journal_timer.stop()
+        if self.selection_journal is None or self.selection_journal.pending == 0:
+            return
+        try:
+            self.selection_journal.flush()
+        except Exception as e:
+            logger.err(f"flush_selection_journal(): Failed to write selection journal: {traceback.format_exc()}", self)
+
+    def _compact_selection_journal(self):
+        """Write the current selection into the current .SEG file, which replaces (deletes) its selection journal."""
+        if self.current_file is None or self.current_seg_data is None:
+            return
+        self.journal_timer.stop()
+        self._save_segmentation_atomic(self.current_file, self.current_seg_data)
+        if self.selection_journal is not None and self.selection_journal.seg_path == self.current_file:
+            self.selection_journal.discard()
+
     def _save_segmentation_atomic(self, file: Path, seg_data: SegmentationData):
         """Save the given `SegmentationData` at the given `Path` atomically (safely)."""
-        tmp_path = file.with_suffix(".seg.tmp")
-        with open(tmp_path, "wb") as f:
-            pickle.dump(seg_data, f)
-            f.flush()
-            os.fsync(f.fileno())
-        tmp_path.replace(file)
-
-    def _annotate_review_image(self, seg_data: SegmentationData) -> npt.NDArray:
-        """Draw colored contours on segmentation image."""
-        display_img = seg_data.image.copy()
-        if len(display_img.shape) == 2: # grayscale, cvt to color
-            display_img = cv2.cvtColor(display_img, cv2.COLOR_GRAY2BGR)
-        res_div = seg_data.resolution_divisor
-        contour_data = seg_data.contour_data
-        selected_states = seg_data.selected_states
-
-        if len(contour_data) != len(selected_states):
-            logger.err("_annotate_review_image(): Length of contour data is not equal to length of selected states", self)
-
-        # scale image down for processing speed
-        im_h = display_img.shape[0]
-        im_w = display_img.shape[1]
-        scale_factor = 1.0
-        if max(im_h, im_w) > 512:
-            scale_factor = 512 / max(im_h, im_w)
-            display_img = cv2.resize(display_img, None, fx=scale_factor, fy=scale_factor) 
-
-        def scale_contour(cnt: npt.NDArray, s):
-            return (cnt * s).astype(np.int32)
-
-        # draw contours
-        for i, c in enumerate(contour_data):
-            if (self.exclude_deselected_contours and not selected_states[i]) or self.exclude_all_contours:
-                continue  # Hide excluded in preview
-            inner = scale_contour(c.inner_contour, scale_factor)
-            outer = scale_contour(c.outer_contour, scale_factor)
-            M = cv2.moments(inner)
-            if M["m00"] == 0:
-                continue
-            cx = int(M["m10"] / M["m00"])
-            cy = int(M["m01"] / M["m00"])
-            color = (0, 255, 0) if selected_states[i] else (0, 0, 255)
-            cv2.drawContours(display_img, [inner], -1, color, 2)
-            cv2.drawContours(display_img, [outer], -1, color, 2)
-            cv2.circle(display_img, (cx, cy), 4, (0, 0, 0), -1)
-
-        # draw text
-        img_h = display_img.shape[0]
-        img_w = display_img.shape[1]
-        draw_scale = int(8 * max(img_h, img_w) / 4096)
-        line_spacing = 14*draw_scale
-        out_pil = Image.fromarray(cv2.cvtColor(display_img, cv2.COLOR_BGR2RGB))
-        font = ImageFont.truetype(AppState.annotation_font_path(), max(15, int(15 * draw_scale)))
-        draw = ImageDraw.Draw(out_pil)
-        for i, c in enumerate(contour_data):
-            if (self.exclude_deselected_contours and not selected_states[i]) or self.exclude_all_contours:
-                continue
-            inner = scale_contour(c.inner_contour, scale_factor)
-            M = cv2.moments(inner)
-            if M["m00"] == 0:
-                continue
-            cx = int(M["m10"] / M["m00"])
-            cy = int(M["m01"] / M["m00"] - 6*draw_scale)
-
-            if max(img_h, img_w) < 512:
-                x_corr = 5 * max(1, draw_scale)
-                y_corr = 10 * max(1, line_spacing)
-            else:
-                x_corr = 5 * draw_scale
-                y_corr = 0.5 * line_spacing
-
-            ID = i + 1
-            label = f"#{ID}"
-
-            color = (255, 255, 255) if selected_states[i] else (192, 192, 192)
-            def draw_shadow_text(dx,dy):
-                draw.text((int(cx-x_corr*len(label))+dx, cy-y_corr+dy), label, font=font, fill=color)
-            for dx,dy in [(-2,-2),(2,-2),(2,2),(-2,2)]:
-                draw_shadow_text(dx,dy)
-            color = (0, 0, 255) if selected_states[i] else (64, 64, 64)
-            draw.text((int(cx-x_corr*len(label)), cy-y_corr), label, font=font, fill=color)
-            
-        display_img = cv2.cvtColor(np.array(out_pil), cv2.COLOR_RGB2BGR)
-        return display_img
-    
+        seg_data.to_file(file)
+
     def keyPressEvent(self, event: QKeyEvent) -> None:
-        """Handle enabling contour exclusion modes in REVIEW mode."""
+        """Handle page stepping and enabling contour exclusion modes in REVIEW mode."""
+        if event.key() in (Qt.Key.Key_PageUp, Qt.Key.Key_PageDown):
+            self._step_page(-1 if event.key() == Qt.Key.Key_PageUp else 1)
+            event.accept()
+            return
+
         if event.isAutoRepeat():
             return
         
@@ -632,7 +737,7 @@ class ImagePanel(QWidget):
                 changed = True
 
         if changed:
-            self.update_image(read_seg_file=False)
+            self._update_review_overlay()
         event.accept()
     
     def keyReleaseEvent(self, event: QKeyEvent) -> None:
@@ -652,7 +757,7 @@ class ImagePanel(QWidget):
                 changed = True
 
         if changed and self.mode == Mode.REVIEW:
-            self.update_image(read_seg_file=False)
+            self._update_review_overlay()
         event.accept()
     
     def to_state(self) -> ImagePanelState:
@@ -667,10 +772,13 @@ class ImagePanel(QWidget):
         )
     
     def closeEvent(self, event: QCloseEvent) -> None:
-        # save segmentation data
-        if self.mode == Mode.REVIEW and self.current_file is not None and self.current_seg_data is not None:
+        # save segmentation data (compact the selection journal if the selection changed)
+        journal = self.selection_journal
+        if (self.mode == Mode.REVIEW and self.current_file is not None and self.current_seg_data is not None
+                and journal is not None and journal.seg_path == self.current_file
+                and (journal.pending > 0 or journal_record_count(self.current_file) > 0)):
             try:
-                self._save_segmentation_atomic(self.current_file, self.current_seg_data)
+                self._compact_selection_journal()
             except Exception as e:
                 QMessageBox.critical(
                     self,
@@ -679,6 +787,7 @@ class ImagePanel(QWidget):
                 )
                 event.ignore()
                 return
+        self.flush_selection_journal() # e.g. changes to a .SEG file that is no longer shown
         # stop worker
         if self.worker:
             self.worker.stop()
@@ -0,0 +1,185 @@
+from PySide6.QtCore import (
+    Qt,
+    QRect,
+    QRectF,
+    QSize
+)
+from PySide6.QtGui import (
+    QPainter,
+    QPixmap,
+    QImage
+)
+
+import math
+
+class ImagePyramid():
+    """
+    An image at halving resolutions (levels), each cut into tiles that are uploaded as pixmaps when first drawn.
+    A view draws only the tiles it shows, from the smallest level that is still at least as large as the zoomed image,
+    so neither zooming nor a large image makes it rescale (or upload) the whole image.
+    Drawing can also be `exact`: shrunk tiles are then smoothly resampled to their drawn size once, and copied as they are
+    until the drawn size changes (e.g. while panning, or when annotations are repainted).
+    Pyramids can be built and `prepare`d on any thread (they only hold images until drawn); they are drawn on the GUI thread.
+    """
+
+    tile_size: int = 512
+    """Tile width and height (level pixels)."""
+
+    tile_overlap: int = 1
+    """Tiles share a border this wide, so filtering at tile edges samples the same pixels as filtering the whole level."""
+
+    min_level_size: int = 128
+    """Levels stop halving once their longest side is at most this long (pixels)."""
+
+    def __init__(self, image: QImage):
+        """Compute the levels of the given image (level 0 is the image itself)."""
+        if image.format() != QImage.Format.Format_RGB32:
+            image = image.convertToFormat(QImage.Format.Format_RGB32) # fastest to scale and upload
+        self.levels: list[QImage] = [image]
+        while max(self.levels[-1].width(), self.levels[-1].height()) > self.min_level_size:
+            level = self.levels[-1]
+            self.levels.append(level.scaled(
+                max(1, level.width() // 2), max(1, level.height() // 2),
+                Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            ))
+        self._tiles: dict[tuple[int, int, int], tuple[QPixmap, int, int]] = {}
+        """Uploaded tiles by `(level, column, row)`, with the level position of their top left pixel (including the overlap)."""
+        self._exact_tiles: dict[tuple[int, int, int], QPixmap] = {}
+        """Tiles resampled to their drawn size, by `(level, column, row)`, for the drawn image size `_exact_size`."""
+        self._exact_images: dict[tuple[int, int, int], QImage] = {}
+        """Resampled tiles prepared by `prepare()`, not uploaded yet."""
+        self._exact_size: tuple[float, float] | None = None
+
+    def width(self) -> int:
+        return self.levels[0].width()
+
+    def height(self) -> int:
+        return self.levels[0].height()
+
+    def level_for(self, width: float) -> int:
+        """Returns the smallest level at least as wide as the given drawn image width (or level 0, when zoomed in)."""
+        if width <= 0:
+            return len(self.levels) - 1
+        level = int(math.floor(math.log2(self.width() / width))) if width < self.width() else 0
+        level = min(max(level, 0), len(self.levels) - 1)
+        while level > 0 and self.levels[level].width() < width:
+            level -= 1 # halving rounds down
+        return level
+
+    def draw(self, painter: QPainter, target: QRectF, clip: QRectF, exact: bool = False):
+        """
+        Draw the image into the `target` rectangle (view coordinates), only the tiles that overlap `clip`.
+        With `exact`, shrunk tiles are drawn from their cached resampled copy (see `ImagePyramid`). Enlarged ones are always
+        scaled while drawing (their resampled copies would be large).
+        """
+        level, tiles = self._visible_tiles(target, clip)
+        exact = exact and self._shrunk(level, target)
+        if exact:
+            self._use_exact_size(target)
+        left, top = round(target.left()), round(target.top())
+        for col, row, dest, source in tiles:
+            if exact:
+                painter.drawPixmap(left + dest.x(), top + dest.y(), self._exact_tile(level, col, row, dest.size(), source))
+            else:
+                pixmap = self._tile(level, col, row)[0]
+                painter.drawPixmap(QRectF(dest.translated(left, top)), pixmap, source)
+
+    def prepare(self, target: QRectF, clip: QRectF):
+        """
+        Resample the tiles that `draw(painter, target, clip, exact=True)` would draw, without uploading them
+        (e.g. on a worker thread, before the pyramid is shown). Drawing then only uploads them.
+        """
+        level, tiles = self._visible_tiles(target, clip)
+        if not self._shrunk(level, target):
+            return
+        self._use_exact_size(target)
+        for col, row, dest, source in tiles:
+            key = (level, col, row)
+            if key not in self._exact_images and key not in self._exact_tiles:
+                self._exact_images[key] = self._resample(level, col, row, dest.size(), source)
+
+    # -- tiles --
+    def _visible_tiles(self, target: QRectF, clip: QRectF) -> tuple[int, list[tuple[int, int, QRect, QRectF]]]:
+        """
+        Returns:
+            level (int): The level drawn into `target`.
+            tiles (list): `(column, row, dest, source)` of each tile overlapping `clip`: its rectangle relative to
+                `target`'s top left corner (in whole view pixels, since tiles drawn at fractional positions would leave
+                seams), and the level pixels drawn into it (relative to the tile's top left pixel, including the overlap).
+        """
+        level = self.level_for(target.width())
+        image = self.levels[level]
+        w, h = image.width(), image.height()
+        sx, sy = target.width() / w, target.height() / h
+        visible = clip.intersected(target)
+        if visible.isEmpty():
+            return level, []
+
+        # level pixels in view, then the tiles covering them
+        t, o = self.tile_size, self.tile_overlap
+        col0 = max(0, int((visible.left() - target.left()) / sx) // t)
+        col1 = min((w - 1) // t, int((visible.right() - target.left()) / sx) // t)
+        row0 = max(0, int((visible.top() - target.top()) / sy) // t)
+        row1 = min((h - 1) // t, int((visible.bottom() - target.top()) / sy) // t)
+        tiles: list[tuple[int, int, QRect, QRectF]] = []
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                x0, x1 = round(col * t * sx), round(min(w, (col + 1) * t) * sx)
+                y0, y1 = round(row * t * sy), round(min(h, (row + 1) * t) * sy)
+                if x1 <= x0 or y1 <= y0:
+                    continue
+                px, py = max(0, col * t - o), max(0, row * t - o)
+                source = QRectF(x0 / sx - px, y0 / sy - py, (x1 - x0) / sx, (y1 - y0) / sy)
+                tiles.append((col, row, QRect(x0, y0, x1 - x0, y1 - y0), source))
+        return level, tiles
+
+    def _shrunk(self, level: int, target: QRectF) -> bool:
+        """Whether the given level is drawn shrunk into `target`."""
+        return target.width() < self.levels[level].width() and target.height() < self.levels[level].height()
+
+    def _use_exact_size(self, target: QRectF):
+        """Only resampled tiles of the current drawn size are kept."""
+        if self._exact_size != (target.width(), target.height()):
+            self._exact_tiles.clear()
+            self._exact_images.clear()
+            self._exact_size = (target.width(), target.height())
+
+    def _tile(self, level: int, col: int, row: int) -> tuple[QPixmap, int, int]:
+        """Returns the given tile, uploading it first if needed."""
+        key = (level, col, row)
+        tile = self._tiles.get(key)
+        if tile is None:
+            region = self._tile_region(level, col, row)
+            tile = (QPixmap.fromImage(self.levels[level].copy(region)), region.x(), region.y())
+            self._tiles[key] = tile
+        return tile
+
+    def _exact_tile(self, level: int, col: int, row: int, size: QSize, source: QRectF) -> QPixmap:
+        """Returns the given tile resampled to its drawn size, resampling (or uploading a prepared one) first if needed."""
+        key = (level, col, row)
+        tile = self._exact_tiles.get(key)
+        if tile is None:
+            image = self._exact_images.pop(key, None)
+            if image is None:
+                image = self._resample(level, col, row, size, source)
+            tile = QPixmap.fromImage(image)
+            self._exact_tiles[key] = tile
+        return tile
+
+    def _resample(self, level: int, col: int, row: int, size: QSize, source: QRectF) -> QImage:
+        """Returns the `source` rectangle of the given tile smoothly scaled to `size` (images only, so any thread may call it)."""
+        image = QImage(size, QImage.Format.Format_RGB32)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        painter.drawImage(QRectF(0, 0, size.width(), size.height()), self.levels[level].copy(self._tile_region(level, col, row)), source)
+        painter.end()
+        return image
+
+    def _tile_region(self, level: int, col: int, row: int) -> QRect:
+        """Returns the level pixels of the given tile, including the overlap."""
+        image = self.levels[level]
+        t, o = self.tile_size, self.tile_overlap
+        x0, y0 = max(0, col * t - o), max(0, row * t - o)
+        x1, y1 = min(image.width(), (col + 1) * t + o), min(image.height(), (row + 1) * t + o)
+        return QRect(x0, y0, x1 - x0, y1 - y0)
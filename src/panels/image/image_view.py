@@ -1,13 +1,18 @@
 from PySide6.QtCore import (
     Qt,
     Signal,
+    QTimer,
     QRect,
-    QPoint
+    QRectF,
+    QPoint,
+    QPointF
 )
 from PySide6.QtGui import (
     QPainter, 
-    QPixmap,
     QImage,
+    QPen,
+    QColor,
+    QPolygonF,
     QMouseEvent,
     QWheelEvent,
     QGuiApplication,
@@ -19,10 +24,14 @@ from PySide6.QtWidgets import (
     QApplication
 )
 
+from panels.image.annotation_overlay import AnnotationOverlay
+from panels.image.image_pyramid import ImagePyramid
+
 from models import AppState, logger
 
 import numpy.typing as npt
 import numpy as np
+import cv2
 
 def clamp(x, lower, upper):
     """Clamps the given `x` between the `lower` and `upper` bounds."""
@@ -30,14 +39,22 @@ def clamp(x, lower, upper):
 
 class ImageView(QWidget):
 
+    zoom_idle_ms: int = 150
+    """Delay after the last zoom step before the image is drawn smoothly resampled (until then, it is drawn fast)."""
+
     mouse_pressed = Signal(bool, QPoint)
 
+    region_selected = Signal(object)
+    """Emits a region dragged with the left mouse button, as an `(N, 2)` array of base image points (its polygon)."""
+
     def __init__(self, parent, app_state: AppState):
         super().__init__(parent)
         # image state
-        self.pixmap: QPixmap | None = None
-        self.scaled_pixmap: QPixmap | None = None
+        self.pyramid: ImagePyramid | None = None
+        self.pyramid_source: npt.NDArray | None = None # the image the pyramid was built from
+        self.scaled_size: tuple[int, int] | None = None # size of the zoomed image (view pixels)
         self.base_img_dims: tuple[int, int] | None = None
+        self.overlay: AnnotationOverlay | None = None
         self.center_point: tuple[int, int] = app_state.image_panel_state.view_center_point
         self.image_width: int = app_state.image_panel_state.view_image_width
         self._processing: bool = False
@@ -46,32 +63,86 @@ class ImageView(QWidget):
         self.drag_start_position: QPoint | None = None
         self.drag_start_image_position: tuple[int, int] = (0, 0)
         self.drag_active: bool = False
+        self.region_selection_enabled: bool = False
+        """
+        Whether left-dragging selects a region (a rectangle, or a lasso with Ctrl held). A left click is then emitted
+        when the mouse is released without having been dragged.
+        """
+        self.region_start_position: QPoint | None = None
+        self.region_points: list[QPointF] = [] # view coordinates, while a region is dragged
+        self.region_lasso: bool = False
+        self.zoom_timer = QTimer(self)
+        self.zoom_timer.setSingleShot(True)
+        self.zoom_timer.setInterval(self.zoom_idle_ms)
+        self.zoom_timer.timeout.connect(self.update) # redraw resampled once zooming stops
 
         # update UI
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
-        self._update_scaled_pixmap()
+        self._update_scaled_size()
         self.update()
 
     def set_center_zoom(self, new_center_point: tuple[int, int], new_image_width: int):
         """Set the center point and zoom/image width to the given values."""
         self.center_point = new_center_point
         self.image_width = new_image_width
-        self._update_scaled_pixmap()
+        self._update_scaled_size()
         self.update()
 
-    def set_image(self, img: npt.NDArray, base_img_dims: tuple[int, int]):
-        """Sets the current image to the given NumPy image, and takes the base image dimensions."""
-        qimg = numpy_to_qimage(img)
-        self.pixmap = QPixmap.fromImage(qimg)
+    def set_image(self, img: npt.NDArray, base_img_dims: tuple[int, int], pyramid: ImagePyramid | None = None):
+        """
+        Sets the current image to the given NumPy image, and takes the base image dimensions.
+        A given `pyramid` of the image (e.g. built on a worker thread) is shown instead of building one,
+        and setting the image that is already shown keeps its pyramid.
+        """
+        if pyramid is not None:
+            self.pyramid = pyramid
+        elif img is not self.pyramid_source or self.pyramid is None:
+            self.pyramid = ImagePyramid(numpy_to_qimage(img))
+        self.pyramid_source = img
         self.base_img_dims = base_img_dims
-        self._update_scaled_pixmap()
+        self._update_scaled_size()
         self.update()
     
+    def set_overlay(self, overlay: AnnotationOverlay | None):
+        """Sets the annotations painted over the image (in base image coordinates), or removes them."""
+        self.overlay = overlay
+        self.update()
+
+    def update_overlay_item(self, index: int):
+        """Repaint only the area of the given overlay axon (e.g. after its selected state changed)."""
+        origin_scale = self._image_origin_scale()
+        if self.overlay is None or origin_scale is None:
+            return
+        self.update(self.overlay.item_rect(index, *origin_scale).toAlignedRect())
+
+    def render_annotated(self, img: npt.NDArray) -> npt.NDArray:
+        """
+        Returns a copy of the given image (the current image) with the overlay drawn into it,
+        at the image's own resolution (e.g. to save the current image view).
+        """
+        if self.overlay is None or self.base_img_dims is None:
+            return np.copy(img)
+        if img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        qimg = numpy_to_qimage(np.ascontiguousarray(img)).convertToFormat(QImage.Format.Format_RGB888)
+        h, w = img.shape[:2]
+        scale = w / self.base_img_dims[0]
+        draw_scale = int(8 * max(h, w) / 4096) # labels sized like in exported labeled images
+        painter = QPainter(qimg)
+        self.overlay.paint(painter, QPointF(0, 0), scale, QRectF(0, 0, w, h), label_pixel_size=max(15, 15 * draw_scale))
+        self.overlay.paint_message(painter, QPointF(0, 0))
+        painter.end()
+        rgb = np.frombuffer(qimg.constBits(), dtype=np.uint8).reshape(h, qimg.bytesPerLine())[:, :3 * w].reshape(h, w, 3)
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
     def clear_image(self):
         """Clears the current image and displays \"No Image Selected\"."""
-        self.pixmap = None
+        self.pyramid = None
+        self.pyramid_source = None
         self.base_img_dims = None
-        self._update_scaled_pixmap()
+        self.overlay = None
+        self._clear_region()
+        self._update_scaled_size()
         self.update()
     
     def set_processing(self, active: bool):
@@ -84,7 +155,7 @@ class ImageView(QWidget):
         painter.fillRect(self.rect(), self.palette().window())
 
         # no image
-        if self.pixmap == None or self.scaled_pixmap == None:
+        if self.pyramid is None or self.scaled_size is None:
             painter.setPen(self.palette().text().color())
             painter.setFont(self.font())
 
@@ -95,21 +166,31 @@ class ImageView(QWidget):
             )
             return
         
-        # render image
-        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        # render image (only the visible tiles, from the pyramid level nearest to the zoom),
+        # fast while zooming and resampled once zooming stops
+        zooming = self.zoom_timer.isActive()
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, not zooming)
         scrn_w, scrn_h = self.size().toTuple()
-        im_w, im_h = self.scaled_pixmap.rect().size().toTuple()
-        top_left = QPoint(
-            scrn_w // 2 + self.center_point[0] - im_w // 2, scrn_h // 2 + self.center_point[1] - im_h // 2
-        )
-        bottom_right = QPoint(
-            scrn_w // 2 + self.center_point[0] + im_w // 2, scrn_h // 2 + self.center_point[1] + im_h // 2
-        )
-        painter.drawPixmap(
-            QRect(top_left, bottom_right),
-            self.scaled_pixmap,
-            self.scaled_pixmap.rect()
-        )
+        target = self.image_target()
+        if target is not None:
+            self.pyramid.draw(painter, target, QRectF(event.rect()), exact=not zooming)
+
+        # annotations, in view coordinates (so they aren't resampled with the image)
+        origin_scale = self._image_origin_scale()
+        if self.overlay is not None and origin_scale is not None:
+            self.overlay.paint(painter, *origin_scale, QRectF(self.rect()), QRectF(event.rect()))
+            self.overlay.paint_message(painter, origin_scale[0])
+
+        # region being dragged
+        if len(self.region_points) > 1:
+            painter.save()
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setPen(QPen(self.palette().highlight().color(), 1, Qt.PenStyle.DashLine))
+            fill = QColor(self.palette().highlight().color())
+            fill.setAlpha(48)
+            painter.setBrush(fill)
+            painter.drawPolygon(QPolygonF(self._region_polygon()))
+            painter.restore()
 
         # processing status indicator
         if self._processing:
@@ -143,27 +224,67 @@ class ImageView(QWidget):
                 text
             )
     
-    def _update_scaled_pixmap(self):
-        """Creates and caches a resized pixmap based on user-controlled zoom."""
-        if not self.pixmap:
-            self.scaled_pixmap = None
+    def _update_scaled_size(self):
+        """Computes the size of the zoomed image based on user-controlled zoom."""
+        if self.pyramid is None:
+            self.scaled_size = None
             return
 
         im_w = self.image_width
-        im_h = int(im_w * self.pixmap.height() / self.pixmap.width())
-
-        self.scaled_pixmap = self.pixmap.scaled(
-            im_w, im_h,
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
+        im_h = int(im_w * self.pyramid.height() / self.pyramid.width())
+        self.scaled_size = (im_w, im_h)
     
+    def image_target(self) -> QRectF | None:
+        """Returns the view rectangle the image is drawn into (`None` without an image)."""
+        if self.pyramid is None:
+            return None
+        return image_target(self.view_state(), (self.pyramid.width(), self.pyramid.height()))
+
+    def view_state(self) -> tuple[tuple[int, int], tuple[int, int], int]:
+        """
+        Returns a snapshot of the view, for `image_target()` (e.g. to prepare an image's pyramid on a worker thread).
+        Returns:
+            view_size (tuple[int, int]): Widget size.
+            center_point (tuple[int, int]): Image center, relative to the widget center.
+            image_width (int): Zoomed image width.
+        """
+        return self.size().toTuple(), self.center_point, self.image_width
+
+    def _image_origin_scale(self) -> tuple[QPointF, float] | None:
+        """
+        Returns:
+            origin (QPointF): View position of the image's top left corner.
+            scale (float): View pixels per base image pixel.
+        """
+        if self.scaled_size is None or self.base_img_dims is None:
+            return None
+        scrn_w, scrn_h = self.size().toTuple()
+        im_w, im_h = self.scaled_size
+        origin = QPointF(scrn_w // 2 + self.center_point[0] - im_w // 2, scrn_h // 2 + self.center_point[1] - im_h // 2)
+        return origin, im_w / self.base_img_dims[0]
+
     def _clear_drag(self):
         """Clears right-click drag event data."""
         self.drag_start_position = None
         self.drag_start_image_position = (0, 0)
         self.drag_active = False
     
+    def _clear_region(self):
+        """Clears left-click region drag event data."""
+        had_region = len(self.region_points) > 0
+        self.region_start_position = None
+        self.region_points = []
+        self.region_lasso = False
+        if had_region:
+            self.update()
+
+    def _region_polygon(self) -> list[QPointF]:
+        """Returns the dragged region's polygon (view coordinates): the lasso's points, or the rectangle's corners."""
+        if self.region_lasso or len(self.region_points) < 2:
+            return self.region_points
+        a, b = self.region_points[0], self.region_points[-1]
+        return [a, QPointF(b.x(), a.y()), b, QPointF(a.x(), b.y())]
+
     def _in_image(self, point: QPoint) -> tuple[bool, QPoint]:
         """
         Convert a global point to rescaled image-relative coordinates.
@@ -171,12 +292,12 @@ class ImageView(QWidget):
             is_in_image (bool): Whether the point is within the image.
             image_point (QPoint): The rescaled image-relative coordinates of the point.
         """
-        if self.pixmap is None or self.scaled_pixmap is None or self.base_img_dims is None:
-            logger.err("_in_image(): called when pixmap, scaled_pixmap, or base_img_dims is None.", self)
+        if self.pyramid is None or self.scaled_size is None or self.base_img_dims is None:
+            logger.err("_in_image(): called when pyramid, scaled_size, or base_img_dims is None.", self)
             return False, QPoint()
         # get top left corner
         scrn_w, scrn_h = self.size().toTuple()
-        im_w, im_h = self.scaled_pixmap.rect().size().toTuple()
+        im_w, im_h = self.scaled_size
         top_left = QPoint(
             scrn_w // 2 + self.center_point[0] - im_w // 2, scrn_h // 2 + self.center_point[1] - im_h // 2
         )
@@ -196,8 +317,9 @@ class ImageView(QWidget):
         return is_in_image, image_point
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
-        if self.pixmap is None or self.scaled_pixmap is None:
+        if self.pyramid is None or self.scaled_size is None:
             self._clear_drag()
+            self._clear_region()
             return super().mousePressEvent(event)
         
         # handle pan start
@@ -205,6 +327,11 @@ class ImageView(QWidget):
             self.drag_start_position = event.pos()
             self.drag_start_image_position = self.center_point
             self.drag_active = True
+        elif event.button() == Qt.MouseButton.LeftButton and self.region_selection_enabled:
+            # a click or a region: decided once the mouse moves or is released
+            self.region_start_position = event.pos()
+            self.region_points = []
+            self.region_lasso = bool(event.modifiers() & Qt.KeyboardModifier.ControlModifier)
         elif event.button() == Qt.MouseButton.LeftButton:
             is_in_image, image_point = self._in_image(event.pos())
             # Propagate mouse event up
@@ -213,8 +340,9 @@ class ImageView(QWidget):
             super().mousePressEvent(event)
     
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
-        if self.pixmap is None or self.scaled_pixmap is None:
+        if self.pyramid is None or self.scaled_size is None:
             self._clear_drag()
+            self._clear_region()
             return super().mouseMoveEvent(event)
 
         # handle pan move
@@ -229,26 +357,51 @@ class ImageView(QWidget):
             )
             self._clamp_center_position()
             self.update()
+        # handle region drag
+        elif event.buttons() & Qt.MouseButton.LeftButton and self.region_start_position is not None:
+            point = event.position()
+            if len(self.region_points) == 0:
+                if (event.pos() - self.region_start_position).manhattanLength() < QApplication.startDragDistance():
+                    return
+                self.region_points = [QPointF(self.region_start_position)]
+            if self.region_lasso:
+                self.region_points.append(point)
+            else:
+                self.region_points[1:] = [point]
+            self.update()
         else:
             super().mouseMoveEvent(event)
     
     def mouseReleaseEvent(self, event: QMouseEvent) -> None:
-        if self.pixmap is None or self.scaled_pixmap is None:
+        if self.pyramid is None or self.scaled_size is None:
             self._clear_drag()
+            self._clear_region()
             return super().mouseReleaseEvent(event)
         
         # handle pan stop
         if event.button() == Qt.MouseButton.RightButton:
             self._clear_drag()
+        # handle region (or click) end
+        elif event.button() == Qt.MouseButton.LeftButton and self.region_start_position is not None:
+            start, polygon = self.region_start_position, self._region_polygon()
+            origin_scale = self._image_origin_scale()
+            self._clear_region()
+            if len(polygon) == 0:
+                is_in_image, image_point = self._in_image(start)
+                self.mouse_pressed.emit(is_in_image, image_point)
+            elif origin_scale is not None:
+                origin, scale = origin_scale
+                points = np.array([(p.x() - origin.x(), p.y() - origin.y()) for p in polygon], dtype=np.float64) / scale
+                self.region_selected.emit(points)
         else:
             super().mouseReleaseEvent(event)
     
     def _clamp_center_position(self):
         """Clamps the image's center position to within the widget area."""
-        if self.pixmap is None or self.scaled_pixmap is None:
+        if self.pyramid is None or self.scaled_size is None:
             return
         cx, cy = self.center_point
-        im_w, im_h = self.scaled_pixmap.size().toTuple()
+        im_w, im_h = self.scaled_size
         scrn_w, scrn_h = self.size().toTuple()
         margin = 30 # so the user can still see the image
         min_x = -scrn_w // 2 - im_w // 2 + margin
@@ -261,14 +414,14 @@ class ImageView(QWidget):
         )
 
     def wheelEvent(self, event: QWheelEvent) -> None:
-        if self.pixmap is None or self.scaled_pixmap is None:
+        if self.pyramid is None or self.scaled_size is None:
             return
 
         old_width = self.image_width
 
         # zoom limits
         screen_width = QGuiApplication.primaryScreen().geometry().width()
-        maximum_zoom = 2 * screen_width
+        maximum_zoom = max(2 * screen_width, 8 * self.pyramid.width()) # only visible tiles are drawn, so deep zoom is cheap
         minimum_zoom = 50
 
         # mouse position relative to widget center
@@ -303,8 +456,9 @@ class ImageView(QWidget):
         )
         self.image_width = new_width
 
-        self._update_scaled_pixmap()
+        self._update_scaled_size()
         self._clamp_center_position()
+        self.zoom_timer.start()
         self.update()
     
     def get_center_point(self) -> tuple[int, int]:
@@ -316,6 +470,12 @@ class ImageView(QWidget):
         return self.image_width
 
 # -- helpers --
+def image_target(view_state: tuple[tuple[int, int], tuple[int, int], int], image_size: tuple[int, int]) -> QRectF:
+    """Returns the view rectangle an image of the given size is drawn into, given `ImageView.view_state()`."""
+    (scrn_w, scrn_h), (cx, cy), im_w = view_state
+    im_h = int(im_w * image_size[1] / image_size[0])
+    return QRectF(scrn_w // 2 + cx - im_w // 2, scrn_h // 2 + cy - im_h // 2, im_w, im_h)
+
 def numpy_to_qimage(img: npt.NDArray) -> QImage:
     """Convert NumPy image to QImage."""
     if img.ndim == 2:
@@ -4,12 +4,16 @@ from PySide6.QtCore import (
     Slot,
     QMutex,
     QTimer,
-    QWaitCondition
+    QWaitCondition,
+    QRectF
 )
 
+from panels.image.image_pyramid import ImagePyramid
+from panels.image.image_view import image_target, numpy_to_qimage
 from imgproc.process_image import process_image
+from imgproc.result_cache import MemoryResultCache, DiskResultCache, image_digest, result_cache_key
 
-from models import AppState, Settings
+from models import Settings
 
 from pathlib import Path
 import numpy as np
@@ -19,7 +23,7 @@ import cv2
 
 
 class ImgProcWorker(QObject):
-    finished = Signal(object, object, object) # image, segmentation data, settings
+    finished = Signal(object, object, object, object, bool, bool) # image, its display pyramid, segmentation data, settings, cached, time budget hit
     error = Signal(str)
     processingChanged = Signal(bool)
 
@@ -29,11 +33,18 @@ class ImgProcWorker(QObject):
         self._wait = QWaitCondition()
 
         self._image = None
+        self._source = None
         self._settings = None
+        self._view = None
         self._has_job = False
         self._stop_requested = False
         self._stop_event = threading.Event()
-        self.font_path = AppState.annotation_font_path()
+
+        # result caches: processed display images in memory, contour data on disk (shared with batches)
+        self.memory_cache = MemoryResultCache()
+        self.disk_cache = DiskResultCache()
+        self._digest_source = None
+        self._digest: str | None = None
 
     @Slot()
     def start(self):
@@ -48,7 +59,9 @@ class ImgProcWorker(QObject):
                 break
 
             image = self._image
+            source = self._source
             settings = self._settings
+            view = self._view
             self._has_job = False
             self._mutex.unlock()
             
@@ -57,17 +70,23 @@ class ImgProcWorker(QObject):
 
             try:
                 if image is not None and settings is not None:
-                    self._process(image, settings)
+                    self._process(image, source, settings, view)
             finally:
                 # finish processing message
                 self.processingChanged.emit(False)
 
-    def enqueue(self, image, settings):
+    def enqueue(self, image, settings, view=None):
+        """
+        Process the given image with the given settings (cancelling the current job). Given the `ImageView.view_state()`
+        the result will be shown in, its display pyramid is also prepared for that view.
+        """
         self._mutex.lock()
         self._stop_event.set()    # cancel current processing
         self._stop_event.clear()  # prepare for new job
         self._image = image.copy()
+        self._source = image # identifies the image, so it's only hashed once
         self._settings = settings
+        self._view = view
         self._has_job = True
         self._wait.wakeOne()
         self._mutex.unlock()
@@ -80,47 +99,100 @@ class ImgProcWorker(QObject):
         self._wait.wakeOne()
         self._mutex.unlock()
     
-    def _process(self, image: np.ndarray, settings: Settings):
+    def _get_cache_keys(self, image: np.ndarray, source: object, settings: Settings) -> tuple[str, str]:
+        """
+        Returns:
+            disk_key (str): Result cache key of the given image and settings.
+            memory_key (str): Same, but also specific to the displayed image (thresholded or not).
+        """
+        if source is not self._digest_source or self._digest is None:
+            self._digest = image_digest(image)
+            self._digest_source = source
+        disk_key = result_cache_key(self._digest, settings)
+        return disk_key, f"{disk_key}|{settings.show_threshold}"
+
+    def _display_pyramid(self, image: np.ndarray, view) -> ImagePyramid | None:
+        """
+        Returns the pyramid `ImageView` displays the given result with, and resamples the tiles the given view shows,
+        so the GUI thread only has to upload them.
+        """
+        if image.ndim < 2 or image.shape[0] == 0 or image.shape[1] == 0:
+            return None
+        pyramid = ImagePyramid(numpy_to_qimage(np.ascontiguousarray(image)))
+        if view is not None:
+            view_size = view[0]
+            pyramid.prepare(image_target(view, (pyramid.width(), pyramid.height())), QRectF(0, 0, *view_size))
+        return pyramid
+
+    def _process(self, image: np.ndarray, source: object, settings: Settings, view=None):
         try:
             if settings.show_original:
-                result = image
-                contour_data_list = None # None means don't analyze data
-            else:
-                resized = cv2.resize(
-                    image,
-                    None,
-                    fx=1 / settings.resolution_divisor,
-                    fy=1 / settings.resolution_divisor
-                )
-                resized = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
-
-                nm_per_pixel = (
-                    settings.scale
-                    if settings.scale_units == "nm"
-                    else settings.scale * 1000
-                )
-
-                result, contour_data_list = process_image(
-                    resized,
-                    settings.resolution_divisor,
-                    settings.show_threshold,
-                    settings.show_text,
-                    nm_per_pixel,
-                    settings.threshold,
-                    settings.radius,
-                    settings.dilate,
-                    settings.erode,
-                    settings.min_size,
-                    settings.max_size,
-                    settings.convexity,
-                    settings.circularity,
-                    settings.thickness_percentile,
-                    self._stop_event,
-                    AppState.annotation_font_path(),
-                    timed=True
+                self.finished.emit(image, self._display_pyramid(image, view), None, settings, False, False) # None means don't analyze data
+                return
+
+            disk_key, memory_key = self._get_cache_keys(image, source, settings)
+            cached = self.memory_cache.get(memory_key)
+            if cached is not None:
+                result, contour_data_list = cached
+                self.finished.emit(result, self._display_pyramid(result, view), contour_data_list, settings, True, False)
+                return
+
+            timings: dict[str, float] = {}
+            resized = cv2.resize(
+                image,
+                None,
+                fx=1 / settings.resolution_divisor,
+                fy=1 / settings.resolution_divisor
+            )
+            resized = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
+
+            nm_per_pixel = (
+                settings.scale
+                if settings.scale_units == "nm"
+                else settings.scale * 1000
+            )
+
+            result, contour_data_list = process_image(
+                resized,
+                settings.resolution_divisor,
+                settings.show_threshold,
+                settings.show_text,
+                nm_per_pixel,
+                settings.threshold,
+                settings.radius,
+                settings.dilate,
+                settings.erode,
+                settings.min_size,
+                settings.max_size,
+                settings.convexity,
+                settings.circularity,
+                settings.thickness_percentile,
+                self._stop_event,
+                None, # annotations are painted over the image by ImageView
+                timed=True,
+                timings=timings
+            )
+            if contour_data_list is not None and not self._stop_event.is_set():
+                result = resized # (a cancelled result stays empty, so it isn't shown)
+
+            # only cache complete results (not cancelled, superseded or cut short by the time budget)
+            complete = (
+                result.size > 0
+                and not self._has_job
+                and not self._stop_event.is_set()
+                and not timings.get("budget_hit", False)
+            )
+            if complete:
+                size = result.nbytes + sum(
+                    c.inner_contour.nbytes + c.outer_contour.nbytes for c in (contour_data_list or [])
                 )
+                self.memory_cache.put(memory_key, (result, contour_data_list), size)
+                if contour_data_list is not None:
+                    self.disk_cache.put(disk_key, contour_data_list)
 
-            self.finished.emit(result, contour_data_list, settings)
+            self.finished.emit(
+                result, self._display_pyramid(result, view), contour_data_list, settings, False, timings.get("budget_hit", False)
+            )
 
         except Exception as e:
             self.error.emit(traceback.format_exc())
@@ -0,0 +1,58 @@
+from models import ContourData
+
+import numpy as np
+import math
+import cv2
+
+class ContourHitIndex():
+    """
+    Spatial index for review-mode clicks. Each axon is clickable within its click circle: the inner contour's centroid,
+    with the radius of a circle of the same perimeter (in image pixels). The circles are put in a uniform grid,
+    so a click only tests the few axons whose circle overlaps its grid cell, whatever the number of axons.
+    """
+
+    def __init__(self, contour_data: list[ContourData], resolution_divisor: float):
+        """Compute every axon's click circle once (e.g. when a .SEG file is loaded)."""
+        self.resolution_divisor = resolution_divisor
+        self.inner_contours = [c.inner_contour for c in contour_data]
+        self.centers = np.zeros((len(contour_data), 2), dtype=np.float64)
+        self.radii = np.zeros(len(contour_data), dtype=np.float64)
+        valid = np.zeros(len(contour_data), dtype=bool)
+        for i, contour in enumerate(self.inner_contours):
+            M = cv2.moments(contour)
+            if M["m00"] == 0:
+                continue
+            self.centers[i] = (M["m10"] / M["m00"] * resolution_divisor, M["m01"] / M["m00"] * resolution_divisor)
+            self.radii[i] = cv2.arcLength(contour, closed=True) / (2 * math.pi) * resolution_divisor
+            valid[i] = True
+
+        # cells about as large as a typical click circle, so each holds a few axons
+        self.cell_size = max(1.0, 2 * float(np.median(self.radii[valid]))) if valid.any() else 1.0
+        self.cells: dict[tuple[int, int], list[int]] = {}
+        lows = np.floor((self.centers - self.radii[:, None]) / self.cell_size).astype(np.int64)
+        highs = np.floor((self.centers + self.radii[:, None]) / self.cell_size).astype(np.int64)
+        for i in np.flatnonzero(valid):
+            for gx in range(lows[i, 0], highs[i, 0] + 1):
+                for gy in range(lows[i, 1], highs[i, 1] + 1):
+                    self.cells.setdefault((gx, gy), []).append(int(i))
+
+    def hit(self, x: float, y: float) -> int | None:
+        """
+        Returns the index of the clicked axon at the given image point, or `None`.
+        Of the axons whose click circle contains the point, one whose inner contour contains it (exact point-in-polygon test)
+        wins over one whose doesn't, so overlapping circles of neighboring axons are told apart. Ties go to the closest centroid.
+        """
+        candidates = self.cells.get((math.floor(x / self.cell_size), math.floor(y / self.cell_size)))
+        if candidates is None:
+            return None
+        point = (x / self.resolution_divisor, y / self.resolution_divisor) # contours are in processed pixels
+        best: tuple[bool, float] | None = None
+        best_index: int | None = None
+        for i in candidates:
+            distance = math.hypot(self.centers[i, 0] - x, self.centers[i, 1] - y)
+            if distance > self.radii[i]:
+                continue
+            outside = cv2.pointPolygonTest(self.inner_contours[i], point, measureDist=False) < 0
+            if best is None or (outside, distance) < best:
+                best, best_index = (outside, distance), i
+        return best_index
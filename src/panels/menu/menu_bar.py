@@ -60,12 +60,24 @@ class MenuBar(QMenuBar):
     save_image_view_triggered = Signal()
     """Emits when the user requests to save the currently displayed image."""
 
+    migrate_triggered = Signal()
+    """Emits when the user requests to migrate legacy segmentation files."""
+
     close_files_triggered = Signal(list)
     """Emits list of `Path`s when user requests to close multiple files."""
 
     gen_seg_data_triggered = Signal()
     """Emits when the user requests to generate segmentation data."""
 
+    remeasure_triggered = Signal()
+    """Emits when the user requests to re-measure thickness in segmentation files."""
+
+    catalog_triggered = Signal()
+    """Emits when the user requests to query the results catalog."""
+
+    select_rule_triggered = Signal()
+    """Emits when the user requests to select or deselect the reviewed axons matching a rule."""
+
     def __init__(self, 
                  app_state: AppState,
                  image_panel: ImagePanel,
@@ -133,6 +145,11 @@ class MenuBar(QMenuBar):
         )
         self.addAction(save_menu_shortcut)
 
+        # migrate legacy .seg files
+        migrate_action = QAction("Migrate legacy segmentation files", self)
+        migrate_action.triggered.connect(self.migrate_triggered.emit)
+        self.file_menu.addAction(migrate_action)
+
         # close files
         close_files_action = QAction("Close multiple files", self)
         close_files_action.triggered.connect(self._handle_close_files)
@@ -144,6 +161,15 @@ class MenuBar(QMenuBar):
         self.exit_action = QAction("Exit", self)
         self.file_menu.addAction(self.exit_action)
 
+        # -- edit --
+        edit_menu = self.addMenu("Edit")
+
+        # rule-based selection
+        self.select_rule_action = QAction("Select axons by rule...", self)
+        self.select_rule_action.setShortcut(QKeySequence("Ctrl+R"))
+        self.select_rule_action.triggered.connect(self.select_rule_triggered.emit)
+        edit_menu.addAction(self.select_rule_action)
+
         # -- view --
         view_menu = self.addMenu("View")
         
@@ -209,6 +235,16 @@ class MenuBar(QMenuBar):
         self.gen_seg_data_action = QAction("Segmentation data", self)
         self.gen_seg_data_action.triggered.connect(self.gen_seg_data_triggered.emit)
         generate_menu.addAction(self.gen_seg_data_action)
+
+        # re-measured thickness
+        self.remeasure_action = QAction("Re-measured thickness", self)
+        self.remeasure_action.triggered.connect(self.remeasure_triggered.emit)
+        generate_menu.addAction(self.remeasure_action)
+
+        # results catalog
+        self.catalog_action = QAction("Results catalog", self)
+        self.catalog_action.triggered.connect(self.catalog_triggered.emit)
+        generate_menu.addAction(self.catalog_action)
     
     def _popup_submenu(self, submenu: QMenu):
         """Show the given menu."""
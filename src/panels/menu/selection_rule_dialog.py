@@ -0,0 +1,110 @@
+from PySide6.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QLineEdit,
+    QComboBox,
+    QPushButton
+)
+
+from bulk_selection import SelectionRule, RULE_NAMES
+
+import numpy.typing as npt
+import numpy as np
+
+class SelectionRuleDialog(QDialog):
+    """Select or deselect every axon of the reviewed image that matches a rule, e.g. `circularity < 0.6 or g_ratio > 0.9`."""
+
+    def __init__(
+        self,
+        metrics: dict[str, npt.NDArray],
+        selected_states: list[bool],
+        units: str,
+        rule_text: str = "",
+        parent=None,
+    ):
+        """Takes the reviewed axons' `axon_metrics()` (lengths in the given `units`) and their current selected states."""
+        super().__init__(parent)
+        self.setWindowTitle("Select Axons by Rule")
+        self.setModal(True)
+        self.resize(520, 0)
+
+        self.metrics = metrics
+        self.selected_states = np.asarray(selected_states, dtype=bool)
+        self._mask: npt.NDArray[np.bool_] | None = None
+
+        main_layout = QVBoxLayout(self)
+
+        # --- rule ---
+        self.action_combo = QComboBox()
+        self.action_combo.addItem("Deselect matching axons", False)
+        self.action_combo.addItem("Select matching axons", True)
+        self.action_combo.currentIndexChanged.connect(self._update_status)
+        main_layout.addWidget(self.action_combo)
+
+        self.rule_edit = QLineEdit(rule_text)
+        self.rule_edit.setPlaceholderText("circularity < 0.6 or g_ratio > 0.9")
+        self.rule_edit.textChanged.connect(self._update_status)
+        main_layout.addWidget(self.rule_edit)
+
+        unit_label = "µm" if units == "um" else units
+        help_label = QLabel(
+            f"Compare {', '.join(RULE_NAMES)} (lengths in {unit_label}) to numbers with <, <=, >, >=, == or !=, "
+            "and combine comparisons with and, or, not and parentheses."
+        )
+        help_label.setWordWrap(True)
+        main_layout.addWidget(help_label)
+
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        main_layout.addWidget(self.status_label)
+
+        # --- buttons ---
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+
+        self.ok_btn = QPushButton("OK")
+        cancel_btn = QPushButton("Cancel")
+
+        self.ok_btn.clicked.connect(self.accept)
+        cancel_btn.clicked.connect(self.reject)
+        self.ok_btn.setDefault(True)
+
+        button_layout.addWidget(cancel_btn)
+        button_layout.addWidget(self.ok_btn)
+
+        main_layout.addLayout(button_layout)
+
+        self._update_status()
+
+    def mask(self) -> npt.NDArray[np.bool_] | None:
+        """Returns which axons match the rule (`None` if the rule is invalid)."""
+        return self._mask
+
+    def selected(self) -> bool:
+        """Returns whether matching axons are to be selected (or deselected)."""
+        return bool(self.action_combo.currentData())
+
+    def rule_text(self) -> str:
+        return self.rule_edit.text()
+
+    def _update_status(self):
+        """Evaluate the rule as it is typed, and show how many axons it matches (or why it is invalid)."""
+        try:
+            self._mask = SelectionRule(self.rule_edit.text()).evaluate(self.metrics)
+        except ValueError as e:
+            self._mask = None
+            self.status_label.setStyleSheet("color: red;" if self.rule_edit.text().strip() != "" else "")
+            self.status_label.setText(str(e) if self.rule_edit.text().strip() != "" else "Enter a rule.")
+            self.ok_btn.setEnabled(False)
+            return
+
+        matches = int(np.count_nonzero(self._mask))
+        changes = int(np.count_nonzero(self._mask & (self.selected_states != self.selected())))
+        self.status_label.setStyleSheet("")
+        self.status_label.setText(
+            f"{matches} of {len(self.selected_states)} axons match; "
+            f"{changes} would be {'selected' if self.selected() else 'deselected'}."
+        )
+        self.ok_btn.setEnabled(changes > 0)
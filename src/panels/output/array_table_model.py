@@ -0,0 +1,70 @@
+from PySide6.QtCore import (
+    Qt,
+    QAbstractTableModel,
+    QModelIndex,
+    QPersistentModelIndex
+)
+
+import numpy.typing as npt
+import numpy as np
+
+class ArrayTableModel(QAbstractTableModel):
+    """
+    Read-only table of NumPy columns. Cells are formatted only when a view asks for them (i.e. when they are visible),
+    so showing thousands of rows costs no more than showing a screenful.
+    """
+
+    decimals: int = 3
+    """Decimals shown for floating point values."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.headers: list[str] = []
+        self.columns: list[npt.NDArray] = []
+        self.order: npt.NDArray = np.zeros(0, dtype=np.int64)
+        """Row of each displayed row (after sorting)."""
+
+    def set_columns(self, headers: list[str], columns: list[npt.NDArray]):
+        """Replace the table's contents with the given columns (of equal lengths)."""
+        self.beginResetModel()
+        self.headers = list(headers)
+        self.columns = [np.asarray(c) for c in columns]
+        self.order = np.arange(len(self.columns[0]) if len(self.columns) > 0 else 0)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_columns([], [])
+
+    def rowCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.order)
+
+    def columnCount(self, parent: QModelIndex | QPersistentModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index: QModelIndex | QPersistentModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = self.columns[index.column()][self.order[index.row()]]
+            if np.issubdtype(type(value), np.floating):
+                return f"{value:.{self.decimals}f}"
+            return str(value)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.headers[section] if section < len(self.headers) else None
+        return str(section + 1)
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder):
+        """Sort rows by the given column (one `argsort` of the column)."""
+        if column < 0 or column >= len(self.columns):
+            return
+        self.layoutAboutToBeChanged.emit()
+        ascending = np.argsort(self.columns[column], kind="stable")
+        self.order = ascending[::-1] if order == Qt.SortOrder.DescendingOrder else ascending
+        self.layoutChanged.emit()
@@ -1,65 +1,115 @@
 from PySide6.QtCore import (
+    Qt,
     QSize,
     Slot
 )
 from PySide6.QtGui import (
-    QTextCursor, 
-    QTextCharFormat, 
-    QColor, 
+    QTextCursor,
+    QTextCharFormat,
+    QColor,
     QFont
 )
 from PySide6.QtWidgets import (
     QWidget,
-    QVBoxLayout, 
+    QVBoxLayout,
     QTextEdit,
-    QTextBrowser
+    QTextBrowser,
+    QSplitter,
+    QLabel,
+    QTableView,
+    QHeaderView,
+    QAbstractItemView
 )
 
+from panels.output.array_table_model import ArrayTableModel
+
 from models import AppState, logger
 
+import numpy.typing as npt
+
 class OutputPanel(QWidget):
-    """Textbox for showing program outputs."""
+    """Textbox for showing program outputs, above a table for per-item data (e.g. each axon's measurements)."""
 
     def __init__(self, app_state: AppState):
         super().__init__()
 
         # add widgets to layout
         self.vlayout = QVBoxLayout(self)
+        self.splitter = QSplitter(Qt.Orientation.Vertical)
         self.text_browser = QTextBrowser()
-        self.vlayout.addWidget(self.text_browser)
+        self.splitter.addWidget(self.text_browser)
+
+        # table (only asks its model for the visible cells)
+        table_widget = QWidget()
+        table_layout = QVBoxLayout(table_widget)
+        table_layout.setContentsMargins(0, 0, 0, 0)
+        self.table_label = QLabel()
+        font = self.table_label.font()
+        font.setUnderline(True)
+        self.table_label.setFont(font)
+        self.table_model = ArrayTableModel(self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.table_model)
+        self.table_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.verticalHeader().setVisible(False)
+        self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive) # (fitting to contents reads every row)
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        table_layout.addWidget(self.table_label)
+        table_layout.addWidget(self.table_view)
+        self.splitter.addWidget(table_widget)
+        self.table_widget = table_widget
+        self.table_widget.hide()
+        self.vlayout.addWidget(self.splitter)
 
         # add layout to current widget
         self.setLayout(self.vlayout)
+        self._formats: dict[tuple[bool, bool, bool, str], QTextCharFormat] = {}
 
         # connect Logger
         logger.printTriggered.connect(self.print)
         logger.clearTriggered.connect(self.clear)
-    
-    @Slot(str, bool, bool, bool, str)
-    def print(self, 
-              s: str, 
-              bold: bool = False,
-              italic: bool = False,
-              underline: bool = False,
-              color: str = "black"
-        ):
-        """Append the given string to the `OutputPanel`'s text display."""
+        logger.tableTriggered.connect(self.show_table)
+
+    @Slot(list)
+    def print(self, spans: list[tuple[str, bool, bool, bool, str]]):
+        """Append the given `(text, bold, italic, underline, color)` spans to the `OutputPanel`'s text display, in one edit."""
         cursor = self.text_browser.textCursor()
+        cursor.beginEditBlock()
         cursor.movePosition(QTextCursor.MoveOperation.End)
-
-        fmt = QTextCharFormat()
-        fmt.setFontWeight(QFont.Weight.Bold if bold else QFont.Weight.Normal)
-        fmt.setFontPointSize(12)
-        fmt.setFontItalic(italic)
-        fmt.setFontUnderline(underline)
-        fmt.setForeground(QColor(color))
-
-        cursor.setCharFormat(fmt)
-        cursor.insertText(s)
+        for s, bold, italic, underline, color in spans:
+            cursor.setCharFormat(self._format(bold, italic, underline, color))
+            cursor.insertText(s)
+        cursor.endEditBlock()
         cursor.movePosition(QTextCursor.MoveOperation.Start)
         self.text_browser.setTextCursor(cursor)
 
+    @Slot(str, list, list)
+    def show_table(self, title: str, headers: list[str], columns: list[npt.NDArray]):
+        """Show the given columns in the `OutputPanel`'s table."""
+        self.table_label.setText(title)
+        self.table_view.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table_model.set_columns(headers, columns)
+        self.table_widget.show()
+
     @Slot()
     def clear(self):
-        """Clear the `OutputPanel`'s text display."""
-        self.text_browser.clear()
\ No newline at end of file
+        """Clear the `OutputPanel`'s text display and table."""
+        self.text_browser.clear()
+        self.table_model.clear()
+        self.table_widget.hide()
+
+    def _format(self, bold: bool, italic: bool, underline: bool, color: str) -> QTextCharFormat:
+        """Returns the character format of the given style (created once per style)."""
+        key = (bold, italic, underline, color)
+        fmt = self._formats.get(key)
+        if fmt is None:
+            fmt = QTextCharFormat()
+            fmt.setFontWeight(QFont.Weight.Bold if bold else QFont.Weight.Normal)
+            fmt.setFontPointSize(12)
+            fmt.setFontItalic(italic)
+            fmt.setFontUnderline(underline)
+            fmt.setForeground(QColor(color))
+            self._formats[key] = fmt
+        return fmt
@@ -0,0 +1,183 @@
+from models import Settings, FileMan
+
+from datetime import datetime
+from pathlib import Path
+import json
+
+class BatchManifest():
+    """
+    Checkpoint of a batch, written as JSON lines next to the batch's .SEG files.
+    Every change is appended and flushed immediately, and when the manifest is read back,
+    the last row of each input file or page wins. A crash therefore loses at most the row being written.
+    """
+
+    file_name: str = "batch_manifest.jsonl"
+
+    def __init__(self, save_dir: Path):
+        self.save_dir = save_dir
+        self.path = save_dir / self.file_name
+        self.settings: Settings | None = None
+        self.settings_hash: str | None = None
+        self.stamp: str | None = None
+        """Timestamp in the names of the batch's .SEG files (`None` for manifests written before it was recorded)."""
+        self.options: dict[str, bool] = {}
+        """Options of the batch (`export_data`, `use_cache`, `keep_stages`, `keep_samples`, `reference_images`), reused when it is resumed."""
+        self.inputs: dict[str, dict] = {}
+        """Input file rows (`size`, `mtime_ns`, `page_count`, `content_hash`) by image path."""
+        self.pages: dict[tuple[str, int], dict] = {}
+        """Page rows (`status`, `seg_file`, `error`) by image path and page."""
+        self._file = None
+        self._load()
+
+    @staticmethod
+    def exists(save_dir: Path) -> bool:
+        """Returns whether the given folder contains a batch manifest."""
+        return (save_dir / BatchManifest.file_name).is_file()
+
+    def _load(self):
+        """Replay the manifest's rows, if it exists."""
+        try:
+            with open(self.path, 'r') as f:
+                lines = f.readlines()
+        except Exception:
+            return
+        for line in lines:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue # torn final row after a crash
+            row_type = row.pop('type', None)
+            if row_type == "header":
+                self.settings = Settings.from_dict(row['settings'])
+                self.settings_hash = row['settings_hash']
+                self.stamp = row.get('stamp')
+                self.options = row.get('options', {})
+            elif row_type == "input":
+                self.inputs[row['image']] = row
+            elif row_type == "page":
+                self.pages[(row['image'], row['page'])] = row
+
+    def _append(self, row_type: str, row: dict):
+        """Append one row and flush it."""
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps({'type': row_type, **row}) + "\n")
+        self._file.flush()
+
+    def _record_input(self, path: Path, page_count: int, content_hash: str | None):
+        """Write an input file row with the file's current size and modification time."""
+        try:
+            stat = path.stat()
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size, mtime_ns = -1, -1
+        row = {
+            'image': str(path),
+            'page_count': page_count,
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'content_hash': content_hash
+        }
+        self.inputs[str(path)] = row
+        self._append("input", row)
+
+    def begin(self, jobs: list[tuple[Path, int, int]], settings: Settings, stamp: str, options: dict[str, bool]):
+        """
+        Record the batch's settings, .SEG file timestamp and options (for new batches)
+        and any jobs not in the manifest yet as `pending`.
+        """
+        if self.settings is None:
+            self.settings = settings
+            self.settings_hash = settings.processing_hash()
+            self.stamp = stamp
+            self.options = dict(options)
+            self._append("header", {
+                'settings_hash': self.settings_hash,
+                'settings': settings.model_dump(),
+                'stamp': stamp,
+                'options': self.options,
+                'created': datetime.now().isoformat(timespec="seconds")
+            })
+        for path, page, page_count in jobs:
+            if str(path) not in self.inputs:
+                self._record_input(path, page_count, None)
+            if (str(path), page) not in self.pages:
+                self.record_page(path, page, "pending")
+
+    def record_page(self, path: Path, page: int, status: str, seg_file: str | None = None, error: str | None = None):
+        """Record the status (`pending`, `done`, `cancelled` or `failed`) and output file of a page."""
+        row = {'image': str(path), 'page': page, 'status': status, 'seg_file': seg_file, 'error': error}
+        self.pages[(str(path), page)] = row
+        self._append("page", row)
+
+    def record_hash(self, path: Path, content_hash: str):
+        """Record the content hash of an input file (computed by the worker that decoded its first page)."""
+        entry = self.inputs.get(str(path))
+        page_count = entry['page_count'] if entry is not None else 1
+        self._record_input(path, page_count, content_hash)
+
+    def _input_unchanged(self, path: Path) -> bool:
+        """
+        An input is unchanged if its size and modification time match. Otherwise,
+        its contents are hashed and compared with the recorded hash (e.g. the file was only copied).
+        """
+        entry = self.inputs.get(str(path))
+        if entry is None:
+            return False
+        stat = path.stat()
+        if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        if entry['content_hash'] is None or stat.st_size != entry['size']:
+            return False
+        if FileMan.file_hash(path) != entry['content_hash']:
+            return False
+        self._record_input(path, entry['page_count'], entry['content_hash']) # remember the new mtime
+        return True
+
+    def remaining_jobs(self) -> tuple[list[tuple[Path, int, int]], list[Path]]:
+        """
+        Find the work left in this batch: pages that are not `done`, whose .SEG file is gone,
+        or whose input file changed since it was processed (then all of its pages are redone).
+        Returns:
+            jobs (list[tuple[Path, int, int]]): `(image path, page, page count)` jobs to process.
+            missing (list[Path]): Input files that no longer exist or can't be read.
+        """
+        jobs: list[tuple[Path, int, int]] = []
+        missing: list[Path] = []
+        for image, entry in self.inputs.items():
+            path = Path(image)
+            if not path.is_file():
+                missing.append(path)
+                continue
+            if self._input_unchanged(path):
+                for page in range(entry['page_count']):
+                    row = self.pages.get((image, page))
+                    done = (
+                        row is not None
+                        and row['status'] == "done"
+                        and row['seg_file'] is not None
+                        and (self.save_dir / row['seg_file']).is_file()
+                    )
+                    if not done:
+                        jobs.append((path, page, entry['page_count']))
+            else:
+                page_count = FileMan.page_count(path)
+                if page_count <= 0:
+                    missing.append(path)
+                    continue
+                self._record_input(path, page_count, None) # new version of the file
+                jobs.extend((path, page, page_count) for page in range(page_count))
+        return jobs, missing
+
+    def counts(self) -> dict[str, int]:
+        """Returns the number of pages in each status."""
+        counts: dict[str, int] = {}
+        for row in self.pages.values():
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        return counts
+
+    def close(self):
+        """Close the manifest file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,20 @@
+from pathlib import Path
+import json
+
+class BatchReport():
+    """Machine-readable per-image performance report, written as JSON lines next to the batch's .SEG files."""
+
+    file_name: str = "batch_report.jsonl"
+
+    def __init__(self, save_dir: Path):
+        self.path = save_dir / self.file_name
+        self._file = open(self.path, "a")
+
+    def write_row(self, row: dict):
+        """Append one row and flush it, so the report survives crashes mid-batch."""
+        self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+
+    def close(self):
+        """Close the report file."""
+        self._file.close()
@@ -0,0 +1,114 @@
+from models import Settings, FileMan
+
+from PIL import Image
+from pathlib import Path
+import json
+
+batch_history_path = FileMan.resource_path("__appdata__/batch_history.json")
+
+class BatchScheduler():
+    """Orders batch jobs largest-first by estimated cost, learning from previously processed pages."""
+
+    max_history: int = 5000
+    """Maximum number of remembered page timings."""
+
+    def __init__(self, history_path: Path = batch_history_path):
+        self.history_path = history_path
+        self.page_seconds: dict[str, float] = {}
+        self.seconds_per_megapixel: float | None = None
+        self._load()
+
+    def _load(self):
+        """Read timing history, otherwise start empty."""
+        try:
+            with open(self.history_path, 'r') as f:
+                history = json.load(f)
+            self.page_seconds = {str(k): float(v) for k, v in history['page_seconds'].items()}
+            rate = history['seconds_per_megapixel']
+            self.seconds_per_megapixel = float(rate) if rate is not None else None
+        except Exception:
+            self.page_seconds = {}
+            self.seconds_per_megapixel = None
+
+    def save(self):
+        """Write timing history, keeping only the most recent entries."""
+        if len(self.page_seconds) > self.max_history:
+            recent = list(self.page_seconds.items())[-self.max_history:]
+            self.page_seconds = dict(recent)
+        try:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.history_path, 'w') as f:
+                json.dump({
+                    'page_seconds': self.page_seconds,
+                    'seconds_per_megapixel': self.seconds_per_megapixel
+                }, f)
+        except Exception:
+            pass # history is only an optimization
+
+    @staticmethod
+    def _history_key(path: Path, page: int, settings: Settings) -> str:
+        """Timings are only comparable for the same page at the same resolution divisor."""
+        return f"{path}|{page}|{settings.resolution_divisor}"
+
+    @staticmethod
+    def estimate_megapixels(path: Path, settings: Settings) -> list[float] | None:
+        """
+        Read the dimensions of every page of an image from its headers (no pixel decoding).
+        Pages are visited in order with one open file, so a stack's headers are read once.
+        Returns:
+            megapixels (list[float] | None): Pixel count of each page after the resolution divisor, or `None` if the headers are unreadable.
+        """
+        max_image_pixels = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = None # only sizes are read, so large micrographs needn't pass the decompression bomb check
+        try:
+            sizes: list[tuple[int, int]] = []
+            with Image.open(path) as img:
+                for page in range(getattr(img, "n_frames", 1)):
+                    img.seek(page)
+                    sizes.append(img.size)
+        except Exception:
+            return None
+        finally:
+            Image.MAX_IMAGE_PIXELS = max_image_pixels
+        return [w * h / (settings.resolution_divisor ** 2) / 1e6 for w, h in sizes]
+
+    def order(self,
+              jobs: list[tuple[Path, int, int]],
+              settings: Settings
+        ) -> list[tuple[tuple[Path, int, int], float]]:
+        """
+        Sort jobs by estimated processing time, longest first (LPT), to shorten the batch tail.
+        Returns:
+            ordered_jobs (list[tuple[job, float]]): Jobs paired with their estimated megapixels.
+        """
+        file_megapixels: dict[Path, list[float] | None] = {}
+        megapixels: list[float | None] = []
+        for path, page, _ in jobs:
+            if path not in file_megapixels:
+                file_megapixels[path] = self.estimate_megapixels(path, settings)
+            pages = file_megapixels[path]
+            megapixels.append(pages[page] if pages is not None and page < len(pages) else None)
+        known = sorted(mp for mp in megapixels if mp is not None)
+        fallback_mp = known[len(known) // 2] if known else 1.0
+        megapixels = [mp if mp is not None else fallback_mp for mp in megapixels]
+
+        rate = self.seconds_per_megapixel or 1.0
+        def cost(i: int) -> float:
+            path, page, _ = jobs[i]
+            seconds = self.page_seconds.get(self._history_key(path, page, settings))
+            return seconds if seconds is not None else megapixels[i] * rate
+
+        order = sorted(range(len(jobs)), key=cost, reverse=True)
+        return [(jobs[i], megapixels[i]) for i in order]
+
+    def record(self, path: Path, page: int, settings: Settings, seconds: float, megapixels: float):
+        """Remember how long a page took to refine future estimates."""
+        key = self._history_key(path, page, settings)
+        self.page_seconds.pop(key, None) # move to end (most recent)
+        self.page_seconds[key] = seconds
+        if megapixels > 0:
+            rate = seconds / megapixels
+            if self.seconds_per_megapixel is None:
+                self.seconds_per_megapixel = rate
+            else:
+                self.seconds_per_megapixel = 0.8 * self.seconds_per_megapixel + 0.2 * rate
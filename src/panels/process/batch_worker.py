@@ -1,38 +1,179 @@
 from PySide6.QtCore import QObject, Signal, Slot
 
-from imgproc.process_image import process_image
+from imgproc.process_image import process_image, PipelineStages
+from imgproc.result_cache import DiskResultCache, image_digest, result_cache_key
+from imgproc.stage_cache import StageCache
+from imgproc.generate_csv_data import (
+    get_display_name,
+    get_labeled_image_name,
+    get_selected_contour_data,
+    draw_labeled_image,
+    get_csv_summary_lines,
+    get_csv_section_lines
+)
+from panels.process.batch_scheduler import BatchScheduler
+from panels.process.batch_report import BatchReport
+from panels.process.batch_manifest import BatchManifest
+from catalog import ResultsCatalog
 
-from models import Settings, SegmentationData
+from models import AppState, Settings, SegmentationData, ContourData, ImageSource, FileMan
 
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from pydantic import BaseModel, ConfigDict
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 from datetime import datetime
 from pathlib import Path
-from cv2 import imread, cvtColor, COLOR_BGR2GRAY, resize
+from enum import Enum
+from cv2 import cvtColor, COLOR_BGR2GRAY, resize, setNumThreads, getNumThreads, imwrite
 from threading import Event
 import numpy.typing as npt
 import multiprocessing
 import traceback
-import pickle
+import signal
+import time
+import sys
+import os
 
-def process_single_image(
-    args: tuple[Path, npt.NDArray, Settings, Event]
-) -> SegmentationData:
-    """Runs image processing algorithm. Only uses local state and does not access mutable global data."""
+try:
+    import resource # not available on Windows
+except ImportError:
+    resource = None
 
-    # extract args
-    path: Path = args[0]
-    image: npt.NDArray = args[1]
-    settings: Settings = args[2]
-    stop_event = args[3]
+def peak_rss_mb() -> float | None:
+    """Returns the peak resident set size of this process in MB, if the platform reports it."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024 # bytes on macOS, KB elsewhere
+
+class ExecutionBackend(Enum):
+    PROCESS = "process"
+    """One worker process per worker, each limited to its share of OpenCV threads."""
+    THREAD = "thread"
+    """Worker threads inside this process. OpenCV releases the GIL, so this avoids spawning, pickling and per-process memory."""
+    HYBRID = "hybrid"
+    """Half as many worker processes, each running OpenCV with more internal threads."""
+
+def _init_pool_process(cv_threads: int):
+    """Limit OpenCV's internal parallelism inside a worker process. Ctrl+C is left to the coordinator, which stops the pool."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setNumThreads(cv_threads)
+
+def create_executor(backend: ExecutionBackend, workers: int) -> tuple[Executor, int]:
+    """
+    Create the worker pool for the given backend. OpenCV's thread count is set so that 
+    pool size times OpenCV threads roughly matches the number of cores.
+    **NOTE:** The `THREAD` backend changes OpenCV's thread count for this whole process. The caller should restore it.
+    Returns:
+        executor (Executor): The worker pool.
+        pool_size (int): Number of tasks the pool runs concurrently.
+    """
+    cores = os.cpu_count() or 1
+    if backend == ExecutionBackend.THREAD:
+        setNumThreads(max(1, cores // workers))
+        return ThreadPoolExecutor(max_workers=workers), workers
+
+    processes = max(1, workers // 2) if backend == ExecutionBackend.HYBRID else workers
+    executor = ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_pool_process,
+        initargs=(max(1, cores // processes),)
+    )
+    return executor, processes
+
+class BatchResult(BaseModel):
+    """Small status record returned by batch workers in place of the full `SegmentationData`."""
+    model_config = ConfigDict(frozen=True)
+
+    image_path: Path
+    """Processed image file."""
+
+    page: int
+    """Zero-indexed page of the processed image."""
+
+    page_count: int
+    """Number of pages in the processed image file."""
+
+    seg_path: Path
+    """Segmentation file written by the worker."""
+
+    axon_count: int
+    """Number of axons found."""
+
+    cancelled: bool
+    """Whether processing was stopped before the segmentation file was written."""
 
-    # get scale
+    megapixels: float
+    """Processed pixel count (after the resolution divisor) in megapixels."""
+
+    seconds: float
+    """Time taken by the worker, from decoding to writing."""
+
+    timings: dict[str, float]
+    """Per-step durations in seconds (`hash`, `decode`, `cache`, `threshold`, `contours`, `measure`, `serialize`, `write`, `export`)."""
+
+    raw_contours: int | None
+    """Number of contours found before filtering (`None` if contours weren't found, e.g. the result came from the cache)."""
+
+    budget_hit: bool
+    """Whether `process_image` gave up early because it ran out of time."""
+
+    pid: int
+    """Worker process ID."""
+
+    peak_rss_mb: float | None
+    """Peak resident memory of the worker process (MB), if available."""
+
+    csv_lines: list[str] = []
+    """This page's table of the segmentation data CSV, if data export was requested."""
+
+    content_hash: str | None = None
+    """Content hash of the image file (only computed for the first page)."""
+
+    cache_hit: bool = False
+    """Whether the contour data came from the result cache instead of `process_image`."""
+
+    start_stage: str = "threshold"
+    """First stage of `process_image` that ran (`threshold`, `filter` or `measure`), or `cached`."""
+
+    def report_row(self) -> dict:
+        """Returns this result as a row of the batch performance report."""
+        return {
+            "image": str(self.image_path),
+            "page": self.page,
+            "status": "cancelled" if self.cancelled else "ok",
+            "seg_file": None if self.cancelled else self.seg_path.name,
+            "megapixels": round(self.megapixels, 4),
+            "total_s": round(self.seconds, 4),
+            **{f"{step}_s": round(self.timings.get(step, 0.0), 4) for step in BATCH_TIMING_STEPS},
+            "raw_contours": self.raw_contours,
+            "axons": self.axon_count,
+            "budget_hit": self.budget_hit,
+            "cache_hit": self.cache_hit,
+            "start_stage": self.start_stage,
+            "worker_pid": self.pid,
+            "peak_rss_mb": None if self.peak_rss_mb is None else round(self.peak_rss_mb, 1),
+            "error": None
+        }
+
+BATCH_TIMING_STEPS = ("hash", "decode", "cache", "threshold", "contours", "measure", "serialize", "write", "export")
+"""Steps timed for each image in the batch performance report."""
+
+def _process_page(
+    image: npt.NDArray,
+    settings: Settings,
+    stop_event: Event,
+    timings: dict[str, float],
+    stages: PipelineStages | None = None,
+    keep_samples: bool = False
+) -> list[ContourData]:
+    """Run the image processing algorithm on a shrunk BGR page (no drawing)."""
     nm_per_pixel = (
         settings.scale
         if settings.scale_units == "nm"
         else settings.scale * 1000
     )
-
-    # process
     img_gray = cvtColor(image, COLOR_BGR2GRAY)
     _, contour_data_list = process_image( # don't use out_img
         img_gray,
@@ -51,38 +192,202 @@ def process_single_image(
         settings.thickness_percentile,
         stop_event=stop_event,
         font_path=None, # no font means don't draw anything
-        timed=False
+        timed=False,
+        timings=timings,
+        stages=stages,
+        keep_samples=keep_samples
+    )
+    return contour_data_list if contour_data_list is not None else []
+
+def add_to_catalog(catalog: ResultsCatalog | None, result: BatchResult, settings: Settings) -> str | None:
+    """
+    Index a written .SEG file in the results catalog (if any). A catalog failure does not fail the page.
+    Returns:
+        error (str | None): Error message, if the file could not be indexed.
+    """
+    if catalog is None:
+        return None
+    try:
+        catalog.index_file(result.seg_path, settings)
+    except Exception:
+        return f"Could not add '{result.seg_path.name}' to the results catalog:\n{traceback.format_exc(limit=1)}"
+    return None
+
+def process_single_image(
+    args: tuple[Path, int, int, Settings, Event, Path, tuple[Path, Path, str] | None, bool, bool, bool, bool]
+) -> BatchResult:
+    """
+    Decodes one image page, runs image processing algorithm and writes the resulting .SEG file atomically. 
+    If `export` (labeled image dir, font path, timestamp) is given, the labeled image is written and 
+    the page's CSV table is returned as well, while the segmentation is still in memory.
+    If `use_cache` is set, contour data is looked up in (and added to) the on-disk result cache.
+    If `keep_stages` is set, intermediate stages are reused from (and added to) the `StageCache`.
+    If `keep_samples` is set, each axon's `ThicknessSamples` are saved in the .SEG file.
+    If `reference_images` is set, the .SEG file references the source image (see `ImageSource`) instead of embedding it.
+    Only uses local state and does not access mutable global data.
+    """
+
+    # extract args
+    path: Path = args[0]
+    page: int = args[1]
+    page_count: int = args[2]
+    settings: Settings = args[3]
+    stop_event = args[4]
+    seg_path: Path = args[5]
+    export: tuple[Path, Path, str] | None = args[6]
+    use_cache: bool = args[7]
+    keep_stages: bool = args[8]
+    keep_samples: bool = args[9]
+    reference_images: bool = args[10]
+    start_time = time.perf_counter()
+    timings: dict[str, float] = {}
+
+    # hash the file once per batch manifest (the file is about to be read anyway)
+    content_hash: str | None = None
+    if page == 0:
+        content_hash = FileMan.file_hash(path)
+        timings["hash"] = time.perf_counter() - start_time
+
+    # decode only this page, then shrink it
+    decode_start = time.perf_counter()
+    img_np = FileMan.read_page(path, page)
+    if img_np is None:
+        raise ValueError(f"Could not read page {page + 1} of '{path.name}'.")
+    image: npt.NDArray = resize(
+        img_np,
+        None,
+        fx=1 / settings.resolution_divisor,
+        fy=1 / settings.resolution_divisor
     )
+    megapixels = image.shape[0] * image.shape[1] / 1e6
+    timings["decode"] = time.perf_counter() - decode_start
+
+    # look up the result cache (keyed by the decoded page, so tuning in the GUI fills it too)
+    cache_start = time.perf_counter()
+    result_cache = DiskResultCache()
+    digest = image_digest(img_np)
+    cache_key = result_cache_key(digest, settings)
+    contour_data_list = result_cache.get(cache_key) if use_cache else None
+    if keep_samples and contour_data_list is not None and any(c.samples is None for c in contour_data_list):
+        contour_data_list = None # cached without samples (e.g. by tuning), so measure again
+    cache_hit = contour_data_list is not None
+    start_stage = "cached"
+
+    # otherwise start from the last stored stage whose settings match
+    stage_cache = StageCache() if keep_stages else None
+    loaded_stages = PipelineStages()
+    if contour_data_list is None and stage_cache is not None:
+        loaded_stages = stage_cache.load(digest, settings)
+    timings["cache"] = time.perf_counter() - cache_start
+
+    # process
     if contour_data_list is None:
-        contour_data_list = []
+        start_stage = (
+            "measure" if loaded_stages.filtered_ids is not None
+            else "filter" if loaded_stages.eroded is not None
+            else "threshold"
+        )
+        stages = loaded_stages.model_copy() # shallow copy, so it's known which stages were computed
+        contour_data_list = _process_page(image, settings, stop_event, timings, stages, keep_samples)
+        if not stop_event.is_set():
+            if use_cache:
+                result_cache.put(cache_key, contour_data_list)
+            if stage_cache is not None:
+                stage_cache.save(digest, settings, stages, loaded_stages)
     
     if stop_event.is_set(): # STOPCHECK!!
-        return SegmentationData(
-            img_filename=path.name,
-            image=image,
-            resolution_divisor=settings.resolution_divisor,
-            contour_data=[],
-            selected_states=[],
-            preferred_units=settings.scale_units
+        return BatchResult(
+            image_path=path,
+            page=page,
+            page_count=page_count,
+            seg_path=seg_path,
+            axon_count=0,
+            cancelled=True,
+            megapixels=megapixels,
+            seconds=time.perf_counter() - start_time,
+            timings={step: timings[step] for step in BATCH_TIMING_STEPS if step in timings},
+            raw_contours=int(timings["raw_contours"]) if "raw_contours" in timings else None,
+            budget_hit=bool(timings.get("budget_hit", False)),
+            pid=os.getpid(),
+            peak_rss_mb=peak_rss_mb(),
+            content_hash=content_hash,
+            cache_hit=cache_hit,
+            start_stage=start_stage
         )
 
-    # convert result to SegmentationData
-    return SegmentationData(
+    if not keep_samples and any(c.samples is not None for c in contour_data_list):
+        contour_data_list = [c.model_copy(update={"samples": None}) for c in contour_data_list]
+
+    # convert result to SegmentationData and save it here, so only the status record crosses back to the coordinator
+    seg_data = SegmentationData(
         img_filename=path.name,
         image=image,
         resolution_divisor=settings.resolution_divisor,
         contour_data=contour_data_list,
         selected_states=[True for _ in contour_data_list],
-        preferred_units=settings.scale_units
+        preferred_units=settings.scale_units,
+        page=page,
+        page_count=page_count,
+        thickness_percentile=settings.thickness_percentile,
+        image_source=ImageSource(path=str(path.resolve()), digest=digest) if reference_images else None
+    )
+    seg_data.to_file(seg_path, timings, source_verified=True) # (the digest was computed from the decoded page)
+
+    # export labeled image and CSV table (all detections are accepted)
+    csv_lines: list[str] = []
+    if export is not None:
+        export_start = time.perf_counter()
+        image_dir, font_path, formatted_datetime = export
+        imwrite(
+            str(image_dir / get_labeled_image_name(seg_data, formatted_datetime)),
+            draw_labeled_image(seg_data, font_path)
+        )
+        csv_lines = get_csv_section_lines(
+            get_display_name(path.name, page, page_count),
+            get_selected_contour_data(seg_data),
+            seg_data.preferred_units
+        )
+        timings["export"] = time.perf_counter() - export_start
+
+    return BatchResult(
+        image_path=path,
+        page=page,
+        page_count=page_count,
+        seg_path=seg_path,
+        axon_count=len(contour_data_list),
+        cancelled=False,
+        megapixels=megapixels,
+        seconds=time.perf_counter() - start_time,
+        timings={step: timings[step] for step in BATCH_TIMING_STEPS if step in timings},
+        raw_contours=int(timings["raw_contours"]) if "raw_contours" in timings else None,
+        budget_hit=bool(timings.get("budget_hit", False)),
+        pid=os.getpid(),
+        peak_rss_mb=peak_rss_mb(),
+        csv_lines=csv_lines,
+        content_hash=content_hash,
+        cache_hit=cache_hit,
+        start_stage=start_stage
     )
 
+def write_batch_csv(csv_path: Path, results: list[BatchResult]):
+    """Write the segmentation data CSV of a batch, in the same format as `GenerateDataDialog`."""
+    csv_lines = get_csv_summary_lines([
+        (get_display_name(r.image_path.name, r.page, r.page_count), r.axon_count) for r in results
+    ])
+    for r in results:
+        csv_lines.extend(r.csv_lines)
+    with open(csv_path, "w") as f:
+        f.writelines(csv_lines)
+
 class BatchWorker(QObject):
-    start = Signal(list, Settings, int, Path)
-    progress = Signal(Path)
+    start = Signal(list, Settings, int, Path, str, bool, bool, bool, bool, bool)
+    scheduled = Signal(float) # total megapixels
+    progress = Signal(BatchResult)
+    exported = Signal(Path) # segmentation data CSV
     finished = Signal()
     error = Signal(str)
 
-    pool: ProcessPoolExecutor | None = None
+    pool: Executor | None = None
 
     def __init__(self):
         super().__init__()
@@ -91,71 +396,165 @@ class BatchWorker(QObject):
         self._stop_event = self._manager.Event()
         self.start.connect(self.run)
 
-    @Slot(list, Settings, int, Path)
+    @Slot(list, Settings, int, Path, str, bool, bool, bool, bool, bool)
     def run(self, 
-            image_paths: list[Path], 
+            jobs: list[tuple[Path, int, int]], 
             settings: Settings, 
             workers: int,
-            save_dir: Path
+            save_dir: Path,
+            backend: str = ExecutionBackend.PROCESS.value,
+            export_data: bool = False,
+            keep_stages: bool = False,
+            keep_samples: bool = False,
+            reference_images: bool = False,
+            use_cache: bool = True,
+            use_catalog: bool = True
         ):
-        """Begin processing given images using multiprocessing."""
+        """
+        Begin processing the given `(image path, page, page count)` jobs on the given `ExecutionBackend`.
+        Pages are decoded inside the workers and submitted a few at a time, so stacks are never fully loaded.
+        Jobs are submitted largest-first to keep one huge page from ending up alone at the tail of the batch.
+        A per-image performance report is written to `save_dir` as JSON lines.
+        Progress is checkpointed in a `BatchManifest` in `save_dir`, so an interrupted batch can be resumed there.
+        Pages that are processed again in a resumed batch replace their earlier .SEG files (same names).
+        If `export_data` is set, labeled images and the segmentation data CSV are written to `save_dir` too, 
+        skipping the separate read and render pass of `GenerateDataDialog`.
+        Pages already processed with the same settings are taken from the result cache, unless `use_cache` is unset.
+        If `keep_stages` is set, intermediate stages are stored, so re-runs that only change downstream settings 
+        (e.g. `circularity` or `thickness_percentile`) start from the filter or measure stage.
+        If `keep_samples` is set, .SEG files keep each axon's thickness samples, so they can be re-measured later.
+        If `reference_images` is set, .SEG files reference their source images instead of embedding the pixels.
+        Written .SEG files are added to the `ResultsCatalog` (with the settings), unless `use_catalog` is unset.
+        """
         self._stop_requested = False
+        execution_backend = ExecutionBackend(backend)
         
-        self._manager = multiprocessing.Manager()
-        self._stop_event = self._manager.Event()
+        if execution_backend == ExecutionBackend.THREAD:
+            self._stop_event = Event() # no need for a cross-process event
+        else:
+            self._manager = multiprocessing.Manager()
+            self._stop_event = self._manager.Event()
 
-        # load images
-        images: list[tuple[Path, npt.NDArray]] = []
-        for p in image_paths:
-            img_np = imread(str(p))
-            if img_np is not None:
-                img_shrunk = resize(
-                    img_np,
-                    None,
-                    fx=1 / settings.resolution_divisor,
-                    fy=1 / settings.resolution_divisor
-                )
-                images.append((p, img_shrunk))
-
-        # begin processing
-        formatted_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # schedule by estimated cost
+        scheduler = BatchScheduler()
+        ordered_jobs = scheduler.order(jobs, settings)
+        self.scheduled.emit(sum(mp for _, mp in ordered_jobs))
+
+        # begin processing (resumed batches keep their original .SEG and labeled image names, so redone pages replace them)
+        run_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+        cv_threads = getNumThreads()
+        report = BatchReport(save_dir)
+        manifest = BatchManifest(save_dir)
+        formatted_datetime = manifest.stamp or run_datetime
+        catalog: ResultsCatalog | None = None
+        export: tuple[Path, Path, str] | None = None
+        exported_results: list[BatchResult] = []
+        if export_data:
+            image_dir = save_dir / "images"
+            image_dir.mkdir(parents=True, exist_ok=True)
+            export = (image_dir, AppState.annotation_font_path(), formatted_datetime)
         try:
-            with ProcessPoolExecutor(
-                max_workers=workers,
-                mp_context=multiprocessing.get_context("spawn")
-            ) as pool:
+            manifest.begin(jobs, settings, formatted_datetime, {
+                'export_data': export_data,
+                'use_cache': use_cache,
+                'keep_stages': keep_stages,
+                'keep_samples': keep_samples,
+                'reference_images': reference_images
+            })
+            catalog = ResultsCatalog() if use_catalog else None
+            executor, pool_size = create_executor(execution_backend, workers)
+            max_in_flight = 2 * pool_size
+            with executor as pool:
                 self.pool = pool
 
-                futures = {
-                    pool.submit(
-                        process_single_image, 
-                        (path, image, settings, self._stop_event)
-                    ): path
-                    for path, image in images
-                }
+                futures: dict[Future, tuple[Path, int, int]] = {}
+                remaining_jobs = iter([job for job, _ in ordered_jobs])
 
-                for future in as_completed(futures):
-                    if self._stop_requested:
-                        pool.shutdown(wait=True, cancel_futures=True)
-                        break
+                def submit_jobs():
+                    """Top up the pool without exceeding `max_in_flight` queued pages."""
+                    while len(futures) < max_in_flight and not self._stop_requested:
+                        job = next(remaining_jobs, None)
+                        if job is None:
+                            return
+                        path, page, page_count = job
+                        row = manifest.pages.get((str(path), page))
+                        if row is not None and row['seg_file'] is not None:
+                            seg_path = save_dir / row['seg_file']
+                        else:
+                            img_name = path.stem + FileMan.page_suffix(page, page_count)
+                            seg_path = save_dir / f"{img_name}_{formatted_datetime}.seg"
+                        future = pool.submit(
+                            process_single_image,
+                            (path, page, page_count, settings, self._stop_event, seg_path, export, use_cache, keep_stages, keep_samples, reference_images)
+                        )
+                        futures[future] = job
 
-                    path = futures[future]
+                def record_result(future: Future, path: Path, page: int):
+                    """Write a finished page to the report, manifest and catalog, and emit its progress."""
                     try:
-                        segmentation_data: SegmentationData = future.result()
-
-                        # save seg file
-                        img_name = path.stem
-                        imgproc_out_path = save_dir / f"{img_name}_{formatted_datetime}.seg"
-                        with open(imgproc_out_path, "wb") as f:
-                            pickle.dump(segmentation_data, f)
-                        
-                        self.progress.emit(path)
+                        result: BatchResult = future.result()
+                        report.write_row(result.report_row())
+                        if result.content_hash is not None:
+                            manifest.record_hash(path, result.content_hash)
+                        if result.cancelled:
+                            manifest.record_page(path, page, "cancelled")
+                        else:
+                            manifest.record_page(path, page, "done", seg_file=result.seg_path.name)
+                            scheduler.record(result.image_path, result.page, settings, result.seconds, result.megapixels)
+                            exported_results.append(result)
+                            catalog_error = add_to_catalog(catalog, result, settings)
+                            if catalog_error is not None:
+                                self.error.emit(catalog_error)
+                            self.progress.emit(result)
                     except Exception:
+                        report.write_row({"image": str(path), "page": page, "status": "failed", "error": traceback.format_exc(limit=1)})
+                        manifest.record_page(path, page, "failed", error=traceback.format_exc(limit=1))
                         self.error.emit(traceback.format_exc())
 
+                submit_jobs()
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    if self._stop_requested:
+                        # pages that finished before (or while) the pool shut down already wrote their .SEG files
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        for future, (path, page, _) in futures.items():
+                            if future.cancelled():
+                                manifest.record_page(path, page, "cancelled")
+                            else:
+                                record_result(future, path, page)
+                        futures.clear()
+                        break
+
+                    for future in done:
+                        path, page, _ = futures.pop(future)
+                        record_result(future, path, page)
+                    
+                    submit_jobs()
+
         except Exception:
             self.error.emit(traceback.format_exc())
+        finally:
+            setNumThreads(cv_threads)
+            report.close()
+            manifest.close()
+            if catalog is not None:
+                catalog.close()
+
+        # write CSV in the order the jobs were given (workers finish in any order)
+        if export is not None:
+            job_order = {(path, page): i for i, (path, page, _) in enumerate(jobs)}
+            exported_results.sort(key=lambda r: job_order.get((r.image_path, r.page), len(job_order)))
+            csv_path = save_dir / f"SnapG_segmentation_data_{run_datetime}.csv" # (a resumed run doesn't replace the first run's CSV)
+            try:
+                write_batch_csv(csv_path, exported_results)
+                self.exported.emit(csv_path)
+            except Exception:
+                self.error.emit(traceback.format_exc())
 
+        scheduler.save()
+        DiskResultCache().evict()
+        if keep_stages:
+            StageCache().evict()
         self.finished.emit()
 
     @Slot()
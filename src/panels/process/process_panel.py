@@ -26,15 +26,17 @@ from PySide6.QtWidgets import (
 )
 
 from panels.process.choose_images_dialog import ChooseImagesDialog
-from panels.process.batch_worker import BatchWorker
+from panels.process.batch_worker import BatchWorker, BatchResult, ExecutionBackend
+from panels.process.watch_worker import WatchWorker
+from panels.process.batch_report import BatchReport
+from panels.process.batch_manifest import BatchManifest
 from panels.modified_widgets import NonScrollComboBox, AutoHeightTextBrowser
 
-from models import AppState, ProcessPanelState, Settings, SegmentationData
+from models import AppState, ProcessPanelState, Settings, SegmentationData, FileMan
 
 from datetime import datetime
 from pathlib import Path
 import numpy.typing as npt
-from cv2 import imread
 import time
 import math
 import os
@@ -58,6 +60,10 @@ class ProcessPanel(QWidget):
                     self.destination_path = dest_path
             except Exception as e:
                 self.destination_path = None
+        self.watch_folder: Path | None = None
+        watch_folder_str = app_state.process_panel_state.watch_folder
+        if watch_folder_str != "" and Path(watch_folder_str).is_dir():
+            self.watch_folder = Path(watch_folder_str)
         self.settings: Settings = app_state.settings
 
         # == Gui ==
@@ -81,6 +87,40 @@ class ProcessPanel(QWidget):
         self.choose_images_btn.clicked.connect(self._choose_files)
         data_prep_group_layout.addWidget(self.choose_images_btn)
 
+        # watch folder checkbox
+        watch_layout = QHBoxLayout()
+        data_prep_group_layout.addLayout(watch_layout)
+
+        watch_label = QLabel("Watch Folder")
+        watch_layout.addWidget(watch_label, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        self.watch_checkbox = QCheckBox()
+        self.watch_checkbox.setToolTip(
+            "Instead of the chosen images, keep processing new images as they appear in a folder until stopped.\n"
+            "Images are processed once they are completely written. Results go to a 'SnapG_watch_<folder>'\n"
+            "folder in the destination path, which remembers processed images between runs."
+        )
+        self.watch_checkbox.setChecked(app_state.process_panel_state.watch_enabled)
+        watch_layout.addWidget(self.watch_checkbox, alignment=Qt.AlignmentFlag.AlignRight)
+
+        # watch folder label & button
+        self.watch_folder_label = QLabel("No Folder Chosen")
+        data_prep_group_layout.addWidget(self.watch_folder_label)
+        self._update_watch_folder_label()
+
+        self.choose_watch_folder_btn = QPushButton("Choose Watch Folder")
+        self.choose_watch_folder_btn.clicked.connect(self._choose_watch_folder)
+        data_prep_group_layout.addWidget(self.choose_watch_folder_btn)
+
+        def _update_watch_widgets(_):
+            watching = self.watch_checkbox.isChecked()
+            self.chosen_images_label.setDisabled(watching)
+            self.choose_images_btn.setDisabled(watching)
+            self.watch_folder_label.setDisabled(not watching)
+            self.choose_watch_folder_btn.setDisabled(not watching)
+        self.watch_checkbox.stateChanged.connect(_update_watch_widgets)
+        _update_watch_widgets(None)
+
         # -- processing options
         proc_options_group = QGroupBox("Processing Options")
         proc_options_group.setContentsMargins(2, 2, 2, 2)
@@ -105,6 +145,68 @@ class ProcessPanel(QWidget):
         self.choose_dest_btn.clicked.connect(self._choose_dest_path)
         proc_options_layout.addWidget(self.choose_dest_btn)
 
+        # export data checkbox
+        export_data_layout = QHBoxLayout()
+        proc_options_layout.addLayout(export_data_layout)
+
+        export_data_label = QLabel("Export CSV and Labeled Images")
+        export_data_layout.addWidget(export_data_label, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        self.export_data_checkbox = QCheckBox()
+        self.export_data_checkbox.setToolTip(
+            "Write the segmentation data CSV and labeled images while processing,\n"
+            "accepting all detected axons. Skips a separate 'Generate Data' pass."
+        )
+        self.export_data_checkbox.setChecked(app_state.process_panel_state.export_data)
+        export_data_layout.addWidget(self.export_data_checkbox, alignment=Qt.AlignmentFlag.AlignRight)
+
+        # keep stages checkbox
+        keep_stages_layout = QHBoxLayout()
+        proc_options_layout.addLayout(keep_stages_layout)
+
+        keep_stages_label = QLabel("Keep Intermediate Results")
+        keep_stages_layout.addWidget(keep_stages_label, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        self.keep_stages_checkbox = QCheckBox()
+        self.keep_stages_checkbox.setToolTip(
+            "Store each page's thresholded mask, contours and filtered axons, so re-running\n"
+            "the batch after changing only filter or measurement settings skips the earlier stages."
+        )
+        self.keep_stages_checkbox.setChecked(app_state.process_panel_state.keep_stages)
+        keep_stages_layout.addWidget(self.keep_stages_checkbox, alignment=Qt.AlignmentFlag.AlignRight)
+
+        # keep samples checkbox
+        keep_samples_layout = QHBoxLayout()
+        proc_options_layout.addLayout(keep_samples_layout)
+
+        keep_samples_label = QLabel("Keep Thickness Samples")
+        keep_samples_layout.addWidget(keep_samples_label, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        self.keep_samples_checkbox = QCheckBox()
+        self.keep_samples_checkbox.setToolTip(
+            "Save each axon's distance samples in the .SEG files (about 1.5 KB per axon),\n"
+            "so thickness can be re-measured at another percentile without the images\n"
+            "(Generate > Re-measured thickness)."
+        )
+        self.keep_samples_checkbox.setChecked(app_state.process_panel_state.keep_samples)
+        keep_samples_layout.addWidget(self.keep_samples_checkbox, alignment=Qt.AlignmentFlag.AlignRight)
+
+        # reference images checkbox
+        reference_images_layout = QHBoxLayout()
+        proc_options_layout.addLayout(reference_images_layout)
+
+        reference_images_label = QLabel("Reference Source Images")
+        reference_images_layout.addWidget(reference_images_label, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        self.reference_images_checkbox = QCheckBox()
+        self.reference_images_checkbox.setToolTip(
+            "Store the source image's path and a hash of its pixels in the .SEG files instead\n"
+            "of the image itself, so .SEG files are much smaller and faster to write.\n"
+            "The source images must stay in place (or next to the .SEG files) for review."
+        )
+        self.reference_images_checkbox.setChecked(app_state.process_panel_state.reference_images)
+        reference_images_layout.addWidget(self.reference_images_checkbox, alignment=Qt.AlignmentFlag.AlignRight)
+
         # multiprocessing checkbox
         use_multiproc_layout = QHBoxLayout()
         proc_options_layout.addLayout(use_multiproc_layout)
@@ -135,14 +237,22 @@ class ProcessPanel(QWidget):
         multiproc_workers_layout = QHBoxLayout(multiproc_workers_widget)
         multiproc_workers_layout.setContentsMargins(0, 0, 0, 0)
         proc_options_layout.addWidget(multiproc_workers_widget)
+        # execution backend combobox
+        backend_widget = QWidget()
+        backend_layout = QHBoxLayout(backend_widget)
+        backend_layout.setContentsMargins(0, 0, 0, 0)
+        proc_options_layout.addWidget(backend_widget)
         # set/connect checkbox state
         if self.multiprocessing_enabled:
             multiproc_workers_widget.setDisabled(not app_state.process_panel_state.use_multiprocessing)
-            self.use_multiproc_checkbox.stateChanged.connect(
-                lambda _: multiproc_workers_widget.setDisabled(not self.use_multiproc_checkbox.isChecked())
-            )
+            backend_widget.setDisabled(not app_state.process_panel_state.use_multiprocessing)
+            def _update_multiproc_widgets(_):
+                multiproc_workers_widget.setDisabled(not self.use_multiproc_checkbox.isChecked())
+                backend_widget.setDisabled(not self.use_multiproc_checkbox.isChecked())
+            self.use_multiproc_checkbox.stateChanged.connect(_update_multiproc_widgets)
         else:
             multiproc_workers_widget.setDisabled(True)
+            backend_widget.setDisabled(True)
 
         multiproc_workers_label = QLabel("Number of Workers")
         multiproc_workers_layout.addWidget(multiproc_workers_label, alignment=Qt.AlignmentFlag.AlignLeft)
@@ -162,6 +272,28 @@ class ProcessPanel(QWidget):
             self.multiproc_cores_combo.addItem(str(n))
             self.combo_choice_to_workers[str(n)] = n
 
+        backend_label = QLabel("Execution Backend")
+        backend_layout.addWidget(backend_label, alignment=Qt.AlignmentFlag.AlignLeft)
+
+        self.backend_combo = NonScrollComboBox()
+        self.backend_combo.setFixedWidth(100)
+        self.backend_combo.setToolTip(
+            "How workers run.\n"
+            "'Processes' runs one process per worker (most robust).\n"
+            "'Threads' runs workers as threads in SnapG itself: no startup or copying costs.\n"
+            "'Hybrid' runs half as many processes and lets OpenCV use more threads in each."
+        )
+        self.combo_choice_to_backend: dict[str, ExecutionBackend] = {
+            "Processes": ExecutionBackend.PROCESS,
+            "Threads": ExecutionBackend.THREAD,
+            "Hybrid": ExecutionBackend.HYBRID
+        }
+        for choice, backend in self.combo_choice_to_backend.items():
+            self.backend_combo.addItem(choice)
+            if backend.value == app_state.process_panel_state.execution_backend:
+                self.backend_combo.setCurrentText(choice)
+        backend_layout.addWidget(self.backend_combo)
+
         # -- output box --
         output_group = QGroupBox("Processing Output")
         output_group_layout = QVBoxLayout(output_group)
@@ -184,9 +316,14 @@ class ProcessPanel(QWidget):
         self.stop_btn.setDisabled(True)
         self.stop_btn.setFixedWidth(60)
 
+        self.resume_btn = QPushButton("Resume…")
+        self.resume_btn.setToolTip("Continue an interrupted batch in its folder, skipping images that were already processed.")
+        self.resume_btn.setFixedWidth(75)
+
         # add buttons
         buttons_layout.addWidget(clear_btn, alignment=Qt.AlignmentFlag.AlignLeft)
         buttons_layout.addStretch()
+        buttons_layout.addWidget(self.resume_btn)
         buttons_layout.addWidget(self.stop_btn)
         buttons_layout.addWidget(self.start_btn, alignment=Qt.AlignmentFlag.AlignRight)
 
@@ -218,17 +355,40 @@ class ProcessPanel(QWidget):
 
         self.start_btn.clicked.connect(self._start_processing)
         self.stop_btn.clicked.connect(self._stop_processing)
+        self.resume_btn.clicked.connect(self._resume_processing)
         self.currently_processing = False
         self.start_processing_time = -1
+        self.save_dir: Path | None = None
         self.total_images = 0
         self.completed_images = 0
+        self.total_megapixels = 0.0
+        self.completed_megapixels = 0.0
 
+        self.batch_worker.scheduled.connect(self._set_total_megapixels)
         self.batch_worker.progress.connect(self._update_progress)
+        self.batch_worker.exported.connect(
+            lambda csv_path: self.text_browser.append(f"Segmentation data: {csv_path}")
+        )
         self.batch_worker.error.connect(
             lambda e: self.text_browser.append(f"<span style='color:red'>{e}</span>")
         )
         self.batch_worker.finished.connect(self._on_processing_finished)
 
+        self.watching = False
+        self.watch_worker = WatchWorker()
+        self.watch_worker.moveToThread(self.worker_thread)
+        self.watch_worker.detected.connect(
+            lambda name, pages: self.text_browser.append(f"Detected {name}{f" ({pages} pages)" if pages > 1 else ""}.")
+        )
+        self.watch_worker.progress.connect(self._update_watch_progress)
+        self.watch_worker.exported.connect(
+            lambda csv_path: self.text_browser.append(f"Segmentation data: {csv_path}")
+        )
+        self.watch_worker.error.connect(
+            lambda e: self.text_browser.append(f"<span style='color:red'>{e}</span>")
+        )
+        self.watch_worker.finished.connect(self._on_processing_finished)
+
         self.worker_thread.start()
     
     def receive_settings(self, settings: Settings):
@@ -245,6 +405,15 @@ class ProcessPanel(QWidget):
         total_unselected = len(self.chosen_images) - total_selected
         self.chosen_images_label.setText(f"{total_selected} images checked ({total_unselected} unchecked)")
     
+    def _update_watch_folder_label(self):
+        """Updates the watch folder label."""
+        if self.watch_folder is None:
+            self.watch_folder_label.setText("No Folder Chosen")
+            self.watch_folder_label.setToolTip("")
+            return
+        self.watch_folder_label.setText(f"Watching: {self.watch_folder.name}")
+        self.watch_folder_label.setToolTip(str(self.watch_folder))
+
     def _update_path_label(self):
         """Updates the destination path label."""
         if self.destination_path is None:
@@ -289,6 +458,18 @@ class ProcessPanel(QWidget):
         self.chosen_images = dialog.get_chosen_images()
         self._update_images_label()
     
+    def _choose_watch_folder(self):
+        """Show dialog for selecting the watch folder."""
+        directory = QFileDialog.getExistingDirectory(
+            parent=self,
+            caption="Select Watch Folder",
+            options=QFileDialog.Option.ShowDirsOnly
+        )
+        if not directory or not Path(directory).is_dir():
+            return
+        self.watch_folder = Path(directory)
+        self._update_watch_folder_label()
+
     def _choose_dest_path(self):
         """Show dialog for selecting destination path."""
         directory = QFileDialog.getExistingDirectory(
@@ -311,8 +492,85 @@ class ProcessPanel(QWidget):
         """Returns whether a batch is currently being processed."""
         return self.currently_processing
     
+    def _get_workers_and_backend(self) -> tuple[int, ExecutionBackend] | None:
+        """
+        Returns:
+            workers_and_backend (tuple[int, ExecutionBackend] | None): The chosen processing options, or `None` if invalid.
+        """
+        workers = 1
+        backend = ExecutionBackend.PROCESS
+        if self.use_multiproc_checkbox.isChecked():
+            text = self.multiproc_cores_combo.currentText()
+            if text not in self.combo_choice_to_workers.keys(): # sanity check
+                QMessageBox.warning(self, "Start Processing", f"'{text}' is not a valid number of workers.")
+                return None
+            workers = self.combo_choice_to_workers[text]
+            backend = self.combo_choice_to_backend[self.backend_combo.currentText()]
+        return workers, backend
+
+    def _start_watching(self):
+        """Attempt to begin watching the watch folder."""
+        if self.watch_folder is None or not self.watch_folder.is_dir():
+            QMessageBox.warning(self, "Start Processing", "Please choose a folder to watch.")
+            return
+        if self.destination_path is None:
+            QMessageBox.warning(self, "Start Processing", "Please select a destination path.")
+            return
+        workers_and_backend = self._get_workers_and_backend()
+        if workers_and_backend is None:
+            return
+        workers, backend = workers_and_backend
+
+        # fixed folder name, so the ledger of processed images carries over between runs
+        save_dir = self.destination_path / f"SnapG_watch_{self.watch_folder.name}"
+        save_dir.mkdir(parents=True, exist_ok=True)
+
+        self.watch_worker.start.emit(
+            self.watch_folder,
+            self.settings,
+            workers,
+            save_dir,
+            backend.value,
+            self.export_data_checkbox.isChecked(),
+            self.keep_stages_checkbox.isChecked(),
+            self.keep_samples_checkbox.isChecked(),
+            self.reference_images_checkbox.isChecked()
+        )
+
+        # update gui
+        self.start_btn.setDisabled(True)
+        self.resume_btn.setDisabled(True)
+        self.stop_btn.setDisabled(False)
+        self.text_browser.clear()
+        plural_wrkr = "" if workers == 1 else "s"
+        self.text_browser.append(f"<b>Watching {self.watch_folder} with {workers} worker{plural_wrkr}…</b>")
+        self.text_browser.append(f"<b>(Started on {datetime.today().strftime('%Y-%m-%d %H:%M:%S')})</b>")
+        self.completed_images = 0
+        self.eta_label.setVisible(True)
+        self.eta_label.setText("Waiting for new images…")
+
+        # update state
+        self.save_dir = save_dir
+        self.start_processing_time = time.perf_counter()
+        self.watching = True
+        self.currently_processing = True
+
+    def _update_watch_progress(self, result: BatchResult):
+        """Updates output box and processed page count while watching."""
+        if result.page_count > 1:
+            self.text_browser.append(f"Processed {result.image_path.name} (page {result.page + 1}/{result.page_count}).")
+        else:
+            self.text_browser.append(f"Processed {result.image_path.name}.")
+        self.completed_images += 1
+        plural = "" if self.completed_images == 1 else "s"
+        self.eta_label.setText(f"Waiting for new images… ({self.completed_images} page{plural} processed)")
+
     def _start_processing(self):
         """Attempt to begin image processing."""
+        if self.watch_checkbox.isChecked():
+            self._start_watching()
+            return
+
         # check if images selected
         raw_image_paths: list[Path] = [p for p, checked in self.chosen_images if checked]
         if len(raw_image_paths) == 0:
@@ -324,20 +582,19 @@ class ProcessPanel(QWidget):
             QMessageBox.warning(self, "Start Processing", "Please select a destination path.")
             return
         
-        # check if valid images
+        # check if valid images (only reads headers, multi-page stacks expand to one job per page)
         filtered_image_paths: list[Path] = []
+        jobs: list[tuple[Path, int, int]] = []
         invalid_paths = set()
         for p in raw_image_paths:
             valid = p.exists()
             if valid:
-                try:
-                    img_np = imread(str(p))
-                    if img_np is None:
-                        valid = False
-                    else:
-                        filtered_image_paths.append(p)
-                except Exception as e:
+                page_count = FileMan.page_count(p)
+                if page_count <= 0:
                     valid = False
+                else:
+                    filtered_image_paths.append(p)
+                    jobs.extend((p, page, page_count) for page in range(page_count))
             if not valid:
                 # let user handle invalid image
                 reply = QMessageBox.question(
@@ -364,13 +621,10 @@ class ProcessPanel(QWidget):
             return
 
         # get number of workers
-        workers = 1
-        if self.use_multiproc_checkbox.isChecked():
-            text = self.multiproc_cores_combo.currentText()
-            if text not in self.combo_choice_to_workers.keys(): # sanity check
-                QMessageBox.warning(self, "Start Processing", f"'{text}' is not a valid number of workers.")
-                return
-            workers = self.combo_choice_to_workers[text]
+        workers_and_backend = self._get_workers_and_backend()
+        if workers_and_backend is None:
+            return
+        workers, backend = workers_and_backend
         
         # create save dir
         if self.destination_path.is_file(): # sanity check (dest path should be a directory)
@@ -380,27 +634,93 @@ class ProcessPanel(QWidget):
         save_dir = self.destination_path / f"SnapG_seg_{formatted_datetime}"
         save_dir.mkdir(parents=True, exist_ok=True)
 
-        # signal start
+        self.text_browser.clear()
+        self._begin_batch(jobs, len(filtered_image_paths), self.settings, workers, backend, save_dir)
+
+    def _resume_processing(self):
+        """Choose an interrupted batch folder and process whatever its manifest says is left."""
+        directory = QFileDialog.getExistingDirectory(
+            parent=self,
+            caption="Select Batch Folder to Resume",
+            dir="" if self.destination_path is None else str(self.destination_path),
+            options=QFileDialog.Option.ShowDirsOnly
+        )
+        if not directory:
+            return
+        save_dir = Path(directory)
+        if not BatchManifest.exists(save_dir):
+            QMessageBox.warning(self, "Resume Batch", "This folder has no batch manifest. Only batches started with this version of SnapG can be resumed.")
+            return
+
+        manifest = BatchManifest(save_dir)
+        jobs, missing = manifest.remaining_jobs()
+        manifest.close()
+        if manifest.settings is None: # sanity check
+            QMessageBox.warning(self, "Resume Batch", "The batch manifest is damaged.")
+            return
+        if len(jobs) == 0:
+            QMessageBox.information(self, "Resume Batch", "Every image in this batch was already processed.")
+            return
+
+        workers_and_backend = self._get_workers_and_backend()
+        if workers_and_backend is None:
+            return
+        workers, backend = workers_and_backend
+
+        self.text_browser.clear()
+        self.text_browser.append(f"<b>Resuming batch in {save_dir}</b>")
+        if manifest.settings_hash != self.settings.processing_hash():
+            self.text_browser.append("Using the batch's original settings (they differ from the current settings).")
+        for path in missing:
+            self.text_browser.append(f"<span style='color:red'>Skipping missing or unreadable image '{path}'.</span>")
+        image_count = len({path for path, _, _ in jobs})
+        self._begin_batch(jobs, image_count, manifest.settings, workers, backend, save_dir, manifest.options)
+
+    def _begin_batch(self,
+                     jobs: list[tuple[Path, int, int]],
+                     image_count: int,
+                     settings: Settings,
+                     workers: int,
+                     backend: ExecutionBackend,
+                     save_dir: Path,
+                     options: dict[str, bool] | None = None
+        ):
+        """
+        Signal the batch worker to start and update the GUI.
+        A resumed batch passes its recorded `options`, which take precedence over the checkboxes.
+        """
+        options = options or {}
         self.batch_worker.start.emit(
-            filtered_image_paths,
-            self.settings,
+            jobs,
+            settings,
             workers,
             save_dir,
+            backend.value,
+            options.get('export_data', self.export_data_checkbox.isChecked()),
+            options.get('keep_stages', self.keep_stages_checkbox.isChecked()),
+            options.get('keep_samples', self.keep_samples_checkbox.isChecked()),
+            options.get('reference_images', self.reference_images_checkbox.isChecked()),
+            options.get('use_cache', True)
         )
 
         # update gui
         self.start_btn.setDisabled(True)
+        self.resume_btn.setDisabled(True)
         self.stop_btn.setDisabled(False)
 
-        self.text_browser.clear()
-        plural_imgs = "" if len(filtered_image_paths) == 1 else "s"
+        plural_imgs = "" if image_count == 1 else "s"
         plural_wrkr = "" if workers == 1 else "s"
-        self.text_browser.append(f"<b>Processing {len(filtered_image_paths)} image{plural_imgs} with {workers} worker{plural_wrkr}…</b>")
+        pages_note = "" if len(jobs) == image_count else f" ({len(jobs)} pages)"
+        backend_note = "" if backend == ExecutionBackend.PROCESS else f" ({self.backend_combo.currentText().lower()})"
+        self.text_browser.append(f"<b>Processing {image_count} image{plural_imgs}{pages_note} with {workers} worker{plural_wrkr}{backend_note}…</b>")
         self.text_browser.append(f"<b>(Started on {datetime.today().strftime('%Y-%m-%d %H:%M:%S')})</b>")
         
-        # progress bar & eta
-        self.total_images = len(filtered_image_paths)
+        # progress bar & eta (counted in pages)
+        self.total_images = len(jobs)
         self.completed_images = 0
+        self.total_megapixels = 0.0
+        self.completed_megapixels = 0.0
+        self.cache_hits = 0
         self.progress_bar.setMaximum(self.total_images)
         self.progress_bar.setValue(0)
         self.progress_bar.setVisible(True)
@@ -409,32 +729,45 @@ class ProcessPanel(QWidget):
         self.eta_label.setText("Estimating time remaining…")
 
         # update state
+        self.save_dir = save_dir
         self.start_processing_time = time.perf_counter()
         self.currently_processing = True
     
-    def _update_progress(self, completed_image: Path):
+    def _update_progress(self, result: BatchResult):
         """Updates output box and progress bar."""
         # output box
-        self.text_browser.append(f"Processed {completed_image.name}.")
+        if result.page_count > 1:
+            self.text_browser.append(f"Processed {result.image_path.name} (page {result.page + 1}/{result.page_count}).")
+        else:
+            self.text_browser.append(f"Processed {result.image_path.name}.")
 
         # progress bar
         self.completed_images += 1
+        self.completed_megapixels += result.megapixels
+        self.cache_hits += int(result.cache_hit)
         self.progress_bar.setValue(self.completed_images)
 
-        # eta
+        # eta (pixel-weighted, since pages can differ in size by orders of magnitude)
         elapsed = time.perf_counter() - self.start_processing_time
-        if self.completed_images > 0:
-            avg_time = elapsed / self.completed_images
-            remaining = self.total_images - self.completed_images
-            eta_seconds = int(avg_time * remaining)
+        if self.completed_megapixels > 0 and self.total_megapixels > 0:
+            megapixels_per_second = self.completed_megapixels / elapsed
+            remaining = max(0.0, self.total_megapixels - self.completed_megapixels)
+            eta_seconds = int(remaining / megapixels_per_second)
 
             self.eta_label.setText(
-                f"Remaining time: {self._format_remaining_time(eta_seconds)}"
+                f"Remaining time: {self._format_remaining_time(eta_seconds)} ({megapixels_per_second:.1f} MP/s)"
             )
     
+    def _set_total_megapixels(self, total_megapixels: float):
+        """Receive the estimated size of the batch from the batch worker."""
+        self.total_megapixels = total_megapixels
+    
     def _stop_processing(self):
-        """Send stop request to batch worker and update GUI."""
-        self.batch_worker.stop()
+        """Send stop request to batch or watch worker and update GUI."""
+        if self.watching:
+            self.watch_worker.stop()
+        else:
+            self.batch_worker.stop()
         self.start_btn.setDisabled(True)
         self.stop_btn.setDisabled(True)
         self.progress_bar.setVisible(False)
@@ -443,11 +776,25 @@ class ProcessPanel(QWidget):
     def _on_processing_finished(self):
         """Update GUI and internal state."""
         self.start_btn.setDisabled(False)
+        self.resume_btn.setDisabled(False)
         self.stop_btn.setDisabled(True)
         elapsed_time = int(time.perf_counter() - self.start_processing_time)
         self.text_browser.append(f"<b>Finished in {self._format_remaining_time(elapsed_time)}.</b>")
+        if not self.watching and self.completed_images > 0:
+            self.text_browser.append(
+                f"Result cache: {self.cache_hits} hit{"" if self.cache_hits == 1 else "s"}, "
+                f"{self.completed_images - self.cache_hits} miss{"" if self.completed_images - self.cache_hits == 1 else "es"}."
+            )
+        if self.save_dir is not None:
+            self.text_browser.append(f"Performance report: {self.save_dir / BatchReport.file_name}")
+            if not self.watching and BatchManifest.exists(self.save_dir):
+                counts = BatchManifest(self.save_dir).counts()
+                left = sum(counts.values()) - counts.get("done", 0)
+                if left > 0:
+                    self.text_browser.append(f"<b>{left} page{"" if left == 1 else "s"} left. Press 'Resume…' and choose this batch's folder to continue.</b>")
         self.progress_bar.setVisible(False)
         self.eta_label.setVisible(False)
+        self.watching = False
         self.currently_processing = False
         
     def _format_remaining_time(self, seconds_remaining: int) -> str:
@@ -465,7 +812,14 @@ class ProcessPanel(QWidget):
         return ProcessPanelState(
             chosen_images=[(str(path), checked) for path, checked in self.chosen_images],
             destination_path="" if self.destination_path is None else str(self.destination_path),
+            watch_enabled=self.watch_checkbox.isChecked(),
+            watch_folder="" if self.watch_folder is None else str(self.watch_folder),
             use_multiprocessing=self.use_multiproc_checkbox.isChecked(),
+            execution_backend=self.combo_choice_to_backend[self.backend_combo.currentText()].value,
+            export_data=self.export_data_checkbox.isChecked(),
+            keep_stages=self.keep_stages_checkbox.isChecked(),
+            keep_samples=self.keep_samples_checkbox.isChecked(),
+            reference_images=self.reference_images_checkbox.isChecked(),
             output_text=self.text_browser.toHtml()
         )
 
@@ -473,6 +827,8 @@ class ProcessPanel(QWidget):
         """Shut down batch worker."""
         if self.batch_worker:
             self.batch_worker.stop()
+        if self.watch_worker:
+            self.watch_worker.stop()
         if self.worker_thread and self.worker_thread.isRunning():
             self.worker_thread.quit() 
             self.worker_thread.wait()
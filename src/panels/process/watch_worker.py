@@ -0,0 +1,304 @@
+from PySide6.QtCore import QObject, Signal, Slot
+
+from panels.process.batch_worker import BatchResult, ExecutionBackend, add_to_catalog, create_executor, process_single_image, write_batch_csv
+from panels.process.batch_report import BatchReport
+from imgproc.result_cache import DiskResultCache
+from imgproc.stage_cache import StageCache
+from catalog import ResultsCatalog
+
+from models import AppState, Settings, FileMan
+
+from concurrent.futures import Executor, Future, wait, FIRST_COMPLETED
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from cv2 import setNumThreads, getNumThreads
+from threading import Event
+import multiprocessing
+import traceback
+import json
+import time
+
+class WatchLedger():
+    """
+    Persistent record of the files a watch folder has already produced output for, stored next to the .SEG files.
+    Files are identified by path, size and modification time, so a file that gets replaced is processed again.
+    """
+
+    file_name: str = "watch_ledger.json"
+
+    def __init__(self, save_dir: Path):
+        self.path = save_dir / self.file_name
+        self.entries: dict[str, dict] = {}
+        self._load()
+
+    def _load(self):
+        """Read the ledger, otherwise start empty."""
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = dict(json.load(f)['files'])
+        except Exception:
+            self.entries = {}
+
+    def save(self):
+        """Write the ledger atomically, so a crash never leaves it half-written."""
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'files': self.entries}, f, indent=1)
+        tmp_path.replace(self.path)
+
+    def is_done(self, path: Path, size: int, mtime_ns: int) -> bool:
+        """Returns whether this exact version of the file was already handled (successfully or not)."""
+        entry = self.entries.get(str(path))
+        return entry is not None and entry['size'] == size and entry['mtime_ns'] == mtime_ns
+
+    def record(self, path: Path, size: int, mtime_ns: int, status: str, seg_files: list[str]):
+        """Remember a handled file and save the ledger immediately."""
+        self.entries[str(path)] = {
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'status': status,
+            'seg_files': seg_files,
+            'processed': datetime.now().isoformat(timespec="seconds")
+        }
+        self.save()
+
+class _WatchedFile():
+    """Bookkeeping for one file that is being processed."""
+
+    def __init__(self, size: int, mtime_ns: int, page_count: int):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.remaining_pages = page_count
+        self.seg_files: list[str] = []
+        self.failed = False
+
+class WatchWorker(QObject):
+    start = Signal(Path, Settings, int, Path, str, bool, bool, bool, bool)
+    detected = Signal(str, int) # file name, page count
+    progress = Signal(BatchResult)
+    exported = Signal(Path) # segmentation data CSV
+    finished = Signal()
+    error = Signal(str)
+
+    poll_interval: float = 2.0
+    """Seconds between folder scans."""
+
+    settle_seconds: float = 2.0
+    """Minimum age of a file's last modification before it is considered complete."""
+
+    unreadable_timeout: float = 60.0
+    """Seconds a stable file may stay unreadable before it is recorded as failed."""
+
+    pool: Executor | None = None
+
+    def __init__(self):
+        super().__init__()
+        self._stop_requested: bool = False
+        self._manager = None
+        self._stop_event = None
+        self.start.connect(self.run)
+
+    def _find_stable_files(self,
+                           watch_dir: Path,
+                           ledger: WatchLedger,
+                           active: dict[Path, _WatchedFile],
+                           last_seen: dict[Path, tuple[int, int, float]]
+        ) -> list[tuple[Path, int, int, int]]:
+        """
+        Scan the watch folder once. A file is stable once its size and modification time are unchanged
+        since the previous scan and it was last modified at least `settle_seconds` ago.
+        Returns:
+            stable_files (list[tuple[Path, int, int, int]]): New stable files as `(path, size, mtime_ns, page count)`.
+        """
+        now = time.time()
+        stable_files: list[tuple[Path, int, int, int]] = []
+        seen: set[Path] = set()
+        for path in sorted(watch_dir.iterdir()):
+            if not FileMan.path_is_image(path) or path in active:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue # deleted or moved mid-scan
+            if not path.is_file():
+                continue
+            seen.add(path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+            if ledger.is_done(path, size, mtime_ns):
+                last_seen.pop(path, None)
+                continue
+
+            previous = last_seen.get(path)
+            if previous is None or previous[:2] != (size, mtime_ns):
+                last_seen[path] = (size, mtime_ns, now) # new or still being written
+                continue
+            if size == 0 or now - mtime_ns / 1e9 < self.settle_seconds:
+                continue
+
+            page_count = FileMan.page_count(path)
+            if page_count <= 0:
+                # stable but not decodable (yet), e.g. copied without updating mtime
+                if now - previous[2] > self.unreadable_timeout:
+                    ledger.record(path, size, mtime_ns, "failed", [])
+                    self.error.emit(f"Could not read image '{path.name}'. Skipping it until it changes.")
+                    last_seen.pop(path, None)
+                continue
+
+            last_seen.pop(path, None)
+            stable_files.append((path, size, mtime_ns, page_count))
+
+        # forget files that disappeared
+        for path in [p for p in last_seen if p not in seen]:
+            last_seen.pop(path)
+        return stable_files
+
+    @Slot(Path, Settings, int, Path, str, bool, bool, bool, bool)
+    def run(self,
+            watch_dir: Path,
+            settings: Settings,
+            workers: int,
+            save_dir: Path,
+            backend: str = ExecutionBackend.PROCESS.value,
+            export_data: bool = False,
+            keep_stages: bool = False,
+            keep_samples: bool = False,
+            reference_images: bool = False,
+            use_cache: bool = True
+        ):
+        """
+        Watch `watch_dir` until stopped, processing every new image once it is completely written.
+        The worker pool stays alive between files, and each page's .SEG file is written as soon as it's done.
+        Handled files are recorded in a `WatchLedger` in `save_dir`, so restarting never reprocesses them.
+        Written .SEG files are added to the `ResultsCatalog`.
+        `export_data`, `keep_stages`, `keep_samples`, `reference_images` and `use_cache` work as in `BatchWorker.run`.
+        """
+        self._stop_requested = False
+        execution_backend = ExecutionBackend(backend)
+
+        if execution_backend == ExecutionBackend.THREAD:
+            self._stop_event = Event() # no need for a cross-process event
+        else:
+            self._manager = multiprocessing.Manager()
+            self._stop_event = self._manager.Event()
+
+        formatted_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+        cv_threads = getNumThreads()
+        ledger = WatchLedger(save_dir)
+        report = BatchReport(save_dir)
+        catalog: ResultsCatalog | None = None
+        export: tuple[Path, Path, str] | None = None
+        exported_results: list[BatchResult] = []
+        if export_data:
+            image_dir = save_dir / "images"
+            image_dir.mkdir(parents=True, exist_ok=True)
+            export = (image_dir, AppState.annotation_font_path(), formatted_datetime)
+
+        try:
+            catalog = ResultsCatalog()
+            executor, pool_size = create_executor(execution_backend, workers)
+            max_in_flight = 2 * pool_size
+            with executor as pool:
+                self.pool = pool
+
+                active: dict[Path, _WatchedFile] = {}
+                last_seen: dict[Path, tuple[int, int, float]] = {}
+                queued_jobs: deque[tuple[Path, int, int]] = deque()
+                futures: dict[Future, tuple[Path, int]] = {}
+                last_scan = 0.0
+
+                def finish_file(path: Path):
+                    """Record a file in the ledger once all of its pages are done."""
+                    watched = active[path]
+                    if watched.remaining_pages > 0:
+                        return
+                    status = "failed" if watched.failed else "done"
+                    ledger.record(path, watched.size, watched.mtime_ns, status, watched.seg_files)
+                    active.pop(path)
+
+                while not self._stop_requested:
+                    # scan for new files
+                    if time.perf_counter() - last_scan >= self.poll_interval:
+                        last_scan = time.perf_counter()
+                        try:
+                            stable_files = self._find_stable_files(watch_dir, ledger, active, last_seen)
+                        except OSError:
+                            stable_files = []
+                            self.error.emit(f"Could not scan watch folder '{watch_dir}'.")
+                        for path, size, mtime_ns, page_count in stable_files:
+                            active[path] = _WatchedFile(size, mtime_ns, page_count)
+                            queued_jobs.extend((path, page, page_count) for page in range(page_count))
+                            self.detected.emit(path.name, page_count)
+
+                    # top up the pool
+                    while len(futures) < max_in_flight and queued_jobs:
+                        path, page, page_count = queued_jobs.popleft()
+                        img_name = path.stem + FileMan.page_suffix(page, page_count)
+                        seg_path = save_dir / f"{img_name}_{formatted_datetime}.seg"
+                        future = pool.submit(
+                            process_single_image,
+                            (path, page, page_count, settings, self._stop_event, seg_path, export, use_cache, keep_stages, keep_samples, reference_images)
+                        )
+                        futures[future] = (path, page)
+
+                    if not futures:
+                        time.sleep(0.25)
+                        continue
+
+                    done, _ = wait(futures, timeout=0.25, return_when=FIRST_COMPLETED)
+                    if self._stop_requested:
+                        break
+                    for future in done:
+                        path, page = futures.pop(future)
+                        watched = active[path]
+                        watched.remaining_pages -= 1
+                        try:
+                            result: BatchResult = future.result()
+                            report.write_row(result.report_row())
+                            if result.cancelled:
+                                watched.failed = True
+                            else:
+                                watched.seg_files.append(result.seg_path.name)
+                                exported_results.append(result)
+                                catalog_error = add_to_catalog(catalog, result, settings)
+                                if catalog_error is not None:
+                                    self.error.emit(catalog_error)
+                                self.progress.emit(result)
+                        except Exception:
+                            watched.failed = True
+                            report.write_row({"image": str(path), "page": page, "status": "failed", "error": traceback.format_exc(limit=1)})
+                            self.error.emit(traceback.format_exc())
+                        finish_file(path)
+
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        except Exception:
+            self.error.emit(traceback.format_exc())
+        finally:
+            self.pool = None
+            setNumThreads(cv_threads)
+            report.close()
+            if catalog is not None:
+                catalog.close()
+            DiskResultCache().evict()
+            if keep_stages:
+                StageCache().evict()
+
+        # files that were interrupted are not in the ledger, so they are picked up again next time
+        if export is not None and exported_results:
+            csv_path = save_dir / f"SnapG_segmentation_data_{formatted_datetime}.csv"
+            try:
+                write_batch_csv(csv_path, exported_results)
+                self.exported.emit(csv_path)
+            except Exception:
+                self.error.emit(traceback.format_exc())
+
+        self.finished.emit()
+
+    @Slot()
+    def stop(self):
+        self._stop_requested = True
+        if self._stop_event is not None:
+            self._stop_event.set()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
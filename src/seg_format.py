@@ -0,0 +1,506 @@
+"""
+Binary .SEG container. Replaces raw pickles, which are large, slow to load, tied to class layout and unsafe to open.
+See "SEG file format" in the README for the layout. Legacy pickled .SEG files are still read (see `read_legacy_seg`).
+"""
+from models import SegmentationData, ContourData, ThicknessSamples, ImageSource, FileMan
+from selection_journal import apply_journal
+
+from pydantic import BaseModel, ValidationError
+
+from pathlib import Path
+import numpy.typing as npt
+import numpy as np
+import builtins
+import pickle
+import struct
+import mmap
+import os
+import json
+import zlib
+import cv2
+import io
+
+MAGIC = b"SNPGSEG\x00"
+"""First bytes of every binary .SEG file."""
+
+FORMAT_VERSION = 2
+"""
+Current container version. Bump it whenever the layout changes; readers reject newer versions.
+Version 2 added reference-mode files (no `image` block). Files that embed the image are still written as version 1.
+"""
+
+_PREAMBLE = struct.Struct("<8sHI") # magic, version, header size
+_COMPRESSION_LEVEL = 3
+
+_METRIC_COLUMNS: list[tuple[str, str]] = [
+    ("ID", "<i4"),
+    ("g_ratio", "<f8"),
+    ("circularity", "<f8"),
+    ("thickness", "<f8"),
+    ("inner_diameter", "<f8"),
+    ("outer_diameter", "<f8")
+]
+"""`ContourData` metrics stored as columns (block `metrics.<name>`), in this order."""
+
+class SegFormatError(Exception):
+    """Raised when a .SEG file is damaged, not a .SEG file, or written by a newer version of SnapG."""
+
+# -- contour encoding --
+def encode_contours(contours: list[npt.NDArray]) -> dict[str, npt.NDArray]:
+    """
+    Delta-encode contours: their lengths, their first points, and the steps between consecutive points
+    in the smallest integer type that fits (usually `int8`).
+    """
+    lengths = np.array([len(c) for c in contours], dtype="<i4")
+    points = [c.reshape(-1, 2).astype(np.int64) for c in contours]
+    starts = np.array([p[0] if len(p) > 0 else (0, 0) for p in points], dtype="<i4").reshape(-1, 2)
+    deltas = np.concatenate([np.diff(p, axis=0) for p in points]) if points else np.zeros((0, 2), dtype=np.int64)
+    largest = int(np.abs(deltas).max()) if deltas.size > 0 else 0
+    delta_dtype = "<i1" if largest < 2**7 else "<i2" if largest < 2**15 else "<i4"
+    return {"lengths": lengths, "starts": starts, "deltas": deltas.astype(delta_dtype)}
+
+def decode_contours(lengths: npt.NDArray, starts: npt.NDArray, deltas: npt.NDArray) -> list[npt.NDArray[np.int32]]:
+    """Restore contours (`(N, 1, 2)` `int32` arrays) from `encode_contours`, all in one cumulative sum."""
+    if len(lengths) == 0:
+        return []
+    ends = np.cumsum(lengths, dtype=np.int64)
+    firsts = (ends - lengths)[lengths > 0]
+    steps = np.empty((int(ends[-1]), 2), dtype=np.int64)
+    is_first = np.zeros(len(steps), dtype=bool)
+    is_first[firsts] = True
+    steps[is_first] = starts[lengths > 0]
+    steps[~is_first] = deltas
+    points = np.cumsum(steps, axis=0)
+    # each contour restarts at its first point: remove the running total of the contours before it
+    carried = np.zeros((len(firsts), 2), dtype=np.int64)
+    carried[1:] = points[firsts[1:] - 1]
+    points -= np.repeat(carried, lengths[lengths > 0], axis=0)
+    return [c.reshape(-1, 1, 2) for c in np.split(points.astype(np.int32), ends[:-1])]
+
+# -- blocks --
+def _encode_block(array: npt.NDArray, compress: bool) -> tuple[bytes, dict]:
+    """Returns the block's bytes and its block table entry (without offset)."""
+    array = np.ascontiguousarray(array)
+    data = array.tobytes()
+    codec = "raw"
+    if compress and len(data) > 64:
+        data = zlib.compress(data, _COMPRESSION_LEVEL)
+        codec = "zlib"
+    return data, {
+        "size": len(data),
+        "codec": codec,
+        "dtype": array.dtype.str,
+        "shape": list(array.shape),
+        "crc32": zlib.crc32(data)
+    }
+
+def decode_block(buffer, entry: dict, data_start: int) -> npt.NDArray:
+    """
+    Read one block from the given file buffer (`bytes`, `memoryview` or `mmap`) and check its checksum.
+    Only the block's bytes are touched, and the returned array never references the buffer (so an `mmap` can be closed).
+    """
+    start = data_start + entry["offset"]
+    with memoryview(buffer) as view, view[start:start + entry["size"]] as data:
+        if len(data) != entry["size"] or zlib.crc32(data) != entry["crc32"]:
+            raise SegFormatError("Damaged block (checksum mismatch).")
+        if entry["codec"] == "zlib":
+            decoded = zlib.decompress(data)
+        elif entry["codec"] == "raw":
+            decoded = bytes(data)
+        else:
+            raise SegFormatError(f"Unknown block codec '{entry['codec']}'.")
+    return np.frombuffer(decoded, dtype=np.dtype(entry["dtype"])).reshape(entry["shape"])
+
+# -- writing --
+def source_image_matches(image_source: ImageSource, page: int) -> bool:
+    """Returns whether the source image file exists at its recorded path and its page still has the recorded digest."""
+    from imgproc.result_cache import image_digest
+    path = Path(image_source.path)
+    if not path.is_file():
+        return False
+    decoded = FileMan.read_page(path, page)
+    return decoded is not None and image_digest(decoded) == image_source.digest
+
+def encode_seg(seg_data: SegmentationData, source_verified: bool = False) -> bytes:
+    """
+    Serialize segmentation data as a binary .SEG container.
+    Set `source_verified` if the source image's digest was just computed from the image file (e.g. by a batch),
+    so its page isn't decoded again to check it.
+    """
+    blocks: dict[str, tuple[npt.NDArray, bool]] = {} # name: (array, compress)
+
+    # image: referenced while the source file matches its digest (reference mode), otherwise embedded,
+    # as one channel if the (BGR) channels are identical, as for grayscale micrographs
+    image = seg_data.image
+    image_source = seg_data.image_source
+    if image_source is None or not (source_verified or source_image_matches(image_source, seg_data.page)):
+        stored_image = image
+        if image.ndim == 3 and image.shape[2] == 3 and np.array_equal(image[..., 0], image[..., 1]) and np.array_equal(image[..., 0], image[..., 2]):
+            stored_image = image[..., 0]
+        blocks["image"] = (stored_image, True)
+
+    # metrics (columnar)
+    contour_data = seg_data.contour_data
+    for name, dtype in _METRIC_COLUMNS:
+        blocks[f"metrics.{name}"] = (np.array([getattr(c, name) for c in contour_data], dtype=dtype), False)
+
+    # selection bitmap
+    blocks["selection"] = (np.packbits(np.array(seg_data.selected_states, dtype=bool)), False)
+
+    # contours
+    for kind in ("inner", "outer"):
+        encoded = encode_contours([getattr(c, f"{kind}_contour") for c in contour_data])
+        for part, array in encoded.items():
+            blocks[f"{kind}.{part}"] = (array, part == "deltas")
+
+    # thickness samples (only for axons that kept them)
+    sampled = [c.samples for c in contour_data if c.samples is not None]
+    if len(sampled) > 0:
+        blocks["samples.mask"] = (np.packbits(np.array([c.samples is not None for c in contour_data], dtype=bool)), False)
+        blocks["samples.distance_lengths"] = (np.array([len(s.distances) for s in sampled], dtype="<i4"), False)
+        blocks["samples.distances"] = (np.concatenate([s.distances.astype("<f4") for s in sampled]), True)
+        for part, array in encode_contours([s.axon_contour for s in sampled]).items():
+            blocks[f"samples.contour.{part}"] = (array, True)
+        blocks["samples.crop"] = (np.array([s.crop for s in sampled], dtype="<i4").reshape(-1, 4), False)
+        blocks["samples.nm_per_pixel"] = (np.array([s.nm_per_pixel for s in sampled], dtype="<f8"), False)
+        blocks["samples.resolution_divisor"] = (np.array([s.resolution_divisor for s in sampled], dtype="<f8"), False)
+
+    block_table: dict[str, dict] = {}
+    payloads: list[bytes] = []
+    offset = 0
+    for name, (array, compress) in blocks.items():
+        data, entry = _encode_block(array, compress)
+        entry["offset"] = offset
+        block_table[name] = entry
+        payloads.append(data)
+        offset += len(data)
+
+    header = json.dumps({
+        "img_filename": seg_data.img_filename,
+        "resolution_divisor": seg_data.resolution_divisor,
+        "preferred_units": seg_data.preferred_units,
+        "page": seg_data.page,
+        "page_count": seg_data.page_count,
+        "thickness_percentile": seg_data.thickness_percentile,
+        "axon_count": len(contour_data),
+        "image": {"shape": list(image.shape), "dtype": image.dtype.str},
+        "image_source": image_source.model_dump() if image_source is not None else None,
+        "blocks": block_table
+    }, separators=(",", ":")).encode()
+
+    version = FORMAT_VERSION if "image" not in block_table else 1 # older readers can still read embedded files
+    return b"".join([_PREAMBLE.pack(MAGIC, version, len(header)), header, *payloads])
+
+# -- reading --
+def is_seg_container(prefix: bytes) -> bool:
+    """Returns whether the given first bytes of a file belong to a binary .SEG container."""
+    return prefix[:len(MAGIC)] == MAGIC
+
+def read_header(buffer) -> tuple[dict, int]:
+    """
+    Parse the preamble and header of a binary .SEG container.
+    Returns:
+        header (dict): Metadata, image info and the block table.
+        data_start (int): Offset of the first block (block offsets are relative to it).
+    """
+    if len(buffer) < _PREAMBLE.size:
+        raise SegFormatError("File is too short.")
+    magic, version, header_size = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise SegFormatError("Not a SnapG .SEG container.")
+    if version > FORMAT_VERSION:
+        raise SegFormatError(f"File was written by a newer version of SnapG (format {version}, supported {FORMAT_VERSION}).")
+    data_start = _PREAMBLE.size + header_size
+    try:
+        header = json.loads(bytes(memoryview(buffer)[_PREAMBLE.size:data_start]))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise SegFormatError("Damaged header.")
+    return header, data_start
+
+def load_source_image(header: dict, seg_path: Path | None = None) -> npt.NDArray:
+    """
+    Regenerate the (shrunk, BGR) image of a reference-mode .SEG file from its source image.
+    The source is looked up at its recorded path, then next to the .SEG file and in its parent folder,
+    and only accepted if its decoded page matches the recorded digest.
+    """
+    from imgproc.result_cache import image_digest
+    image_source = ImageSource(**header["image_source"])
+    candidates = [Path(image_source.path)]
+    if seg_path is not None:
+        candidates += [seg_path.parent / header["img_filename"], seg_path.parent.parent / header["img_filename"]]
+    for path in candidates:
+        if not path.is_file():
+            continue
+        page = FileMan.read_page(path, header["page"])
+        if page is None or image_digest(page) != image_source.digest:
+            continue
+        resolution_divisor = header["resolution_divisor"]
+        image = cv2.resize(page, None, fx=1 / resolution_divisor, fy=1 / resolution_divisor) # as in `process_single_image`
+        if list(image.shape) == header["image"]["shape"]:
+            return image
+    raise SegFormatError(f"Source image '{image_source.path}' is missing or was changed (this .SEG file does not embed the image).")
+
+def decode_image(buffer, header: dict, data_start: int, seg_path: Path | None = None) -> npt.NDArray:
+    """Read the (BGR) image block, or regenerate the image from its source (see `load_source_image`)."""
+    if "image" not in header["blocks"]:
+        return load_source_image(header, seg_path)
+    image = decode_block(buffer, header["blocks"]["image"], data_start)
+    shape = tuple(header["image"]["shape"])
+    if image.shape != shape:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) # stored as one channel
+    return image
+
+def decode_metrics(buffer, header: dict, data_start: int) -> dict[str, npt.NDArray]:
+    """Read the metric columns (`ID`, `g_ratio`, `circularity`, `thickness`, `inner_diameter`, `outer_diameter`)."""
+    return {name: decode_block(buffer, header["blocks"][f"metrics.{name}"], data_start) for name, _ in _METRIC_COLUMNS}
+
+def decode_contour_data(buffer, header: dict, data_start: int) -> list[ContourData]:
+    """Read every axon's metrics, contours and (kept) thickness samples."""
+    blocks = header["blocks"]
+    def block(name: str) -> npt.NDArray:
+        return decode_block(buffer, blocks[name], data_start)
+
+    metrics = decode_metrics(buffer, header, data_start)
+    inner = decode_contours(block("inner.lengths"), block("inner.starts"), block("inner.deltas"))
+    outer = decode_contours(block("outer.lengths"), block("outer.starts"), block("outer.deltas"))
+    axon_count = header["axon_count"]
+
+    samples: list[ThicknessSamples | None] = [None] * axon_count
+    if "samples.mask" in blocks:
+        mask = np.unpackbits(block("samples.mask"), count=axon_count).astype(bool)
+        distance_lengths = block("samples.distance_lengths")
+        distances = np.split(block("samples.distances"), np.cumsum(distance_lengths)[:-1]) if len(distance_lengths) > 0 else []
+        axon_contours = decode_contours(block("samples.contour.lengths"), block("samples.contour.starts"), block("samples.contour.deltas"))
+        crops = block("samples.crop")
+        nm_per_pixel = block("samples.nm_per_pixel")
+        resolution_divisor = block("samples.resolution_divisor")
+        for j, i in enumerate(np.flatnonzero(mask)):
+            samples[i] = ThicknessSamples(
+                distances=distances[j],
+                axon_contour=axon_contours[j],
+                crop=tuple(int(v) for v in crops[j]),
+                nm_per_pixel=float(nm_per_pixel[j]),
+                resolution_divisor=float(resolution_divisor[j])
+            )
+
+    return [
+        ContourData(
+            ID=int(metrics["ID"][i]),
+            inner_contour=inner[i],
+            outer_contour=outer[i],
+            g_ratio=float(metrics["g_ratio"][i]),
+            circularity=float(metrics["circularity"][i]),
+            thickness=float(metrics["thickness"][i]),
+            inner_diameter=float(metrics["inner_diameter"][i]),
+            outer_diameter=float(metrics["outer_diameter"][i]),
+            samples=samples[i]
+        )
+        for i in range(axon_count)
+    ]
+
+def decode_selection(buffer, header: dict, data_start: int) -> list[bool]:
+    """Read the selection bitmap."""
+    bits = decode_block(buffer, header["blocks"]["selection"], data_start)
+    return np.unpackbits(bits, count=header["axon_count"]).astype(bool).tolist()
+
+def decode_seg(buffer, seg_path: Path | None = None) -> SegmentationData:
+    """Deserialize a binary .SEG container (read from `seg_path`, which helps find the source image of reference-mode files)."""
+    header, data_start = read_header(buffer)
+    try:
+        image_source = header.get("image_source")
+        return SegmentationData(
+            img_filename=header["img_filename"],
+            image=decode_image(buffer, header, data_start, seg_path),
+            resolution_divisor=header["resolution_divisor"],
+            contour_data=decode_contour_data(buffer, header, data_start),
+            selected_states=decode_selection(buffer, header, data_start),
+            preferred_units=header["preferred_units"],
+            page=header["page"],
+            page_count=header["page_count"],
+            thickness_percentile=header["thickness_percentile"],
+            image_source=ImageSource(**image_source) if image_source is not None else None
+        )
+    except (KeyError, ValueError, TypeError, zlib.error) as e:
+        raise SegFormatError(f"Damaged file ({e.__class__.__name__}: {e}).")
+
+# -- legacy pickles --
+class _LegacySegUnpickler(pickle.Unpickler):
+    """Unpickler that only constructs segmentation data classes and numpy arrays, so opening a file can't run code."""
+
+    allowed_globals: set[tuple[str, str]] = {
+        ("models", "SegmentationData"),
+        ("models", "ContourData"),
+        ("models", "ThicknessSamples"),
+        ("numpy", "ndarray"),
+        ("numpy", "dtype"),
+        ("numpy.core.multiarray", "_reconstruct"),
+        ("numpy.core.multiarray", "scalar"),
+        ("numpy._core.multiarray", "_reconstruct"),
+        ("numpy._core.multiarray", "scalar"),
+        ("copyreg", "_reconstructor"),
+        ("builtins", "object")
+    }
+
+    def find_class(self, module: str, name: str):
+        if (module, name) not in self.allowed_globals:
+            raise SegFormatError(f"Legacy .SEG file references '{module}.{name}', which is not allowed.")
+        if module == "builtins":
+            return getattr(builtins, name)
+        return super().find_class(module, name)
+
+def read_legacy_state(data: bytes) -> dict:
+    """
+    Unpickle a legacy .SEG file safely and return its stored attributes as plain data (nested models become dicts).
+    Unlike `model_dump()`, which only knows the current layout, this keeps fields that old class layouts had
+    and the current one doesn't (see `unknown_legacy_fields`).
+    """
+    try:
+        segmentation_data = _LegacySegUnpickler(io.BytesIO(data)).load()
+    except SegFormatError:
+        raise
+    except Exception as e:
+        raise SegFormatError(f"Not a .SEG file ({e.__class__.__name__}: {e}).")
+    if type(segmentation_data) is not SegmentationData:
+        raise SegFormatError("Not a .SEG file.")
+
+    def plain(value):
+        if isinstance(value, BaseModel):
+            return {name: plain(v) for name, v in value.__dict__.items()}
+        if isinstance(value, list):
+            return [plain(v) for v in value]
+        return value
+    return plain(segmentation_data)
+
+def unknown_legacy_fields(state: dict) -> list[str]:
+    """Returns the fields of a legacy state (`read_legacy_state`) that the current layout doesn't have, e.g. `contour_data[].area`."""
+    unknown = [name for name in state if name not in SegmentationData.model_fields]
+    contour_fields = {name for c in state.get("contour_data", []) if isinstance(c, dict) for name in c}
+    unknown += [f"contour_data[].{name}" for name in sorted(contour_fields) if name not in ContourData.model_fields]
+    sample_fields = {
+        name for c in state.get("contour_data", []) if isinstance(c, dict) and isinstance(c.get("samples"), dict)
+        for name in c["samples"]
+    }
+    unknown += [f"contour_data[].samples.{name}" for name in sorted(sample_fields) if name not in ThicknessSamples.model_fields]
+    return unknown
+
+def upgrade_legacy_state(state: dict) -> SegmentationData:
+    """
+    Upgrade a legacy state to the current `SegmentationData` layout: fields added since get their defaults,
+    and unknown fields are dropped.
+    """
+    try:
+        return SegmentationData(**state)
+    except ValidationError as e:
+        raise SegFormatError(f"Legacy .SEG file does not fit the current layout ({e.error_count()} errors, first: {e.errors()[0]['loc']}: {e.errors()[0]['msg']}).")
+
+def read_legacy_seg(data: bytes) -> SegmentationData:
+    """Read a legacy (pickled) .SEG file safely and upgrade it to the current `SegmentationData` layout."""
+    return upgrade_legacy_state(read_legacy_state(data))
+
+def _legacy_header(seg_data: SegmentationData) -> dict:
+    """Header fields of a legacy .SEG file, as `SegReader.header` would have them."""
+    return {
+        "img_filename": seg_data.img_filename,
+        "resolution_divisor": seg_data.resolution_divisor,
+        "preferred_units": seg_data.preferred_units,
+        "page": seg_data.page,
+        "page_count": seg_data.page_count,
+        "thickness_percentile": seg_data.thickness_percentile,
+        "axon_count": len(seg_data.contour_data),
+        "image": {"shape": list(seg_data.image.shape), "dtype": seg_data.image.dtype.str},
+        "image_source": None,
+        "blocks": {}
+    }
+
+class SegReader():
+    """
+    Lazy reader of a .SEG file. Opening it parses only the header of the memory-mapped file, and the image, metrics, 
+    contours and selection are each decoded on request, so callers only pay for what they use.
+    Legacy pickled files have no blocks, so they are read completely when opened.
+    Use it as a context manager (or call `close()`), so the file is not kept open.
+    """
+
+    def __init__(self, file_path: Path):
+        self.path = file_path
+        self._file = open(file_path, "rb")
+        self._stat = os.fstat(self._file.fileno())
+        self._buffer: mmap.mmap | None = None
+        self._legacy: SegmentationData | None = None
+        try:
+            if is_seg_container(self._file.read(len(MAGIC))):
+                self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.header, self._data_start = read_header(self._buffer)
+            else:
+                self._file.seek(0)
+                self._legacy = read_legacy_seg(self._file.read())
+                self.header, self._data_start = _legacy_header(self._legacy), 0
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self) -> 'SegReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        self._file.close()
+
+    @property
+    def is_legacy(self) -> bool:
+        """Whether the file is a legacy pickle."""
+        return self._legacy is not None
+
+    @property
+    def axon_count(self) -> int:
+        return self.header["axon_count"]
+
+    def _decode(self, decode, legacy_value):
+        """Decode part of the container, or return the legacy file's value."""
+        if self._legacy is not None:
+            return legacy_value()
+        try:
+            return decode(self._buffer, self.header, self._data_start)
+        except (KeyError, ValueError, TypeError, zlib.error) as e:
+            raise SegFormatError(f"Damaged file ({e.__class__.__name__}: {e}).")
+
+    @property
+    def embeds_image(self) -> bool:
+        """Whether the file embeds the image (otherwise it's a reference-mode file, see `ImageSource`)."""
+        return self.is_legacy or "image" in self.header["blocks"]
+
+    def image(self) -> npt.NDArray:
+        """Returns the (BGR) image. Only its block is read and decompressed (or it is regenerated from the source image)."""
+        return self._decode(lambda *args: decode_image(*args, self.path), lambda: self._legacy.image) # type: ignore
+
+    def metrics(self) -> dict[str, npt.NDArray]:
+        """Returns the metric columns (`ID`, `g_ratio`, `circularity`, `thickness`, `inner_diameter`, `outer_diameter`)."""
+        return self._decode(decode_metrics, lambda: {
+            name: np.array([getattr(c, name) for c in self._legacy.contour_data], dtype=dtype) # type: ignore
+            for name, dtype in _METRIC_COLUMNS
+        })
+
+    def contour_data(self) -> list[ContourData]:
+        """Returns every axon's metrics and contours (without reading the image)."""
+        return self._decode(decode_contour_data, lambda: self._legacy.contour_data) # type: ignore
+
+    def selected_states(self) -> list[bool]:
+        """Returns the selected states, merged with the file's selection journal (see `selection_journal`)."""
+        selected_states = self._decode(decode_selection, lambda: self._legacy.selected_states) # type: ignore
+        apply_journal(self.path, selected_states, self._stat)
+        return selected_states
+
+    def segmentation_data(self) -> SegmentationData:
+        """Returns everything as `SegmentationData` (the selection is merged with the file's selection journal)."""
+        seg_data: SegmentationData = self._decode(lambda *_: decode_seg(self._buffer, self.path), lambda: self._legacy)
+        apply_journal(self.path, seg_data.selected_states, self._stat)
+        return seg_data
+
+def read_seg_file(file_path: Path) -> SegmentationData:
+    """Read a binary or legacy .SEG file. Raises `SegFormatError` if it is invalid."""
+    with SegReader(file_path) as reader:
+        return reader.segmentation_data()
@@ -0,0 +1,239 @@
+"""
+Bulk migration of legacy (pickled) .SEG files to the binary container (see `seg_format`).
+Files are converted in parallel, and each one is verified against its pickle before it is replaced.
+Every outcome is appended to a ledger (`MigrationLedger`), so an interrupted migration resumes where it stopped.
+"""
+from models import SegmentationData, FileMan
+from seg_format import (
+    MAGIC,
+    SegFormatError,
+    is_seg_container,
+    read_legacy_state,
+    unknown_legacy_fields,
+    upgrade_legacy_state,
+    encode_seg,
+    decode_seg
+)
+from selection_journal import apply_journal, delete_journal
+
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Iterator
+from pydantic import BaseModel
+from pathlib import Path
+import numpy as np
+import multiprocessing
+import traceback
+import shutil
+import json
+import os
+
+ledger_path = FileMan.resource_path("__appdata__/seg_migration.jsonl")
+
+backup_suffix = ".legacy"
+"""Suffix appended to a migrated file's name for the kept copy of its pickle (e.g. `x.seg.legacy`)."""
+
+class MigrationResult(BaseModel):
+    """Outcome of migrating one .SEG file."""
+
+    seg_path: Path
+    """Migrated .SEG file."""
+
+    status: str
+    """`migrated`, `current` (already a binary container), or `failed`."""
+
+    legacy_size: int = 0
+    """Size of the pickle (bytes)."""
+
+    size: int = 0
+    """Size of the file after migrating (bytes)."""
+
+    journaled: int = 0
+    """Number of axons whose selection came from the file's selection journal."""
+
+    error: str | None = None
+    """Error message, if the file could not be migrated (it is left unchanged)."""
+
+# -- verification --
+def _same_array(legacy, decoded, dtype: str | None = None) -> bool:
+    legacy = np.asarray(legacy)
+    if dtype is not None:
+        legacy = legacy.astype(dtype)
+    return legacy.shape == decoded.shape and np.array_equal(legacy, decoded)
+
+def _same_points(legacy, decoded) -> bool:
+    """Contours are compared as point lists (`(N, 1, 2)` and `(N, 2)` arrays hold the same contour)."""
+    return _same_array(np.asarray(legacy).reshape(-1, 2), decoded.reshape(-1, 2))
+
+def verify_migration(state: dict, selected_states: list[bool], migrated: SegmentationData):
+    """
+    Check that a migrated file holds everything its pickle did. `state` is the raw pickle (`read_legacy_state`),
+    not the upgraded model, so a field lost while reinterpreting the old layout is caught as well.
+    Raises `SegFormatError` naming the first difference.
+    """
+    def fail(what: str):
+        raise SegFormatError(f"Verification failed: {what} differs.")
+
+    for name in ("img_filename", "resolution_divisor", "preferred_units", "page", "page_count", "thickness_percentile"):
+        if state.get(name, SegmentationData.model_fields[name].default) != getattr(migrated, name):
+            fail(name)
+    image = state["image"]
+    if image.dtype != migrated.image.dtype or not _same_array(image, migrated.image):
+        fail("image")
+    if [bool(s) for s in selected_states] != migrated.selected_states:
+        fail("selected_states")
+
+    legacy_contours = state["contour_data"]
+    if len(legacy_contours) != len(migrated.contour_data):
+        fail("axon count")
+    for i, (legacy, c) in enumerate(zip(legacy_contours, migrated.contour_data)):
+        if any(legacy[name] != getattr(c, name) for name in ("ID", "g_ratio", "circularity", "thickness", "inner_diameter", "outer_diameter")):
+            fail(f"axon {i} metrics")
+        if not _same_points(legacy["inner_contour"], c.inner_contour) or not _same_points(legacy["outer_contour"], c.outer_contour):
+            fail(f"axon {i} contours")
+        samples = legacy.get("samples")
+        if (samples is None) != (c.samples is None):
+            fail(f"axon {i} thickness samples")
+        if samples is not None and c.samples is not None and not (
+            _same_array(samples["distances"], c.samples.distances, "<f4") # stored as float32
+            and _same_points(samples["axon_contour"], c.samples.axon_contour)
+            and tuple(samples["crop"]) == c.samples.crop
+            and samples["nm_per_pixel"] == c.samples.nm_per_pixel
+            and samples["resolution_divisor"] == c.samples.resolution_divisor
+        ):
+            fail(f"axon {i} thickness samples")
+
+# -- migration --
+def migrate_seg_file(args: tuple[Path, bool]) -> MigrationResult:
+    """
+    Migrate one .SEG file (`args` is the path and whether to keep a copy of the pickle). The container is written
+    to a temporary file, read back and verified, and only then replaces the pickle (atomically).
+    Changes in the file's selection journal are written into the container.
+    """
+    seg_path, keep_backup = args
+    tmp_path = seg_path.with_suffix(".seg.tmp")
+    try:
+        with open(seg_path, "rb") as f:
+            seg_stat = os.fstat(f.fileno())
+            data = f.read()
+        if is_seg_container(data[:len(MAGIC)]):
+            return MigrationResult(seg_path=seg_path, status="current", size=len(data))
+
+        state = read_legacy_state(data)
+        unknown = unknown_legacy_fields(state)
+        if len(unknown) > 0:
+            # `model_dump()` reinterpretation would silently drop these: keep the pickle instead
+            raise SegFormatError(f"Has fields the current layout does not know ({', '.join(unknown)}), so they would be lost.")
+        seg_data = upgrade_legacy_state(state)
+        journaled = apply_journal(seg_path, seg_data.selected_states, seg_stat)
+
+        with open(tmp_path, "wb") as f:
+            f.write(encode_seg(seg_data))
+            f.flush()
+            os.fsync(f.fileno())
+        verify_migration(state, seg_data.selected_states, decode_seg(tmp_path.read_bytes(), seg_path))
+
+        if keep_backup:
+            shutil.copy2(seg_path, seg_path.with_name(seg_path.name + backup_suffix))
+        size = tmp_path.stat().st_size
+        tmp_path.replace(seg_path)
+        delete_journal(seg_path) # its changes are in the container now
+        return MigrationResult(seg_path=seg_path, status="migrated", legacy_size=len(data), size=size, journaled=journaled)
+    except Exception as e:
+        tmp_path.unlink(missing_ok=True)
+        error = str(e) if isinstance(e, SegFormatError) else traceback.format_exc(limit=1)
+        return MigrationResult(seg_path=seg_path, status="failed", error=error)
+
+def migrate_files(seg_paths: list[Path], workers: int = 1, keep_backup: bool = False) -> Iterator[MigrationResult]:
+    """
+    Migrate the given .SEG files, in parallel if `workers > 1` (spawned processes, so it is safe to call from the GUI).
+    Yields results in the given order.
+    """
+    jobs = [(path, keep_backup) for path in seg_paths]
+    if workers <= 1:
+        yield from map(migrate_seg_file, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        # small chunks, so results (and the ledger) keep up with the work done
+        yield from pool.map(migrate_seg_file, jobs, chunksize=max(1, min(16, len(jobs) // (4 * workers))))
+
+# -- ledger --
+class MigrationLedger():
+    """
+    Record of migrated and failed .SEG files, written as JSON lines (the last row of each file wins).
+    Files whose size and modification time still match their row are skipped without being opened,
+    and every row is flushed immediately, so an interrupted migration loses at most the row being written.
+    """
+
+    def __init__(self, path: Path = ledger_path):
+        self.path = path
+        self.rows: dict[str, dict] = {}
+        """Latest row (`status`, `size`, `mtime_ns`, `error`) by absolute .SEG file path."""
+        self._file = None
+        try:
+            with open(path, "r") as f:
+                lines = f.readlines()
+        except OSError:
+            lines = []
+        for line in lines:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue # torn final row after a crash
+            self.rows[row["seg_path"]] = row
+
+    def __enter__(self) -> 'MigrationLedger':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def pending(self, seg_paths: list[Path], retry_failed: bool = False) -> tuple[list[Path], int, int]:
+        """
+        Returns:
+            pending (list[Path]): Files that still need to be migrated (or checked).
+            done (int): Number of files skipped because they were migrated (or already current) before.
+            failed (int): Number of files skipped because they failed before and did not change since (unless `retry_failed`).
+        """
+        pending: list[Path] = []
+        done, failed = 0, 0
+        for path in seg_paths:
+            row = self.rows.get(str(path.resolve()))
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if row is None or (row["size"], row["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+                pending.append(path)
+            elif row["status"] == "failed" and retry_failed:
+                pending.append(path)
+            elif row["status"] == "failed":
+                failed += 1
+            else:
+                done += 1
+        return pending, done, failed
+
+    def record(self, result: MigrationResult):
+        """Append the given result, with the file's current size and modification time."""
+        try:
+            stat = result.seg_path.stat()
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size, mtime_ns = -1, -1
+        row = {
+            "seg_path": str(result.seg_path.resolve()),
+            "status": result.status,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "error": result.error
+        }
+        self.rows[row["seg_path"]] = row
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
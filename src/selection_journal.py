@@ -0,0 +1,144 @@
+"""
+Append-only journal of review selection changes, stored next to its .SEG file (`<name>.seg.sel`).
+Toggling an axon appends a few bytes instead of rewriting the whole .SEG file. Readers merge the journal
+(see `seg_format.SegReader`), and compaction writes the merged selection into the .SEG file and deletes the journal.
+"""
+from pathlib import Path
+import struct
+import zlib
+import os
+
+MAGIC = b"SNPGSEL\x00"
+"""First bytes of every selection journal."""
+
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sHQq") # magic, version, .SEG file size, .SEG file mtime (ns)
+_RECORD = struct.Struct("<I?I") # axon index, selected, crc32 of the index and state
+_RECORD_DATA = struct.Struct("<I?")
+
+def journal_path(seg_path: Path) -> Path:
+    """Returns the path of the given .SEG file's selection journal."""
+    return seg_path.with_name(seg_path.name + ".sel")
+
+def _seg_identity(seg_stat: os.stat_result) -> tuple[int, int]:
+    return seg_stat.st_size, seg_stat.st_mtime_ns
+
+def _replayable_end(data: bytes) -> int:
+    """Returns the offset where the journal's first damaged record (torn, or failing its CRC) begins, or its length."""
+    end = _HEADER.size
+    while end + _RECORD.size <= len(data):
+        crc = _RECORD.unpack_from(data, end)[2]
+        if zlib.crc32(data[end:end + _RECORD_DATA.size]) != crc:
+            break
+        end += _RECORD.size
+    return end
+
+def read_journal(seg_path: Path, seg_stat: os.stat_result | None = None) -> dict[int, bool]:
+    """
+    Read the selection journal of the given .SEG file (`seg_stat` is the file's `os.stat()`, if already known).
+    A journal written for another version of the .SEG file (i.e. it was replaced since) is ignored, and replay stops
+    at the first damaged record (e.g. torn by a crash).
+    Returns:
+        changes (dict[int, bool]): Latest selected state of every journaled axon index.
+    """
+    try:
+        with open(journal_path(seg_path), "rb") as f:
+            data = f.read()
+        if seg_stat is None:
+            seg_stat = seg_path.stat()
+    except OSError:
+        return {}
+    if len(data) < _HEADER.size:
+        return {}
+    magic, version, seg_size, seg_mtime_ns = _HEADER.unpack_from(data)
+    if magic != MAGIC or version > FORMAT_VERSION or (seg_size, seg_mtime_ns) != _seg_identity(seg_stat):
+        return {}
+
+    changes: dict[int, bool] = {}
+    for offset in range(_HEADER.size, _replayable_end(data), _RECORD.size):
+        index, selected, _ = _RECORD.unpack_from(data, offset)
+        changes[index] = selected
+    return changes
+
+def apply_journal(seg_path: Path, selected_states: list[bool], seg_stat: os.stat_result | None = None) -> int:
+    """
+    Merge the given .SEG file's journal into `selected_states` (in place). Indices past the end are ignored.
+    Returns:
+        applied (int): Number of axons whose state came from the journal.
+    """
+    applied = 0
+    for index, selected in read_journal(seg_path, seg_stat).items():
+        if index < len(selected_states):
+            selected_states[index] = selected
+            applied += 1
+    return applied
+
+def journal_record_count(seg_path: Path) -> int:
+    """Returns the number of records in the given .SEG file's journal (`0` if there is none)."""
+    try:
+        size = journal_path(seg_path).stat().st_size
+    except OSError:
+        return 0
+    return max(0, size - _HEADER.size) // _RECORD.size
+
+def delete_journal(seg_path: Path):
+    """Delete the given .SEG file's journal, e.g. after its selection was written into the .SEG file."""
+    journal_path(seg_path).unlink(missing_ok=True)
+
+class SelectionJournal():
+    """
+    Write-behind writer of one .SEG file's journal. `record()` only buffers a change, and `flush()` appends
+    every buffered change with a single write (and `fsync`), so its cost does not depend on the .SEG file's size.
+    """
+
+    def __init__(self, seg_path: Path):
+        self.seg_path = seg_path
+        self.path = journal_path(seg_path)
+        self._pending: list[tuple[int, bool]] = []
+
+    @property
+    def pending(self) -> int:
+        """Number of buffered changes that were not flushed yet."""
+        return len(self._pending)
+
+    def record(self, index: int, selected: bool):
+        """Buffer a change of the given axon's selected state."""
+        self._pending.append((index, selected))
+
+    def flush(self):
+        """
+        Append the buffered changes. A missing journal, or one written for another version of
+        the .SEG file, is started over with a new header. A damaged record (and everything after it,
+        which replay would skip) is cut off first, so the new records are replayed.
+        """
+        if len(self._pending) == 0:
+            return
+        seg_identity = _seg_identity(self.seg_path.stat())
+        try:
+            with open(self.path, "rb") as f:
+                journal = f.read()
+            magic, version, *identity = _HEADER.unpack_from(journal)
+            valid = magic == MAGIC and version == FORMAT_VERSION and tuple(identity) == seg_identity
+        except (OSError, struct.error):
+            valid, journal = False, b""
+
+        records = bytearray()
+        if not valid:
+            records += _HEADER.pack(MAGIC, FORMAT_VERSION, *seg_identity)
+        for index, selected in self._pending:
+            data = _RECORD_DATA.pack(index, selected)
+            records += data + struct.pack("<I", zlib.crc32(data))
+        with open(self.path, "r+b" if valid else "wb") as f:
+            if valid:
+                # drop a torn or corrupt record left by a crash, so new records stay aligned and reachable
+                f.seek(_replayable_end(journal))
+                f.truncate()
+            f.write(records)
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending.clear()
+
+    def discard(self):
+        """Forget the buffered changes (e.g. after they were compacted into the .SEG file)."""
+        self._pending.clear()
@@ -0,0 +1,64 @@
+"""Round-trip tests of reference-mode .SEG files (run from `SnapG/` with `python -m unittest discover tests`)."""
+from pathlib import Path
+import tempfile
+import unittest
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from models import SegmentationData, ImageSource
+from imgproc.result_cache import image_digest
+from seg_format import SegReader, read_seg_file
+
+import numpy as np
+import cv2
+
+class ReferenceModeTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp_dir = Path(self._tmp.name)
+        self.source_path = self.tmp_dir / "source.png"
+        self.seg_path = self.tmp_dir / "source.seg"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _seg_data(self, source: np.ndarray) -> SegmentationData:
+        return SegmentationData(
+            img_filename=self.source_path.name,
+            image=source,
+            resolution_divisor=1.0,
+            contour_data=[],
+            selected_states=[],
+            preferred_units="nm",
+            image_source=ImageSource(path=str(self.source_path), digest=image_digest(source))
+        )
+
+    def _embeds_image(self) -> bool:
+        with SegReader(self.seg_path) as reader:
+            return reader.embeds_image
+
+    def test_references_matching_source(self):
+        source = np.random.default_rng(0).integers(0, 256, (64, 48, 3), dtype=np.uint8)
+        cv2.imwrite(str(self.source_path), source)
+        self._seg_data(source).to_file(self.seg_path)
+        self.assertFalse(self._embeds_image())
+        np.testing.assert_array_equal(read_seg_file(self.seg_path).image, source)
+
+    def test_resave_with_replaced_source_keeps_pixels(self):
+        source = np.random.default_rng(1).integers(0, 256, (64, 48, 3), dtype=np.uint8)
+
+        # saved while the source is missing: the image is embedded
+        self._seg_data(source).to_file(self.seg_path)
+        self.assertTrue(self._embeds_image())
+
+        # a different image appears at the recorded path, then the file is read and saved again (e.g. compaction)
+        cv2.imwrite(str(self.source_path), np.zeros_like(source))
+        read_seg_file(self.seg_path).to_file(self.seg_path)
+
+        self.assertTrue(self._embeds_image())
+        np.testing.assert_array_equal(read_seg_file(self.seg_path).image, source)
+
+if __name__ == "__main__":
+    unittest.main()